@@ -0,0 +1,289 @@
+"""
+Benchmarks for the pygetfacl hot paths: getfacl process spawn, parsing,
+validation, effective permission computation, and end-to-end tree scans.
+Reports throughput (items/sec) and the peak memory allocated by one run,
+and can save results as a baseline or compare against one.
+
+    python benchmarks/run_benchmarks.py --save baseline.json
+    python benchmarks/run_benchmarks.py --compare baseline.json
+"""
+import argparse
+import json
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+import pygetfacl
+import pygetfacl.output_spec as osp
+import pygetfacl.subprocess_caller as sc
+from pygetfacl.data_containers import (
+    ACLData,
+    LazyACLData,
+    effective_permissions_many,
+)
+
+import synthetic
+
+
+def _peak_alloc_mb(run: Callable[[], int]) -> float:
+    """
+    Peak memory allocated by Python during one run of a benchmark, on top
+    of what was already allocated. Traced in a separate, untimed run, since
+    tracemalloc slows allocation down. Unlike the process's peak RSS, this
+    isn't carried over from earlier benchmarks.
+    """
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20
+
+
+def _measure(run: Callable[[], int], repeats: int) -> tuple[float, int]:
+    """
+    :param run: callable that does the work and returns how many items it
+    processed
+    :return: (best items / sec over the repeats, items per run)
+    """
+    best = 0.0
+    num_items = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        num_items = run()
+        elapsed = time.perf_counter() - start
+        best = max(best, num_items / elapsed if elapsed else float("inf"))
+    return best, num_items
+
+
+def _bench_parse(texts: list[str], strict: bool = True) -> Callable[[], int]:
+    def run():
+        for text in texts:
+            ACLData.from_getfacl_cmd_output(text, strict=strict)
+        return len(texts)
+
+    return run
+
+
+def _bench_lazy_filter(texts: list[str]) -> Callable[[], int]:
+    # filter-style scan reading two fields of each ACL in a batch buffer
+    batch_output = "".join(texts)
+
+    def run():
+        for acl_data in LazyACLData.from_batch_output(batch_output):
+            acl_data.owning_user
+            acl_data.mask
+        return len(texts)
+
+    return run
+
+
+def _bench_batch_bytes(texts: list[str]) -> Callable[[], int]:
+    # batch stdout as getfacl writes it, parsed block by block in place
+    batch_output = memoryview("".join(texts).encode())
+    spans = osp.getfacl_block_spans(batch_output)
+
+    def run():
+        for start, end in spans:
+            ACLData.from_getfacl_bytes(batch_output, start, end)
+        return len(spans)
+
+    return run
+
+
+def _bench_validate(texts: list[str]) -> Callable[[], int]:
+    tokenized = [osp.tokenize_getfacl_output(text) for text in texts]
+
+    def run():
+        for matches in tokenized:
+            for item in osp.GETFACL_OUTPUT_ITEMS:
+                item.validate_matches(matches[item.attribute])
+        return len(tokenized)
+
+    return run
+
+
+def _bench_effective(texts: list[str]) -> Callable[[], int]:
+    acls = [ACLData.from_getfacl_cmd_output(text) for text in texts]
+
+    def run():
+        for acl_data in acls:
+            effective = acl_data.effective_permissions
+            effective.group
+            effective.special_users
+            effective.special_groups
+        return len(acls)
+
+    return run
+
+
+def _bench_effective_batch(texts: list[str]) -> Callable[[], int]:
+    acls = [ACLData.from_getfacl_cmd_output(text) for text in texts]
+
+    def run():
+        for attribute in ("group", "special_users", "special_groups"):
+            effective_permissions_many(acls, attribute)
+        return len(acls)
+
+    return run
+
+
+def _bench_spawn(path: Path, count: int) -> Callable[[], int]:
+    def run():
+        for _ in range(count):
+            sc.SubProcessCaller(
+                command=["getfacl", "-E", str(path)]
+            ).call_with_stdout_capture()
+        return count
+
+    return run
+
+
+def _bench_tree(root: Path, backend: str) -> Callable[[], int]:
+    def run():
+        return sum(1 for _ in pygetfacl.getfacl_tree(root, backend=backend))
+
+    return run
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict[str, dict]:
+    rng = random.Random(args.seed)
+    texts = [
+        synthetic.make_getfacl_text(
+            rng,
+            num_named_users=args.named_users,
+            num_named_groups=args.named_groups,
+            with_default=idx % 4 == 0,
+        )
+        for idx in range(args.num_texts)
+    ]
+    benchmarks = {
+        "parse": _bench_parse(texts),
+        "parse_trusted": _bench_parse(texts, strict=False),
+        "parse_lazy_filter": _bench_lazy_filter(texts),
+        "parse_batch_bytes": _bench_batch_bytes(texts),
+        "validate": _bench_validate(texts),
+        "effective_permissions": _bench_effective(texts),
+        "effective_permissions_many": _bench_effective_batch(texts),
+    }
+
+    work_dir = Path(tempfile.mkdtemp(prefix="pygetfacl_bench_"))
+    try:
+        tree = work_dir / "tree"
+        acl_method = synthetic.make_tree(
+            tree,
+            num_files=args.num_files,
+            rng=rng,
+            acl_fraction=args.acl_fraction,
+            num_named_users=args.named_users,
+            num_named_groups=args.named_groups,
+        )
+        print(f"synthetic tree: {args.num_files} files, ACLs via {acl_method}")
+        benchmarks["tree_xattr"] = _bench_tree(tree, "xattr")
+        if shutil.which("getfacl"):
+            benchmarks["spawn"] = _bench_spawn(tree, args.num_spawns)
+            benchmarks["tree_subprocess"] = _bench_tree(tree, "subprocess")
+            benchmarks["tree_auto"] = _bench_tree(tree, "auto")
+        else:
+            print("getfacl not installed: skipping spawn / subprocess tree")
+
+        results = {}
+        for name, run in benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+            items_per_sec, num_items = _measure(run, args.repeats)
+            results[name] = {
+                "items_per_sec": items_per_sec,
+                "items": num_items,
+                "peak_alloc_mb": _peak_alloc_mb(run),
+            }
+            print(
+                f"{name:28s} {items_per_sec:14,.0f} items/s"
+                f"   peak alloc {results[name]['peak_alloc_mb']:8.2f} MB"
+            )
+        return results
+    finally:
+        shutil.rmtree(work_dir)
+
+
+def compare(
+    results: dict[str, dict], baseline: dict[str, dict], tolerance: float
+) -> list[str]:
+    """
+    :return: names of benchmarks more than tolerance (a fraction) slower
+    than the baseline
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["items_per_sec"]
+        after = result["items_per_sec"]
+        change = (after - before) / before
+        flag = ""
+        if change < -tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            f"{name:28s} {before:14,.0f} -> {after:14,.0f}"
+            f" ({change:+.1%}){flag}"
+        )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--num-texts", type=int, default=20000)
+    parser.add_argument("--num-files", type=int, default=5000)
+    parser.add_argument("--num-spawns", type=int, default=200)
+    parser.add_argument("--named-users", type=int, default=2)
+    parser.add_argument("--named-groups", type=int, default=2)
+    parser.add_argument("--acl-fraction", type=float, default=0.1)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--only", nargs="+", help="names of the benchmarks to run"
+    )
+    parser.add_argument("--save", type=Path, help="write results as JSON")
+    parser.add_argument(
+        "--compare", type=Path, help="baseline JSON to compare against"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="allowed slowdown vs the baseline, as a fraction",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args)
+    if args.save:
+        args.save.write_text(
+            json.dumps(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                indent=2,
+            )
+        )
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import os
+import random
+import shutil
+import subprocess
+from pathlib import Path
+
+import pygetfacl.xattr_reader as xr
+
+_PERMISSION_STRINGS = ("---", "r--", "r-x", "rw-", "rwx")
+
+
+def make_getfacl_text(
+    rng: random.Random,
+    num_named_users: int = 2,
+    num_named_groups: int = 2,
+    with_default: bool = False,
+    file_name: str = "synthetic_file",
+) -> str:
+    """
+    Builds text in the format printed by `getfacl -E`
+    :param rng: source of randomness (seed it for repeatable runs)
+    :param num_named_users: number of user:<name>: entries per ACL
+    :param num_named_groups: number of group:<name>: entries per ACL
+    :param with_default: whether to include a default ACL
+    """
+
+    def permission():
+        return rng.choice(_PERMISSION_STRINGS)
+
+    def acl_lines(prefix: str) -> list[str]:
+        lines = [f"{prefix}user::{permission()}"]
+        lines.extend(
+            f"{prefix}user:user_{idx}:{permission()}"
+            for idx in range(num_named_users)
+        )
+        lines.append(f"{prefix}group::{permission()}")
+        lines.extend(
+            f"{prefix}group:group_{idx}:{permission()}"
+            for idx in range(num_named_groups)
+        )
+        if num_named_users or num_named_groups:
+            lines.append(f"{prefix}mask::{permission()}")
+        lines.append(f"{prefix}other::{permission()}")
+        return lines
+
+    lines = [
+        f"# file: {file_name}",
+        "# owner: owner_a",
+        "# group: group_a",
+    ]
+    if rng.random() < 0.1:
+        lines.append("# flags: -s-")
+    lines.extend(acl_lines(""))
+    if with_default:
+        lines.extend(acl_lines("default:"))
+    return "\n".join(lines) + "\n\n"
+
+
+def _xattr_entries(
+    rng: random.Random, num_named_users: int, num_named_groups: int
+) -> list[tuple[int, int, int]]:
+    entries = [(xr.ACL_USER_OBJ, rng.randrange(8), xr.ACL_UNDEFINED_ID)]
+    # ids without an account are reported as numbers, so no accounts need
+    # to be created
+    entries.extend(
+        (xr.ACL_USER, rng.randrange(8), 60000 + idx)
+        for idx in range(num_named_users)
+    )
+    entries.append((xr.ACL_GROUP_OBJ, rng.randrange(8), xr.ACL_UNDEFINED_ID))
+    entries.extend(
+        (xr.ACL_GROUP, rng.randrange(8), 60000 + idx)
+        for idx in range(num_named_groups)
+    )
+    if num_named_users or num_named_groups:
+        entries.append((xr.ACL_MASK, 7, xr.ACL_UNDEFINED_ID))
+    entries.append((xr.ACL_OTHER, rng.randrange(8), xr.ACL_UNDEFINED_ID))
+    return entries
+
+
+def _set_acl(
+    path: Path, entries: list[tuple[int, int, int]], use_setfacl: bool
+):
+    if use_setfacl:
+        names = {
+            xr.ACL_USER_OBJ: "u:",
+            xr.ACL_USER: "u:{id}",
+            xr.ACL_GROUP_OBJ: "g:",
+            xr.ACL_GROUP: "g:{id}",
+            xr.ACL_MASK: "m:",
+            xr.ACL_OTHER: "o:",
+        }
+        spec = ",".join(
+            f"{names[tag].format(id=qualifier)}:{perm}"
+            for tag, perm, qualifier in entries
+        )
+        subprocess.run(["setfacl", "--set", spec, str(path)], check=True)
+    else:
+        os.setxattr(
+            path, xr.ACCESS_ACL_XATTR, xr.encode_posix_acl_xattr(entries)
+        )
+
+
+def make_tree(
+    root: Path,
+    num_files: int,
+    rng: random.Random,
+    files_per_dir: int = 100,
+    acl_fraction: float = 0.1,
+    num_named_users: int = 2,
+    num_named_groups: int = 2,
+) -> str:
+    """
+    Creates num_files files under root (which must not exist yet), spread
+    over directories of files_per_dir files. A fraction of the files get
+    an extended ACL, set with setfacl when it is installed and by writing
+    the system.posix_acl_access xattr otherwise.
+    :param acl_fraction: share of files with an extended ACL
+    :return: how ACLs were set: "setfacl", "xattr" or "none" (if the
+    filesystem doesn't support ACLs)
+    """
+    root.mkdir(parents=True)
+    method = "setfacl" if shutil.which("setfacl") else "xattr"
+    for idx in range(num_files):
+        directory = root / f"dir_{idx // files_per_dir:05d}"
+        if idx % files_per_dir == 0:
+            directory.mkdir()
+        file_path = directory / f"file_{idx:07d}"
+        file_path.touch()
+        os.chmod(file_path, rng.choice((0o600, 0o640, 0o644, 0o755)))
+        if method == "none" or rng.random() >= acl_fraction:
+            continue
+        entries = _xattr_entries(rng, num_named_users, num_named_groups)
+        try:
+            _set_acl(file_path, entries, use_setfacl=method == "setfacl")
+        except (OSError, subprocess.CalledProcessError):
+            method = "none"
+    return method
@@ -1,2 +1,26 @@
-from .acl_info_retriever import getfacl, getfacl_raw
-from .data_containers import ACLData, EffectivePermissions
+from .acl_info_retriever import (
+    getfacl,
+    getfacl_raw,
+    getfacl_many,
+    iter_getfacl_many,
+    get_default_backend,
+    set_default_backend,
+)
+from .access_check import AccessChecker, can_access, check_access
+from .acl_watcher import ACLChangeEvent, ACLWatcher
+from .async_retriever import agetfacl, agetfacl_many, agetfacl_raw
+from .coprocess import GetFaclCoprocess, GetFaclCoprocessPool
+from .data_containers import (
+    ACLData,
+    CompactACLData,
+    EffectivePermissions,
+    LazyACLData,
+    effective_permissions_many,
+)
+from .incremental import ACLDiff, diff_acl_data, incremental_rescan
+from .parallel_scanner import getfacl_tree_parallel
+from .parse_cache import ParseCache
+from .principal_index import PrincipalIndex
+from .result_cache import ACLResultCache
+from .snapshot import Snapshot, write_snapshot
+from .tree_scanner import getfacl_tree
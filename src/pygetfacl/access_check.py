@@ -0,0 +1,349 @@
+import functools
+import os
+import pwd
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Hashable, Iterable
+
+import pygetfacl.acl_info_retriever as air
+import pygetfacl.bounded_cache as bc
+import pygetfacl.data_containers as dc
+import pygetfacl.name_resolver as nr
+
+# max number of directories whose ACL info / search result is held
+DEFAULT_DIRECTORY_CACHE_SIZE = 65536
+# limits of the checkers behind the module-level can_access / check_access.
+# Their callers never see the checker, so results expire on their own.
+SHARED_CHECKER_CACHE_SIZE = 4096
+SHARED_CHECKER_TTL = 5.0
+
+_MODE_CHAR_BITS = {"r": os.R_OK, "w": os.W_OK, "x": os.X_OK, "-": 0}
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    User whose access is checked, with everything needed to match them
+    against ACL entries. Names include the numeric forms, since getfacl
+    reports ids without a passwd / group entry as numbers.
+    """
+
+    uid: int
+    user_names: frozenset[str]
+    gids: tuple[int, ...]
+    group_names: frozenset[str]
+
+
+@functools.lru_cache(maxsize=4096)
+def resolve_principal(user: int | str) -> Principal:
+    """
+    Looks up a user's uid and group memberships (cached)
+    :param user: uid, user name, or uid as a string
+    :return: a :class: `Principal`
+    """
+    try:
+        if isinstance(user, int):
+            entry = pwd.getpwuid(user)
+        else:
+            entry = pwd.getpwnam(user)
+    except KeyError:
+        if isinstance(user, str) and not user.isdigit():
+            raise KeyError(f"unknown user {user!r}") from None
+        # uid without a passwd entry: no known group memberships
+        uid = int(user)
+        return Principal(
+            uid=uid,
+            user_names=frozenset([str(uid)]),
+            gids=(),
+            group_names=frozenset(),
+        )
+
+    gids = tuple(os.getgrouplist(entry.pw_name, entry.pw_gid))
+    return Principal(
+        uid=entry.pw_uid,
+        user_names=frozenset([entry.pw_name, str(entry.pw_uid)]),
+        gids=gids,
+        group_names=frozenset(
+            name for gid in gids for name in (nr.group_name(gid), str(gid))
+        ),
+    )
+
+
+def _mode_bits(mode: int | str) -> int:
+    """
+    :param mode: combination of os.R_OK / os.W_OK / os.X_OK, or a string
+    such as "r", "rw" or "r-x"
+    :return: requested permission bits (r = 4, w = 2, x = 1)
+    """
+    if isinstance(mode, int):
+        if not 0 <= mode <= 7:
+            raise ValueError(f"invalid access mode {mode!r}")
+        return mode
+    try:
+        return functools.reduce(
+            lambda bits, char: bits | _MODE_CHAR_BITS[char], mode, 0
+        )
+    except KeyError:
+        raise ValueError(f"invalid access mode {mode!r}") from None
+
+
+def _masked_bits(permission, mask) -> int:
+    return permission.bits if mask is None else permission.bits & mask.bits
+
+
+def acl_grants(
+    acl_data: dc.ACLData | dc.CompactACLData,
+    principal: Principal,
+    mode: int | str,
+    is_dir: bool = False,
+) -> bool:
+    """
+    Applies the POSIX.1e access check algorithm to one ACL: root is
+    granted read / write (and execute if the entry is a directory or any
+    execute bit is set); otherwise the first matching entry class of owner,
+    named user, group class (owning group and named groups, any of which
+    may grant), then other decides. Named user and group class entries are
+    limited by the mask.
+    :param acl_data: ACL info of the file
+    :param principal: user whose access is checked
+    :param mode: requested access (see :func: `can_access`)
+    :param is_dir: whether the file is a directory (only matters for root)
+    :return: whether access is granted
+    """
+    wanted = _mode_bits(mode)
+    mask = acl_data.mask
+
+    if principal.uid == 0:
+        if not wanted & os.X_OK or is_dir:
+            return True
+        group_class = acl_data.group if mask is None else mask
+        return any(
+            permission.x
+            for permission in (acl_data.user, group_class, acl_data.other)
+        )
+
+    if acl_data.owning_user in principal.user_names:
+        return acl_data.user.bits & wanted == wanted
+
+    special_users = acl_data.special_users
+    for name in principal.user_names:
+        permission = special_users.get(name)
+        if permission is not None:
+            return _masked_bits(permission, mask) & wanted == wanted
+
+    group_matched = False
+    if acl_data.owning_group in principal.group_names:
+        group_matched = True
+        if _masked_bits(acl_data.group, mask) & wanted == wanted:
+            return True
+    for name, permission in acl_data.special_groups.items():
+        if name in principal.group_names:
+            group_matched = True
+            if _masked_bits(permission, mask) & wanted == wanted:
+                return True
+    if group_matched:
+        return False
+
+    return acl_data.other.bits & wanted == wanted
+
+
+def _normalize(path: str | Path) -> Path:
+    return Path(os.path.abspath(air._to_path(path)))
+
+
+class AccessChecker:
+    """
+    Answers "can this user access this path" for many paths and users.
+    Access to a path also requires search (x) permission on every ancestor
+    directory, so the ACL info of each directory and each (user, directory)
+    search result is memoized: checking a million files in one directory
+    costs one evaluation per ancestor directory, not one per path
+    component. Paths are made absolute but symlinks in them are not
+    resolved. Cached results are not revalidated, so use a ttl (or clear())
+    if the tree may change while the checker is in use.
+    """
+
+    def __init__(
+        self,
+        backend: str | None = None,
+        maxsize: int = DEFAULT_DIRECTORY_CACHE_SIZE,
+        ttl: float | None = None,
+    ):
+        """
+        Constructor
+        :param backend: one of acl_info_retriever.BACKENDS. None --> module
+        default
+        :param maxsize: max number of directories held in each cache
+        :param ttl: seconds a cached directory result stays valid.
+        None --> no expiry
+        """
+        self._backend = backend
+        self._directory_acls = bc.BoundedLRUCache(maxsize, ttl=ttl)
+        self._search_results = bc.BoundedLRUCache(maxsize, ttl=ttl)
+
+    @property
+    def stats(self) -> bc.CacheStats:
+        """
+        Stats of the (user, directory) search result cache
+        """
+        return self._search_results.stats
+
+    def clear(self):
+        self._directory_acls.clear()
+        self._search_results.clear()
+
+    def _directory_acl(self, directory: Path) -> dc.ACLData:
+        acl_data = self._directory_acls.get(directory)
+        if acl_data is None:
+            acl_data = air.getfacl(directory, backend=self._backend)
+            self._directory_acls.put(directory, acl_data)
+        return acl_data
+
+    def _can_search(self, directory: Path, principal: Principal) -> bool:
+        # find the nearest ancestor with a known result, then fill in the
+        # results on the way back down
+        unknown = []
+        result = True
+        current = directory
+        while True:
+            cached = self._search_results.get((principal, current))
+            if cached is not None:
+                result = cached
+                break
+            unknown.append(current)
+            if current.parent == current:
+                break
+            current = current.parent
+
+        for current in reversed(unknown):
+            result = result and acl_grants(
+                self._directory_acl(current),
+                principal,
+                os.X_OK,
+                is_dir=True,
+            )
+            self._search_results.put((principal, current), result)
+        return result
+
+    def _check(
+        self,
+        path: Path,
+        acl_data: dc.ACLData,
+        principal: Principal,
+        wanted: int,
+    ) -> bool:
+        if path.parent != path and not self._can_search(
+            path.parent, principal
+        ):
+            return False
+        is_dir = (
+            principal.uid == 0 and wanted & os.X_OK and os.path.isdir(path)
+        )
+        return acl_grants(acl_data, principal, wanted, is_dir=is_dir)
+
+    def can_access(
+        self, path: str | Path, user: int | str, mode: int | str = "r"
+    ) -> bool:
+        """
+        See :func: `can_access`
+        """
+        path = _normalize(path)
+        return self._check(
+            path,
+            air.getfacl(path, backend=self._backend),
+            resolve_principal(user),
+            _mode_bits(mode),
+        )
+
+    def check_access(
+        self,
+        paths: Iterable[str | Path],
+        users: Iterable[int | str],
+        mode: int | str = "r",
+    ) -> dict[Path, dict[Hashable, bool]]:
+        """
+        See :func: `check_access`
+        """
+        wanted = _mode_bits(mode)
+        principals = {user: resolve_principal(user) for user in users}
+        paths = [_normalize(path) for path in paths]
+        return {
+            path: {
+                user: self._check(path, acl_data, principal, wanted)
+                for user, principal in principals.items()
+            }
+            for path, acl_data in air.iter_getfacl_many(
+                paths, backend=self._backend
+            )
+        }
+
+
+# AccessChecker isn't thread-safe, so each thread gets its own checkers
+_shared_checkers = threading.local()
+
+
+def _shared_checker(backend: str | None) -> AccessChecker:
+    checkers = getattr(_shared_checkers, "by_backend", None)
+    if checkers is None:
+        checkers = _shared_checkers.by_backend = {}
+    checker = checkers.get(backend)
+    if checker is None:
+        checker = checkers[backend] = AccessChecker(
+            backend=backend,
+            maxsize=SHARED_CHECKER_CACHE_SIZE,
+            ttl=SHARED_CHECKER_TTL,
+        )
+    return checker
+
+
+def clear_shared_cache():
+    """
+    Drops the directory results kept between calls to the module-level
+    :func: `can_access` and :func: `check_access` in the current thread
+    """
+    for checker in getattr(_shared_checkers, "by_backend", {}).values():
+        checker.clear()
+
+
+def can_access(
+    path: str | Path,
+    user: int | str,
+    mode: int | str = "r",
+    backend: str | None = None,
+) -> bool:
+    """
+    Checks whether a user is granted access to path by its ACL and by
+    search (x) permission on each of its ancestor directories. Directory
+    results are kept for SHARED_CHECKER_TTL seconds and reused by later
+    calls; use an :class: `AccessChecker` to control that
+    :param path: filepath to check
+    :param user: uid or user name
+    :param mode: requested access: a combination of os.R_OK, os.W_OK and
+    os.X_OK, or a string such as "r", "rw" or "r-x"
+    :param backend: one of acl_info_retriever.BACKENDS. None --> module
+    default
+    :return: whether access is granted
+    """
+    return _shared_checker(backend).can_access(path, user, mode)
+
+
+def check_access(
+    paths: Iterable[str | Path],
+    users: Iterable[int | str],
+    mode: int | str = "r",
+    backend: str | None = None,
+) -> dict[Path, dict[Hashable, bool]]:
+    """
+    Batch counterpart of :func: `can_access`. Ancestor directories shared by
+    the paths are only evaluated once per user, and the paths' own ACL
+    info is retrieved in batches.
+    :param paths: filepaths to check
+    :param users: uids and / or user names
+    :param mode: requested access (see :func: `can_access`)
+    :param backend: one of acl_info_retriever.BACKENDS. None --> module
+    default
+    :return: dict mapping each (absolute) path to a dict mapping each user
+    to whether access is granted
+    """
+    return _shared_checker(backend).check_access(paths, users, mode)
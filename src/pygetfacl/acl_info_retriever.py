@@ -1,6 +1,128 @@
+import errno
+import os
+import stat
+import subprocess
+from itertools import islice
 from pathlib import Path
+from typing import Callable, Iterable, Iterator
+import pygetfacl.aclpath_exceptions as ae
 import pygetfacl.data_containers as dc
+import pygetfacl.instrumentation as ins
+import pygetfacl.output_spec as osp
+import pygetfacl.parse_cache as pc
 import pygetfacl.subprocess_caller as sc
+import pygetfacl.xattr_reader as xr
+
+# "subprocess": parse output of the getfacl executable (reference behavior)
+# "xattr": decode the POSIX ACL xattrs directly (no process spawn)
+# "auto": build ACL info from os.stat for paths without ACL xattrs (most of
+# them), and only run getfacl for paths that carry an ACL
+BACKENDS = ("subprocess", "xattr", "auto")
+
+_default_backend = "subprocess"
+
+# Paths per getfacl process in batched retrieval. Keeps argv well below
+# ARG_MAX for typical path lengths.
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _validate_backend(backend: str):
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown backend {backend!r}. Must be one of {BACKENDS}"
+        )
+
+
+def _to_path(path: str | Path) -> Path:
+    if type(path) == str:
+        return Path(path)
+    elif isinstance(path, Path):
+        return path
+    else:
+        raise TypeError
+
+
+def _getfacl_options(numeric_ids: bool) -> list[str]:
+    # -E option --> don't show effective permissions
+    # (calc'ing ep based on mask easier than parsing)
+    # -n option --> numeric user / group ids (no NSS lookups)
+    return ["-E", "-n"] if numeric_ids else ["-E"]
+
+
+def _getfacl_header(path: Path) -> bytes:
+    # without -p, getfacl strips the leading "/" from absolute names
+    name = os.fsencode(path).lstrip(b"/") or b"."
+    return f"# file: {osp.escape_getfacl_name(name)}\n".encode()
+
+
+def _match_blocks_to_paths(
+    batch: list[Path], raw_output: bytes, spans: list[tuple[int, int]]
+) -> list[Path]:
+    """
+    Pairs each block of a batch's getfacl output with its path by its
+    "# file:" header, for when getfacl failed on (and printed nothing for)
+    some of the paths
+    :return: path of each block
+    """
+    headers = [_getfacl_header(path) for path in batch]
+    printed = []
+    next_idx = 0
+    for start, end in spans:
+        header = raw_output[start: raw_output.find(b"\n", start, end) + 1]
+        try:
+            match_idx = headers.index(header, next_idx)
+        except ValueError:
+            # output doesn't line up with the paths we asked for
+            raise ae.BatchOutputMismatch(len(batch), len(spans)) from None
+        printed.append(batch[match_idx])
+        next_idx = match_idx + 1
+    return printed
+
+
+def _getfacl_error(path: Path, err: ae.SubprocessException) -> OSError:
+    """
+    OSError to pass to onerror for a path getfacl failed on
+    """
+    try:
+        os.stat(path)
+    except OSError as stat_err:
+        # usually removed since it was listed
+        return stat_err
+    message = os.fsdecode(err.completed_process.stderr or b"").strip()
+    return OSError(errno.EIO, message or "getfacl failed", str(path))
+
+
+def _decode_blocks(
+    raw_output: bytes, spans: list[tuple[int, int]]
+) -> list[str]:
+    return [os.fsdecode(raw_output[start:end]) for start, end in spans]
+
+
+def _acl_data_from_stat_if_no_acl(
+    path: Path, numeric_ids: bool
+) -> dc.ACLData | None:
+    """
+    ACL info for path built from os.stat, or None if path carries an ACL
+    (and needs full retrieval)
+    """
+    st = os.stat(path)
+    if xr.has_acl_xattrs(path, is_dir=stat.S_ISDIR(st.st_mode)):
+        return None
+    return xr.acl_data_from_stat(st, numeric_ids=numeric_ids)
+
+
+def get_default_backend() -> str:
+    return _default_backend
+
+
+def set_default_backend(backend: str):
+    """
+    Sets the backend used when getfacl() is called without one
+    :param backend: one of BACKENDS
+    """
+    global _default_backend
+    _validate_backend(backend)
+    _default_backend = backend
 
 
 class _ACLInfoRetriever:
@@ -8,38 +130,412 @@ class _ACLInfoRetriever:
     Retrieves Access Control List info for its ._path data member
     """
 
-    def __init__(self, path: str | Path):
+    def __init__(
+        self,
+        path: str | Path,
+        backend: str | None = None,
+        numeric_ids: bool = False,
+        strict: bool = True,
+    ):
         """
         Constructor
         :param path: The filepath that ACL info is retrieved for
+        :param backend: one of BACKENDS. None --> use module default
+        :param numeric_ids: if True, users and groups are reported as
+        numeric ids (getfacl -n) and no names are looked up
+        :param strict: if False, getfacl output is trusted and parsed
+        without per-entry validation (see
+        :meth: `ACLData.from_getfacl_cmd_output`)
         """
-        if type(path) == str:
-            self._path = Path(path)
-        elif isinstance(path, Path):
-            self._path = path
-        else:
-            raise TypeError
+        self._path = _to_path(path)
+        self._numeric_ids = numeric_ids
+        self._strict = strict
+        if backend is None:
+            backend = _default_backend
+        _validate_backend(backend)
+        self._backend = backend
 
-    def getfacl_raw(self) -> str:
+    def _getfacl_raw_bytes(self) -> bytes:
+        # raw output is by definition the output of the getfacl executable,
+        # so always comes from the subprocess regardless of backend
         return sc.SubProcessCaller(
-            # -E option --> don't show effective permissions
-            # (calc'ing ep based on mask easier than parsing)
-            command=["getfacl", "-E", str(self._path)]
-        ).call_with_stdout_capture()
+            command=[
+                "getfacl",
+                *_getfacl_options(self._numeric_ids),
+                str(self._path),
+            ]
+        ).call_with_stdout_capture_bytes()
+
+    def getfacl_raw(self) -> str:
+        # os.fsdecode: names that aren't valid UTF-8 survive the round trip
+        return os.fsdecode(self._getfacl_raw_bytes())
 
     def getfacl(self) -> dc.ACLData:
         """
         Gets ACL info for self._path
         :return: a :class: `ACLData` object
         """
-        raw_output = self.getfacl_raw()
+        if self._backend == "xattr":
+            return xr.getfacl(self._path, numeric_ids=self._numeric_ids)
+        if self._backend == "auto":
+            acl_data = _acl_data_from_stat_if_no_acl(
+                self._path, self._numeric_ids
+            )
+            if acl_data is not None:
+                return acl_data
+
+        raw_output = self._getfacl_raw_bytes()
+
+        return dc.ACLData.from_getfacl_bytes(raw_output, strict=self._strict)
+
+
+class _MultiPathACLInfoRetriever:
+    """
+    Retrieves Access Control List info for many paths, running one getfacl
+    process per batch of paths instead of one per path
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[str | Path],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        backend: str | None = None,
+        parse_cache: pc.ParseCache | None = None,
+        numeric_ids: bool = False,
+        strict: bool = True,
+        lazy: bool = False,
+        onerror: Callable[[OSError], None] | None = None,
+    ):
+        """
+        Constructor
+        :param paths: The filepaths that ACL info is retrieved for. Consumed
+        lazily, one batch at a time.
+        :param batch_size: max number of paths passed to each getfacl call
+        :param backend: one of BACKENDS. None --> use module default
+        :param parse_cache: if given, subprocess output is parsed through
+        this cache, and shared :class: `CompactACLData` objects are returned
+        :param numeric_ids: if True, users and groups are reported as
+        numeric ids (getfacl -n) and no names are looked up
+        :param strict: if False, getfacl output is trusted and parsed
+        without per-entry validation (see
+        :meth: `ACLData.from_getfacl_cmd_output`)
+        :param lazy: if True, subprocess output isn't parsed up front:
+        :class: `LazyACLData` objects sharing each batch's output are
+        returned, and parse each field when it is first read
+        :param onerror: called with an OSError for each path whose ACL info
+        can't be retrieved (e.g. one removed since it was listed), which is
+        then skipped. None --> an exception is raised for them once the
+        other paths have been retrieved.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        if lazy and parse_cache is not None:
+            raise ValueError("lazy and parse_cache can't be combined")
+        self._paths = (_to_path(path) for path in paths)
+        self._batch_size = batch_size
+        if backend is None:
+            backend = _default_backend
+        _validate_backend(backend)
+        self._backend = backend
+        self._parse_cache = parse_cache
+        self._numeric_ids = numeric_ids
+        self._strict = strict
+        self._lazy = lazy
+        self._onerror = onerror
+        # (path, exception) for each path that failed, if no onerror
+        self._failed: list[
+            tuple[Path, OSError | ae.SubprocessException]
+        ] = []
+
+    def _batches(self) -> Iterator[list[Path]]:
+        while batch := list(islice(self._paths, self._batch_size)):
+            yield batch
+
+    def _getfacl_batch_output(
+        self, batch: list[Path]
+    ) -> tuple[bytes, list[tuple[int, int]], list[Path]]:
+        """
+        Runs getfacl for batch
+        :return: (undecoded getfacl output, (start, end) of each block in
+        it, path of each block). Paths getfacl printed nothing for are
+        missing from the last list.
+        """
+        started = ins.start()
+        try:
+            raw_output = sc.SubProcessCaller(
+                # "--" so paths starting with "-" aren't read as options
+                command=[
+                    "getfacl",
+                    *_getfacl_options(self._numeric_ids),
+                    "--",
+                    *[str(path) for path in batch],
+                ]
+            ).call_with_stdout_capture_bytes()
+            failed = False
+        except ae.SubprocessException as err:
+            # getfacl exits 1 if it fails on any path (e.g. one removed
+            # since it was listed), but still prints the others
+            raw_output = err.completed_process.stdout or b""
+            failed = True
+        spans = osp.getfacl_block_spans(raw_output)
+        if not failed and len(spans) == len(batch):
+            # getfacl reports paths in argv order, so pair blocks by
+            # position
+            printed = batch
+        else:
+            printed = _match_blocks_to_paths(batch, raw_output, spans)
+        ins.stop(
+            "batch.getfacl", started, nbytes=len(raw_output), count=len(batch)
+        )
+        return raw_output, spans, printed
+
+    def _getfacl_retry(self, path: Path) -> bytes | None:
+        """
+        Runs getfacl for a path it printed nothing for in a batch
+        :return: its output, or None if it failed again (in which case it
+        is passed to onerror, or reported once iteration is done)
+        """
+        try:
+            return _ACLInfoRetriever(
+                path, numeric_ids=self._numeric_ids
+            )._getfacl_raw_bytes()
+        except ae.SubprocessException as err:
+            self._report_failure(path, err)
+            return None
+
+    def _report_failure(
+        self, path: Path, err: OSError | ae.SubprocessException
+    ):
+        if self._onerror is None:
+            self._failed.append((path, err))
+        elif isinstance(err, OSError):
+            self._onerror(err)
+        else:
+            self._onerror(_getfacl_error(path, err))
+
+    def _add_retried(
+        self,
+        batch: list[Path],
+        results: list[tuple[Path, object]],
+        parse: Callable[[bytes, list[tuple[int, int]]], list],
+    ) -> list[tuple[Path, object]]:
+        """
+        Adds the paths of batch missing from results, retried one at a time
+        and parsed with parse(raw output, spans)
+        :return: (path, result) pairs in input order
+        """
+        found = dict(results)
+        for path in batch:
+            if path in found:
+                continue
+            raw_output = self._getfacl_retry(path)
+            if raw_output is not None:
+                [found[path]] = parse(
+                    raw_output, osp.getfacl_block_spans(raw_output)
+                )
+        return [(path, found[path]) for path in batch if path in found]
+
+    def _raise_failed(self):
+        if not self._failed:
+            return
+        failed, self._failed = self._failed, []
+        first_err = failed[0][1]
+        if isinstance(first_err, OSError):
+            raise first_err
+        # getfacl failures are reported together, like one multi-path call
+        failed = [
+            (path, err)
+            for path, err in failed
+            if isinstance(err, ae.SubprocessException)
+        ]
+        raise ae.GetFaclSubprocessException(
+            subprocess.CompletedProcess(
+                args=[
+                    "getfacl",
+                    *_getfacl_options(self._numeric_ids),
+                    "--",
+                    *[str(path) for path, _ in failed],
+                ],
+                returncode=1,
+                stdout=b"",
+                stderr=b"".join(
+                    err.completed_process.stderr or b"" for _, err in failed
+                ),
+            )
+        )
+
+    def _parse_output(
+        self, raw_output: bytes, spans: list[tuple[int, int]]
+    ) -> list[dc.ACLData | dc.CompactACLData]:
+        if self._parse_cache is not None:
+            return [
+                self._parse_cache.parse(
+                    os.fsdecode(raw_output[start:end]), strict=self._strict
+                )
+                for start, end in spans
+            ]
+        if self._lazy:
+            # decoded once per batch; the lazy objects share the text
+            cmd_output = os.fsdecode(raw_output)
+            return dc.LazyACLData.from_batch_output(
+                cmd_output, strict=self._strict
+            )
+        # the batch output is never decoded as a whole: each block's names
+        # are decoded as it is parsed, its raw text only if it is read
+        return [
+            dc.ACLData.from_getfacl_bytes(
+                raw_output, start, end, strict=self._strict
+            )
+            for start, end in spans
+        ]
+
+    def _getfacl_raw_batch(
+        self, batch: list[Path]
+    ) -> list[tuple[Path, str]]:
+        raw_output, spans, printed = self._getfacl_batch_output(batch)
+        results = list(zip(printed, _decode_blocks(raw_output, spans)))
+        if len(printed) < len(batch):
+            results = self._add_retried(batch, results, _decode_blocks)
+        return results
+
+    def _parse_batch(
+        self, batch: list[Path]
+    ) -> list[tuple[Path, dc.ACLData | dc.CompactACLData]]:
+        raw_output, spans, printed = self._getfacl_batch_output(batch)
+        results = list(zip(printed, self._parse_output(raw_output, spans)))
+        if len(printed) < len(batch):
+            results = self._add_retried(batch, results, self._parse_output)
+        return results
+
+    def iter_getfacl_raw(self) -> Iterator[tuple[Path, str]]:
+        for batch in self._batches():
+            yield from self._getfacl_raw_batch(batch)
+        self._raise_failed()
+
+    def iter_getfacl(
+        self,
+    ) -> Iterator[tuple[Path, dc.ACLData | dc.CompactACLData]]:
+        """
+        Gets ACL info for each path, in input order. Paths that fail are
+        passed to onerror, or (by default) reported once the others have
+        been yielded.
+        :raises GetFaclSubprocessException: if getfacl failed on some of the
+        paths and no onerror was given
+        :raises OSError: if a path couldn't be stat'ed or its xattrs read
+        (xattr and auto backends) and no onerror was given
+        :return: iterator of (path, :class: `ACLData`) pairs
+        """
+        if self._backend == "xattr":
+            for path in self._paths:
+                try:
+                    acl_data = xr.getfacl(path, numeric_ids=self._numeric_ids)
+                except OSError as err:
+                    self._report_failure(path, err)
+                    continue
+                yield path, acl_data
+        elif self._backend == "auto":
+            yield from self._iter_getfacl_auto()
+        else:
+            for batch in self._batches():
+                yield from self._parse_batch(batch)
+        self._raise_failed()
+
+    def _iter_getfacl_auto(
+        self,
+    ) -> Iterator[tuple[Path, dc.ACLData | dc.CompactACLData]]:
+        """
+        iter_getfacl() for the "auto" backend: paths without ACL xattrs are
+        answered from os.stat, and only the rest of each batch is passed
+        to getfacl
+        """
+        for batch in self._batches():
+            # (path, ACL info from os.stat or None) of each path that could
+            # be stat'ed
+            checked = []
+            for path in batch:
+                try:
+                    acl_data = _acl_data_from_stat_if_no_acl(
+                        path, self._numeric_ids
+                    )
+                except OSError as err:
+                    self._report_failure(path, err)
+                    continue
+                checked.append((path, acl_data))
+            with_acl = [
+                path for path, acl_data in checked if acl_data is None
+            ]
+            ins.increment(
+                "auto.stat_only", count=len(checked) - len(with_acl)
+            )
+            if with_acl:
+                parsed = dict(self._parse_batch(with_acl))
+                checked = [
+                    (path, parsed.get(path) if acl_data is None else acl_data)
+                    for path, acl_data in checked
+                ]
+            yield from (
+                (path, acl_data)
+                for path, acl_data in checked
+                if acl_data is not None
+            )
+
+
+def getfacl_raw(path: str | Path, numeric_ids: bool = False) -> str:
+    return _ACLInfoRetriever(path, numeric_ids=numeric_ids).getfacl_raw()
+
 
-        return dc.ACLData.from_getfacl_cmd_output(raw_output)
+def getfacl(
+    path: str | Path,
+    backend: str | None = None,
+    numeric_ids: bool = False,
+    strict: bool = True,
+) -> dc.ACLData:
+    return _ACLInfoRetriever(
+        path, backend=backend, numeric_ids=numeric_ids, strict=strict
+    ).getfacl()
 
 
-def getfacl_raw(path: str | Path) -> str:
-    return _ACLInfoRetriever(path).getfacl_raw()
+def iter_getfacl_many(
+    paths: Iterable[str | Path],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    backend: str | None = None,
+    parse_cache: pc.ParseCache | None = None,
+    numeric_ids: bool = False,
+    strict: bool = True,
+    lazy: bool = False,
+    onerror: Callable[[OSError], None] | None = None,
+) -> Iterator[tuple[Path, dc.ACLData | dc.CompactACLData]]:
+    return _MultiPathACLInfoRetriever(
+        paths,
+        batch_size=batch_size,
+        backend=backend,
+        parse_cache=parse_cache,
+        numeric_ids=numeric_ids,
+        strict=strict,
+        lazy=lazy,
+        onerror=onerror,
+    ).iter_getfacl()
 
 
-def getfacl(path: str | Path) -> dc.ACLData:
-    return _ACLInfoRetriever(path).getfacl()
+def getfacl_many(
+    paths: Iterable[str | Path],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    backend: str | None = None,
+    parse_cache: pc.ParseCache | None = None,
+    numeric_ids: bool = False,
+    strict: bool = True,
+    lazy: bool = False,
+    onerror: Callable[[OSError], None] | None = None,
+) -> dict[Path, dc.ACLData | dc.CompactACLData]:
+    return dict(
+        iter_getfacl_many(
+            paths,
+            batch_size=batch_size,
+            backend=backend,
+            parse_cache=parse_cache,
+            numeric_ids=numeric_ids,
+            strict=strict,
+            lazy=lazy,
+            onerror=onerror,
+        )
+    )
@@ -0,0 +1,365 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pygetfacl.acl_info_retriever as air
+import pygetfacl.aclpath_exceptions as ae
+import pygetfacl.data_containers as dc
+import pygetfacl.tree_scanner as ts
+
+# from linux/inotify.h
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_WATCH_MASK = (
+    IN_ATTRIB
+    | IN_CREATE
+    | IN_DELETE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+    | IN_DONT_FOLLOW
+)
+
+# struct inotify_event header: wd, mask, cookie, len (name follows)
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+
+def _load_libc() -> ctypes.CDLL:
+    libc = ctypes.CDLL(
+        ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+    )
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_uint32,
+    ]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+def _check_call(result: int, path: Path | None = None) -> int:
+    if result < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err), path)
+    return result
+
+
+@dataclass(frozen=True)
+class ACLChangeEvent:
+    """
+    Change to the ACL info of a watched path. old is None for paths that
+    appeared, new is None for paths that disappeared.
+    """
+
+    path: Path
+    old: dc.ACLData | None
+    new: dc.ACLData | None
+
+
+class ACLWatcher:
+    """
+    Keeps the ACL info of every path in a directory tree up to date using
+    Linux inotify. After the initial scan, ACL info is only re-read for
+    paths whose attributes changed, so get() is a dict lookup that never
+    stats or polls. If the kernel event queue overflows, the whole tree is
+    rescanned.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        callback: Callable[[ACLChangeEvent], None] | None = None,
+        backend: str | None = None,
+    ):
+        """
+        Constructor. Sets up watches and scans the tree.
+        :param root: directory at the top of the watched tree
+        :param callback: called with each :class: `ACLChangeEvent` found by
+        poll()
+        :param backend: one of acl_info_retriever.BACKENDS. None --> module
+        default
+        """
+        self._root = air._to_path(root)
+        self._callback = callback
+        self._backend = backend
+        self._libc = _load_libc()
+        self._fd = _check_call(
+            self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        )
+        self._dirs_by_wd: dict[int, Path] = {}
+        self._wds_by_dir: dict[Path, int] = {}
+        self._acls: dict[Path, dc.ACLData] = self._scan(self._root)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def get(self, path: str | Path) -> dc.ACLData | None:
+        """
+        Current ACL info for a watched path, or None if path isn't in the
+        watched tree. Call poll() first to apply pending changes.
+        """
+        return self._acls.get(air._to_path(path))
+
+    def __len__(self):
+        return len(self._acls)
+
+    def _add_watch(self, dir_path: Path):
+        try:
+            wd = _check_call(
+                self._libc.inotify_add_watch(
+                    self._fd, os.fsencode(dir_path), _WATCH_MASK
+                ),
+                dir_path,
+            )
+        except (FileNotFoundError, NotADirectoryError):
+            # removed before we got to it; the delete event covers it
+            return
+        # a directory that is still watched under another path (it was
+        # moved) gets its existing wd back
+        old_path = self._dirs_by_wd.get(wd)
+        if old_path is not None:
+            self._wds_by_dir.pop(old_path, None)
+        self._dirs_by_wd[wd] = dir_path
+        self._wds_by_dir[dir_path] = wd
+
+    def _forget_watch(self, wd: int):
+        dir_path = self._dirs_by_wd.pop(wd, None)
+        if dir_path is not None and self._wds_by_dir.get(dir_path) == wd:
+            del self._wds_by_dir[dir_path]
+
+    def _scan(self, top: Path) -> dict[Path, dc.ACLData]:
+        """
+        Adds watches for all directories under top (inclusive) and reads
+        the ACL info of every path. Each directory's watch is added as the
+        walk reaches it, before its entries are listed, and ACL info is
+        only read once the walk is done, so changes that race with the
+        scan still produce events.
+        """
+        paths = []
+        for path in ts._walk(top):
+            if path.is_dir() and not path.is_symlink():
+                self._add_watch(path)
+            paths.append(path)
+        return self._read_many(paths)
+
+    def _read(self, path: Path) -> dc.ACLData | None:
+        try:
+            return air.getfacl(path, backend=self._backend)
+        except (OSError, ae.SubprocessException):
+            return None
+
+    def _read_many(self, paths: list[Path]) -> dict[Path, dc.ACLData]:
+        """
+        ACL info of each of paths that still exists
+        """
+        found = {}
+        try:
+            for path, acl_data in air.iter_getfacl_many(
+                paths, backend=self._backend
+            ):
+                found[path] = acl_data
+        except (OSError, ae.SubprocessException):
+            # a path in the failed batch is gone (its delete event is
+            # pending); read the rest one at a time
+            for path in paths:
+                if path not in found:
+                    acl_data = self._read(path)
+                    if acl_data is not None:
+                        found[path] = acl_data
+            found = {path: found[path] for path in paths if path in found}
+        return found
+
+    def _drop_subtree(
+        self, top: Path, keep_top: bool = False
+    ) -> dict[Path, dc.ACLData]:
+        """
+        Forgets the ACL info of, and removes the watches on, everything
+        under top (and top itself unless keep_top)
+        :return: ACL info that was dropped, by path
+        """
+
+        def in_subtree(path: Path) -> bool:
+            return top in path.parents or (path == top and not keep_top)
+
+        removed = {
+            path: acl_data
+            for path, acl_data in self._acls.items()
+            if in_subtree(path)
+        }
+        for path in removed:
+            del self._acls[path]
+        # a directory moved out of the tree keeps sending events, which
+        # would be reported under its old path
+        for dir_path, wd in list(self._wds_by_dir.items()):
+            if in_subtree(dir_path):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                self._forget_watch(wd)
+        return removed
+
+    def _read_events(self) -> Iterator[tuple[int, int, str]]:
+        while True:
+            try:
+                buffer = os.read(self._fd, _READ_SIZE)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, name_len = _EVENT_HEADER.unpack_from(
+                    buffer, offset
+                )
+                offset += _EVENT_HEADER.size
+                name = buffer[offset: offset + name_len].rstrip(b"\0")
+                offset += name_len
+                yield wd, mask, os.fsdecode(name)
+
+    def _rescan(self) -> list[ACLChangeEvent]:
+        for wd in list(self._dirs_by_wd):
+            self._libc.inotify_rm_watch(self._fd, wd)
+        self._dirs_by_wd.clear()
+        self._wds_by_dir.clear()
+        old_acls = self._acls
+        try:
+            self._acls = self._scan(self._root)
+        except OSError:
+            # root itself is gone
+            self._acls = {}
+        events = [
+            ACLChangeEvent(path=path, old=old_acls.get(path), new=acl_data)
+            for path, acl_data in self._acls.items()
+            if old_acls.get(path) != acl_data
+        ]
+        events.extend(
+            ACLChangeEvent(path=path, old=acl_data, new=None)
+            for path, acl_data in old_acls.items()
+            if path not in self._acls
+        )
+        return events
+
+    def _apply_change(
+        self, path: Path, present: bool
+    ) -> list[ACLChangeEvent]:
+        if not present:
+            return [
+                ACLChangeEvent(path=gone, old=acl_data, new=None)
+                for gone, acl_data in self._drop_subtree(path).items()
+            ]
+
+        gone = {}
+        if (
+            path not in self._wds_by_dir
+            and path.is_dir()
+            and not path.is_symlink()
+        ):
+            # directory without a live watch: new, or it replaced what was
+            # here within one poll. Its contents may predate its watch.
+            gone = self._drop_subtree(path, keep_top=True)
+            try:
+                found = self._scan(path)
+            except OSError:
+                # gone again (its delete event is pending)
+                found = {}
+        else:
+            new = self._read(path)
+            found = {} if new is None else {path: new}
+
+        events = [
+            ACLChangeEvent(path=gone_path, old=acl_data, new=None)
+            for gone_path, acl_data in gone.items()
+            if gone_path not in found
+        ]
+        for gone_path, acl_data in gone.items():
+            # old is reported below for paths that are back
+            if gone_path in found:
+                self._acls[gone_path] = acl_data
+        for found_path, acl_data in found.items():
+            old = self._acls.get(found_path)
+            if acl_data != old:
+                self._acls[found_path] = acl_data
+                events.append(
+                    ACLChangeEvent(path=found_path, old=old, new=acl_data)
+                )
+        return events
+
+    def poll(self, timeout: float | None = 0) -> list[ACLChangeEvent]:
+        """
+        Applies pending inotify events to the ACL info held by the watcher.
+        Several events for the same path are coalesced into one re-read.
+        :param timeout: seconds to wait for events. None --> block until at
+        least one arrives
+        :return: list of :class: `ACLChangeEvent` for paths whose ACL info
+        changed (each one is also passed to the callback)
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+
+        # path --> True if it may have appeared or changed, False if gone
+        touched: dict[Path, bool] = {}
+        overflowed = False
+        for wd, mask, name in self._read_events():
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self._forget_watch(wd)
+                continue
+            dir_path = self._dirs_by_wd.get(wd)
+            if dir_path is None:
+                continue
+            path = dir_path / name if name else dir_path
+            touched[path] = not (
+                mask
+                & (IN_DELETE | IN_MOVED_FROM | IN_DELETE_SELF | IN_MOVE_SELF)
+            )
+
+        if overflowed:
+            events = self._rescan()
+        else:
+            events = []
+            for path, present in touched.items():
+                events.extend(self._apply_change(path, present))
+
+        if self._callback is not None:
+            for event in events:
+                self._callback(event)
+        return events
+
+    def events(self) -> Iterator[ACLChangeEvent]:
+        """
+        Blocks waiting for changes and yields them as they happen
+        """
+        while self._fd >= 0:
+            yield from self.poll(timeout=None)
@@ -101,3 +101,69 @@ class SpecialPermissionsParsingError(Exception):
 
     def __str__(self):
         return self.msg
+
+
+class InvalidPosixACLXattr(Exception):
+    def __init__(self, attribute_name: str, num_bytes: int, reason: str):
+        self.attribute_name = attribute_name
+        self.num_bytes = num_bytes
+        self.reason = reason
+
+    @property
+    def msg(self):
+        return (
+            f"Could not decode {self.num_bytes} byte extended attribute"
+            f" {self.attribute_name}: {self.reason}"
+        )
+
+    def __str__(self):
+        return self.msg
+
+
+class BatchOutputMismatch(Exception):
+    def __init__(self, num_paths: int, num_blocks: int):
+        self.num_paths = num_paths
+        self.num_blocks = num_blocks
+
+    @property
+    def msg(self):
+        return (
+            f"getfacl was given {self.num_paths} paths but returned"
+            f" {self.num_blocks} ACL blocks"
+        )
+
+    def __str__(self):
+        return self.msg
+
+
+class CoprocessExited(Exception):
+    def __init__(
+        self, command: list[str], returncode: int | None, stderr: str
+    ):
+        self.command = command
+        self.returncode = returncode
+        self.stderr = stderr
+
+    @property
+    def msg(self):
+        return (
+            "Co-process exited unexpectedly.\nCo-process args:"
+            f" {self.command}\nReturn code: {self.returncode}\n"
+            f"Standard error: {self.stderr}"
+        )
+
+    def __str__(self):
+        return self.msg
+
+
+class InvalidSnapshotFile(Exception):
+    def __init__(self, file_path: str, reason: str):
+        self.file_path = file_path
+        self.reason = reason
+
+    @property
+    def msg(self):
+        return f"{self.file_path} is not a valid ACL snapshot: {self.reason}"
+
+    def __str__(self):
+        return self.msg
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import subprocess
+from pathlib import Path
+from typing import Iterable
+
+import pygetfacl.acl_info_retriever as air
+import pygetfacl.aclpath_exceptions as ae
+import pygetfacl.data_containers as dc
+import pygetfacl.xattr_reader as xr
+
+# max number of getfacl processes agetfacl_many runs at once
+DEFAULT_CONCURRENCY = 16
+
+
+async def _run_getfacl(
+    command: list[str], timeout: float | None = None
+) -> str:
+    """
+    Runs command without blocking the event loop. If the call times out or
+    the awaiting task is cancelled, the child process is killed and reaped
+    before the exception propagates.
+    :return: string obtained from subprocess standard out
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(), timeout=timeout
+        )
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    if process.returncode != 0:
+        raise ae.GetFaclSubprocessException(
+            subprocess.CompletedProcess(
+                args=command,
+                returncode=process.returncode,
+                stdout=stdout,
+                stderr=stderr,
+            )
+        )
+    return os.fsdecode(stdout)
+
+
+async def agetfacl_raw(
+    path: str | Path,
+    timeout: float | None = None,
+    numeric_ids: bool = False,
+) -> str:
+    """
+    Async counterpart of :func: `getfacl_raw`
+    :param path: filepath that ACL info is retrieved for
+    :param timeout: seconds to wait for getfacl before killing it and
+    raising asyncio.TimeoutError. None --> wait indefinitely
+    :param numeric_ids: if True, report numeric user / group ids
+    (getfacl -n)
+    """
+    return await _run_getfacl(
+        [
+            "getfacl",
+            *air._getfacl_options(numeric_ids),
+            "--",
+            str(air._to_path(path)),
+        ],
+        timeout=timeout,
+    )
+
+
+async def agetfacl(
+    path: str | Path,
+    backend: str | None = None,
+    timeout: float | None = None,
+    numeric_ids: bool = False,
+    strict: bool = True,
+) -> dc.ACLData:
+    """
+    Async counterpart of :func: `getfacl`
+    :param path: filepath that ACL info is retrieved for
+    :param backend: one of acl_info_retriever.BACKENDS. None --> module
+    default. The xattr backend only makes a few fast syscalls, so it runs
+    directly on the event loop, as does the auto backend's check for an
+    ACL.
+    :param timeout: seconds to wait for getfacl before killing it and
+    raising asyncio.TimeoutError. None --> wait indefinitely
+    :param numeric_ids: if True, report numeric user / group ids
+    (getfacl -n) without looking up names
+    :param strict: if False, getfacl output is trusted and parsed without
+    per-entry validation (see :meth: `ACLData.from_getfacl_cmd_output`)
+    :return: a :class: `ACLData` object
+    """
+    if backend is None:
+        backend = air.get_default_backend()
+    air._validate_backend(backend)
+    if backend == "xattr":
+        return xr.getfacl(path, numeric_ids=numeric_ids)
+    if backend == "auto":
+        acl_data = air._acl_data_from_stat_if_no_acl(
+            air._to_path(path), numeric_ids
+        )
+        if acl_data is not None:
+            return acl_data
+    raw_output = await agetfacl_raw(
+        path, timeout=timeout, numeric_ids=numeric_ids
+    )
+    return dc.ACLData.from_getfacl_cmd_output(raw_output, strict=strict)
+
+
+async def agetfacl_many(
+    paths: Iterable[str | Path],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    backend: str | None = None,
+    timeout: float | None = None,
+    numeric_ids: bool = False,
+    strict: bool = True,
+) -> dict[Path, dc.ACLData]:
+    """
+    Retrieves ACL info for many paths with at most concurrency getfacl
+    processes in flight. If any retrieval fails, the others are cancelled
+    (killing their processes) and the exception propagates.
+    :param paths: filepaths that ACL info is retrieved for
+    :param concurrency: max number of simultaneous getfacl processes
+    :param backend: one of acl_info_retriever.BACKENDS. None --> module
+    default
+    :param timeout: per-path timeout in seconds. None --> no timeout
+    :param numeric_ids: if True, report numeric user / group ids
+    :param strict: as in :func: `agetfacl`
+    :return: dict mapping each path to its :class: `ACLData`, in input order
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+    paths = [air._to_path(path) for path in paths]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded_agetfacl(path: Path) -> dc.ACLData:
+        async with semaphore:
+            return await agetfacl(
+                path,
+                backend=backend,
+                timeout=timeout,
+                numeric_ids=numeric_ids,
+                strict=strict,
+            )
+
+    tasks = [asyncio.ensure_future(bounded_agetfacl(path)) for path in paths]
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # let cancelled tasks kill and reap their processes
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return dict(zip(paths, results))
@@ -0,0 +1,104 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class BoundedLRUCache:
+    """
+    Dict-like cache that holds at most maxsize entries, evicting the least
+    recently used one when full, and optionally expiring entries ttl seconds
+    after they were stored. Not thread-safe.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Constructor
+        :param maxsize: max number of entries
+        :param ttl: seconds an entry stays valid. None --> no expiry
+        :param clock: time source for ttl
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be > 0")
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._clock = clock
+        # key --> (value, expiry time or None)
+        self._entries = OrderedDict()
+        self.stats = CacheStats()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable):
+        return key in self._entries
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    def get(
+        self,
+        key: Hashable,
+        default: Any = None,
+        is_valid: Callable[[Any], bool] | None = None,
+    ) -> Any:
+        """
+        Looks up key, counting a hit or miss and marking key as most
+        recently used. Expired entries, and entries for which is_valid(value)
+        is False, are dropped and count as misses.
+        """
+        try:
+            value, expires_at = self._entries[key]
+        except KeyError:
+            self.stats.misses += 1
+            return default
+        if expires_at is not None and self._clock() >= expires_at:
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return default
+        if is_valid is not None and not is_valid(value):
+            del self._entries[key]
+            self.stats.invalidations += 1
+            self.stats.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        expires_at = None if self._ttl is None else self._clock() + self._ttl
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        if self._entries.pop(key, None) is not None:
+            self.stats.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,296 @@
+import array
+from pathlib import Path
+from typing import Iterable
+
+import pygetfacl.data_containers as dc
+
+# permission / flag bits, as in PermissionSetting.bits and FlagSetting.bits
+R, W, X = 4, 2, 1
+SETUID, SETGID, STICKY = 4, 2, 1
+# stored in a permission column when the entry is absent (e.g. no mask).
+# Shares no bits with r / w / x, so bit tests treat it as "grants nothing".
+ABSENT = 8
+
+PERMISSION_COLUMNS = (
+    "user",
+    "group",
+    "mask",
+    "other",
+    "default_user",
+    "default_group",
+    "default_mask",
+    "default_other",
+)
+# named entry field --> True if names are user names, False for groups
+NAMED_ENTRY_COLUMNS = {
+    "special_users": True,
+    "special_groups": False,
+    "default_special_users": True,
+    "default_special_groups": False,
+}
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as err:
+        raise ImportError(
+            "columnar export requires numpy "
+            "(pip install pygetfacl[columnar])"
+        ) from err
+    return numpy
+
+
+class _NameTable:
+    def __init__(self):
+        self.names: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+class _NamedEntries:
+    """
+    CSR-style layout of one named entry field: the entries of row i are
+    name_codes[indptr[i]:indptr[i + 1]] and perms[indptr[i]:indptr[i + 1]]
+    """
+
+    def __init__(self, indptr, name_codes, perms):
+        self.indptr = indptr
+        self.name_codes = name_codes
+        self.perms = perms
+
+
+class ColumnarACLTable:
+    """
+    Column-oriented copy of many (path, ACL info) results, for vectorized
+    queries over millions of rows. Each permission entry is a uint8 NumPy
+    array of PermissionSetting bits (ABSENT where the entry doesn't exist),
+    flags is a uint8 array of FlagSetting bits (0 where there is no
+    "# flags:" line), owners are int32 codes into user_names / group_names,
+    and named entries are stored in CSR form. Requires numpy.
+    """
+
+    def __init__(
+        self,
+        paths: list[Path],
+        columns: dict,
+        owning_user_codes,
+        owning_group_codes,
+        named_entries: dict[str, _NamedEntries],
+        user_names: list[str],
+        group_names: list[str],
+    ):
+        self.paths = paths
+        self._columns = columns
+        self.owning_user_codes = owning_user_codes
+        self.owning_group_codes = owning_group_codes
+        self._named_entries = named_entries
+        self.user_names = user_names
+        self.group_names = group_names
+        self._user_codes = {name: idx for idx, name in enumerate(user_names)}
+        self._group_codes = {
+            name: idx for idx, name in enumerate(group_names)
+        }
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getattr__(self, name):
+        # permission and flag columns, e.g. table.other
+        columns = self.__dict__.get("_columns", {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    @classmethod
+    def from_results(
+        cls,
+        results: Iterable[tuple[Path, dc.ACLData | dc.CompactACLData]],
+    ):
+        """
+        Builds a table from (path, ACL info) pairs, e.g. the output of
+        getfacl_tree(). Results are consumed in one pass and accumulated in
+        compact arrays, so the input can be a lazy stream.
+        :param results: iterable of (path, ACLData / CompactACLData)
+        :return: a :class: `ColumnarACLTable`
+        """
+        np = _import_numpy()
+        user_table = _NameTable()
+        group_table = _NameTable()
+        paths = []
+        columns = {name: array.array("B") for name in PERMISSION_COLUMNS}
+        flags = array.array("B")
+        owning_user_codes = array.array("i")
+        owning_group_codes = array.array("i")
+        # field --> (indptr, name codes, permission bits)
+        named = {
+            field_name: (
+                array.array("q", [0]),
+                array.array("i"),
+                array.array("B"),
+            )
+            for field_name in NAMED_ENTRY_COLUMNS
+        }
+
+        for path, acl_data in results:
+            paths.append(path)
+            for name, column in columns.items():
+                permission = getattr(acl_data, name)
+                column.append(
+                    ABSENT if permission is None else permission.bits
+                )
+            flags.append(0 if acl_data.flags is None else acl_data.flags.bits)
+            owning_user_codes.append(user_table.code(acl_data.owning_user))
+            owning_group_codes.append(
+                group_table.code(acl_data.owning_group)
+            )
+            for field_name, is_user in NAMED_ENTRY_COLUMNS.items():
+                indptr, name_codes, perms = named[field_name]
+                table = user_table if is_user else group_table
+                entries = getattr(acl_data, field_name)
+                for entry_name, permission in entries.items():
+                    name_codes.append(table.code(entry_name))
+                    perms.append(permission.bits)
+                indptr.append(len(name_codes))
+
+        np_columns = {
+            name: np.array(column, dtype=np.uint8)
+            for name, column in columns.items()
+        }
+        np_columns["flags"] = np.array(flags, dtype=np.uint8)
+        return cls(
+            paths=paths,
+            columns=np_columns,
+            owning_user_codes=np.array(
+                owning_user_codes, dtype=np.int32
+            ),
+            owning_group_codes=np.array(
+                owning_group_codes, dtype=np.int32
+            ),
+            named_entries={
+                field_name: _NamedEntries(
+                    indptr=np.array(indptr, dtype=np.int64),
+                    name_codes=np.array(name_codes, dtype=np.int32),
+                    perms=np.array(perms, dtype=np.uint8),
+                )
+                for field_name, (indptr, name_codes, perms) in named.items()
+            },
+            user_names=user_table.names,
+            group_names=group_table.names,
+        )
+
+    def named_entries(self, field_name: str) -> _NamedEntries:
+        """
+        :param field_name: one of NAMED_ENTRY_COLUMNS
+        :return: object with indptr, name_codes and perms arrays
+        """
+        return self._named_entries[field_name]
+
+    def effective_mask(self, default: bool = False):
+        """
+        :param default: if True, use the default ACL mask
+        :return: uint8 array of mask bits, 7 (rwx) where there is no mask
+        """
+        np = _import_numpy()
+        mask = self._columns["default_mask" if default else "mask"]
+        return np.where(mask == ABSENT, np.uint8(7), mask)
+
+    def has_bits(self, column: str, bits: int):
+        """
+        :param column: permission or flag column name
+        :param bits: combination of R / W / X (or SETUID / SETGID / STICKY)
+        :return: bool array, True where column has all of bits
+        """
+        return (self._columns[column] & bits) == bits
+
+    def effective(self, column: str):
+        """
+        :param column: "group" or "default_group" (other columns aren't
+        limited by a mask and are returned as they are)
+        :return: uint8 array of permission bits after applying the mask
+        """
+        np = _import_numpy()
+        values = self._columns[column]
+        if column not in ("group", "default_group"):
+            return values
+        masked = values & self.effective_mask(
+            default=column.startswith("default_")
+        )
+        return np.where(values == ABSENT, values, masked)
+
+    def mask_hides(self, column: str = "group", bits: int = W):
+        """
+        :return: bool array, True where column grants bits but the mask
+        takes (some of) them away
+        """
+        return self.has_bits(column, bits) & (
+            (self.effective(column) & bits) != bits
+        )
+
+    def named_grants(
+        self,
+        field_name: str,
+        name: str,
+        bits: int,
+        effective: bool = True,
+    ):
+        """
+        :param field_name: one of NAMED_ENTRY_COLUMNS
+        :param name: user or group name (as stored in the ACL info)
+        :param bits: combination of R / W / X
+        :param effective: if True, apply the (default) mask first
+        :return: bool array, True where name has an entry granting bits
+        """
+        np = _import_numpy()
+        result = np.zeros(len(self), dtype=bool)
+        codes = (
+            self._user_codes
+            if NAMED_ENTRY_COLUMNS[field_name]
+            else self._group_codes
+        )
+        code = codes.get(name)
+        if code is None:
+            return result
+        entries = self._named_entries[field_name]
+        rows = np.repeat(
+            np.arange(len(self), dtype=np.int64), np.diff(entries.indptr)
+        )
+        perms = entries.perms
+        if effective:
+            mask = self.effective_mask(
+                default=field_name.startswith("default_")
+            )
+            perms = perms & mask[rows]
+        hits = (entries.name_codes == code) & ((perms & bits) == bits)
+        result[rows[hits]] = True
+        return result
+
+    def owned_by(self, user: str):
+        """
+        :return: bool array, True where user is the owning user
+        """
+        code = self._user_codes.get(user, -1)
+        return self.owning_user_codes == code
+
+    def select(self, selection) -> list[Path]:
+        """
+        :param selection: bool array (e.g. from has_bits())
+        :return: paths of the selected rows
+        """
+        np = _import_numpy()
+        return [self.paths[idx] for idx in np.flatnonzero(selection)]
+
+
+def to_columnar(
+    results: Iterable[tuple[Path, dc.ACLData | dc.CompactACLData]],
+) -> ColumnarACLTable:
+    """
+    Shortcut for :meth: `ColumnarACLTable.from_results`
+    """
+    return ColumnarACLTable.from_results(results)
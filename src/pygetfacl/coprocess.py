@@ -0,0 +1,326 @@
+import collections
+import contextlib
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import pygetfacl.acl_info_retriever as air
+import pygetfacl.aclpath_exceptions as ae
+import pygetfacl.data_containers as dc
+import pygetfacl.instrumentation as ins
+import pygetfacl.output_spec as osp
+import pygetfacl.subprocess_caller as sc
+
+# Sent after every request. Its block marks the end of the response, so
+# paths that getfacl fails on (and prints nothing for) can't stall a read.
+_SENTINEL_PATH = "/"
+_STDERR_LINES_KEPT = 100
+
+
+def _coprocess_command() -> list[str]:
+    # getfacl reads file names from stdin when given "-". Its stdout is a
+    # pipe, so stdbuf is needed to make it flush after every line rather
+    # than every 4 KiB. -p keeps "# file:" headers identical to the paths
+    # we send.
+    command = ["getfacl", "-E", "-p", "-"]
+    if shutil.which("stdbuf") is None:
+        raise FileNotFoundError(
+            "getfacl co-processes require stdbuf (GNU coreutils)"
+        )
+    return ["stdbuf", "-oL", *command]
+
+
+class GetFaclCoprocess:
+    """
+    Long-lived `getfacl -E -p -` child that is fed paths over stdin and
+    whose "# file:"-delimited output is parsed as it arrives. Process
+    startup is paid once, and since paths never go through argv there is no
+    ARG_MAX limit on request size. Not thread-safe; use
+    :class: `GetFaclCoprocessPool` to share co-processes between threads.
+    """
+
+    def __init__(self):
+        self._command = _coprocess_command()
+        self._process = sc.SubProcessCaller(
+            command=self._command
+        ).start_with_pipes()
+        self._stderr_lines = collections.deque(maxlen=_STDERR_LINES_KEPT)
+        # set when output can no longer be trusted to line up with requests
+        self._broken = False
+        self._stderr_reader = threading.Thread(
+            target=self._drain_stderr, daemon=True
+        )
+        self._stderr_reader.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _drain_stderr(self):
+        for line in self._process.stderr:
+            self._stderr_lines.append(line.decode("utf-8", "replace"))
+
+    def is_alive(self) -> bool:
+        return not self._broken and self._process.poll() is None
+
+    def close(self):
+        if self._process.stdin and not self._process.stdin.closed:
+            with contextlib.suppress(OSError):
+                self._process.stdin.close()
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._process.stdout.close()
+
+    def _exited(self) -> ae.CoprocessExited:
+        self._broken = True
+        return ae.CoprocessExited(
+            self._command,
+            self._process.poll(),
+            "".join(self._stderr_lines),
+        )
+
+    def _write_paths(self, paths: list[str]):
+        try:
+            self._process.stdin.write(
+                b"".join(os.fsencode(path) + b"\n" for path in paths)
+            )
+            self._process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            # reader sees EOF and raises CoprocessExited
+            pass
+
+    def _read_block(self) -> str:
+        # time spent waiting on the co-process for one path's output
+        started = ins.start()
+        lines = []
+        while True:
+            line = self._process.stdout.readline()
+            if not line:
+                raise self._exited()
+            if line == b"\n" and lines:
+                lines.append(line)
+                block = b"".join(lines)
+                ins.stop("coprocess.read", started, nbytes=len(block))
+                return os.fsdecode(block)
+            lines.append(line)
+
+    def _match_header(
+        self, block: str, headers: list[str], next_idx: int
+    ) -> int:
+        header = block[: block.find("\n") + 1]
+        for idx in range(next_idx, len(headers)):
+            if headers[idx] == header:
+                return idx
+        # output doesn't belong to this request; the stream can't be trusted
+        self._process.kill()
+        raise self._exited()
+
+    def iter_getfacl_raw(
+        self, paths: Iterable[str | Path]
+    ) -> Iterator[tuple[Path, str]]:
+        """
+        Gets raw getfacl output for each path, in input order, as it arrives
+        :raises GetFaclSubprocessException: (after the whole request has
+        been read) if getfacl reported nothing for some of the paths
+        :raises CoprocessExited: if the co-process died
+        :return: iterator of (path, raw getfacl output) pairs
+        """
+        paths = [air._to_path(path) for path in paths]
+        names = [str(path) for path in paths]
+        if any("\n" in name for name in names):
+            raise ValueError("paths sent to a co-process can't contain \\n")
+        requested = [*names, _SENTINEL_PATH]
+        headers = [
+            f"# file: {osp.escape_getfacl_name(name)}\n" for name in requested
+        ]
+
+        # written from a thread: with a large request, getfacl stops
+        # reading stdin until we drain its stdout
+        writer = threading.Thread(
+            target=self._write_paths, args=(requested,), daemon=True
+        )
+        writer.start()
+
+        failed = []
+        next_idx = 0
+        try:
+            while next_idx <= len(paths):
+                block = self._read_block()
+                match_idx = self._match_header(block, headers, next_idx)
+                # getfacl prints nothing for paths it fails on
+                failed.extend(paths[next_idx:match_idx])
+                next_idx = match_idx + 1
+                if match_idx < len(paths):
+                    yield paths[match_idx], block
+        finally:
+            # a caller that stops iterating early still has to leave the
+            # output stream at a request boundary
+            while not self._broken and next_idx <= len(paths):
+                block = self._read_block()
+                next_idx = self._match_header(block, headers, next_idx) + 1
+            writer.join()
+
+        if failed:
+            raise ae.GetFaclSubprocessException(
+                subprocess.CompletedProcess(
+                    args=[*self._command[:-1], *map(str, failed)],
+                    returncode=1,
+                    stdout=b"",
+                    stderr="".join(self._stderr_lines).encode(),
+                )
+            )
+
+    def getfacl_raw(self, path: str | Path) -> str:
+        [(_, raw_output)] = self.iter_getfacl_raw([path])
+        return raw_output
+
+    def getfacl(self, path: str | Path) -> dc.ACLData:
+        return dc.ACLData.from_getfacl_cmd_output(self.getfacl_raw(path))
+
+    def getfacl_many(
+        self, paths: Iterable[str | Path]
+    ) -> dict[Path, dc.ACLData]:
+        return {
+            path: dc.ACLData.from_getfacl_cmd_output(raw_output)
+            for path, raw_output in self.iter_getfacl_raw(paths)
+        }
+
+    def ping(self) -> bool:
+        """
+        Health check: True if the co-process answers an empty request
+        """
+        try:
+            for _ in self.iter_getfacl_raw([]):
+                pass
+        except ae.CoprocessExited:
+            return False
+        return True
+
+
+class GetFaclCoprocessPool:
+    """
+    Thread-safe pool of reusable :class: `GetFaclCoprocess` objects.
+    Co-processes are started on demand, checked before each use, and
+    replaced if they have died.
+    """
+
+    def __init__(self, size: int = 4):
+        """
+        Constructor
+        :param size: max number of co-processes
+        """
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        self._size = size
+        self._idle = queue.LifoQueue()
+        self._started = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _start(self) -> GetFaclCoprocess:
+        try:
+            return GetFaclCoprocess()
+        except BaseException:
+            with self._lock:
+                self._started -= 1
+            raise
+
+    def _checkout(self) -> GetFaclCoprocess:
+        with self._lock:
+            can_start = self._idle.empty() and self._started < self._size
+            if can_start:
+                self._started += 1
+        if can_start:
+            return self._start()
+        coprocess = self._idle.get()
+        if not coprocess.is_alive():
+            coprocess.close()
+            coprocess = self._start()
+        return coprocess
+
+    @contextlib.contextmanager
+    def acquire(self) -> Iterator[GetFaclCoprocess]:
+        """
+        Context manager that lends out a live co-process, blocking until one
+        is available. A co-process that dies while lent out is discarded,
+        and a new one is started the next time one is needed. One still
+        lent out when the pool is closed is closed when it is returned.
+        """
+        if self._closed:
+            raise ValueError("pool is closed")
+        coprocess = self._checkout()
+        try:
+            yield coprocess
+        finally:
+            # checked under the lock: a pool closed while this was lent out
+            # has already emptied _idle, so it would never be closed there
+            with self._lock:
+                keep = coprocess.is_alive() and not self._closed
+                if keep:
+                    self._idle.put(coprocess)
+                else:
+                    self._started -= 1
+            if not keep:
+                coprocess.close()
+
+    def getfacl_raw(self, path: str | Path) -> str:
+        with self.acquire() as coprocess:
+            return coprocess.getfacl_raw(path)
+
+    def getfacl(self, path: str | Path) -> dc.ACLData:
+        with self.acquire() as coprocess:
+            return coprocess.getfacl(path)
+
+    def getfacl_many(
+        self, paths: Iterable[str | Path]
+    ) -> dict[Path, dc.ACLData]:
+        with self.acquire() as coprocess:
+            return coprocess.getfacl_many(paths)
+
+    def check_health(self) -> int:
+        """
+        Pings every idle co-process, replacing any that don't answer
+        :return: number of co-processes replaced
+        """
+        replaced = 0
+        checked = []
+        try:
+            while True:
+                try:
+                    coprocess = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if not coprocess.ping():
+                    coprocess.close()
+                    # reuses the dead co-process's slot
+                    coprocess = self._start()
+                    replaced += 1
+                checked.append(coprocess)
+        finally:
+            for coprocess in checked:
+                self._idle.put(coprocess)
+        return replaced
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
@@ -1,8 +1,16 @@
+import dataclasses
+import functools
+import operator
+import os
 import pprint
-import re
-from dataclasses import dataclass, field
+import sys
+import types
+from dataclasses import dataclass, field, fields
+from typing import Iterable
 
 import pygetfacl.file_setting as fs
+import pygetfacl.instrumentation as ins
+import pygetfacl.name_resolver as nr
 import pygetfacl.output_spec as osp
 
 
@@ -31,71 +39,615 @@ class ACLData:
         default_factory=lambda: {})
 
     @classmethod
-    def from_getfacl_cmd_output(cls, cmd_output: str):
+    def from_getfacl_cmd_output(cls, cmd_output: str, strict: bool = True):
         """
         Instantiates a :class: `ACLData` object from Linux getfacl output
         :param cmd_output: Linux getfacl std out
+        :param strict: if False, the output is trusted to be well-formed
+        (e.g. it comes straight from the getfacl executable) and is decoded
+        without per-entry validation, and a repeated single-value line
+        isn't an error (the last one wins). Text that can't be decoded that
+        way still goes through the validating parse, so other errors are
+        the same. Keep the default for text from elsewhere, e.g. user
+        supplied dumps.
         :return :class: `ACLData` object
         """
+        if not strict:
+            started = ins.start()
+            kwargs = osp.decode_trusted_getfacl_output(cmd_output)
+            if kwargs is not None:
+                acl_data = cls(raw_system_output=cmd_output, **kwargs)
+                ins.stop("parse.trusted", started, nbytes=len(cmd_output))
+                return acl_data
+        if ins.enabled:
+            return cls._timed_from_getfacl_cmd_output(cmd_output, strict)
+        return cls(
+            raw_system_output=cmd_output,
+            **osp.decode_getfacl_output(cmd_output, strict=strict),
+        )
+
+    @classmethod
+    def _timed_from_getfacl_cmd_output(
+        cls, cmd_output: str, strict: bool = True
+    ):
+        """
+        from_getfacl_cmd_output() with tokenizing, validation and object
+        construction timed separately
+        """
+        nbytes = len(cmd_output)
+        parse_started = started = ins.start()
         kwargs = {"raw_system_output": cmd_output}
-        for item in osp.getfacl_output_items():
-            matched_vals = re.findall(
-                item.regex, cmd_output, flags=re.MULTILINE
+        matches = osp.tokenize_getfacl_output(cmd_output)
+        ins.stop("parse.tokenize", started, nbytes=nbytes)
+        started = ins.start()
+        for item in osp.GETFACL_OUTPUT_ITEMS:
+            matches[item.attribute] = item.validated_matches(
+                matches[item.attribute], strict=strict
             )
-            item.validate_matches(matched_vals)
+        ins.stop("parse.validate", started)
+        started = ins.start()
+        for item in osp.GETFACL_OUTPUT_ITEMS:
             kwargs[item.attribute] = item.to_acl_constructor_format(
-                matched_vals
+                matches[item.attribute]
             )
+        acl_data = cls(**kwargs)
+        ins.stop("parse.construct", started)
+        ins.stop("parse", parse_started, nbytes=nbytes)
+        return acl_data
+
+    @classmethod
+    def from_getfacl_bytes(
+        cls,
+        buffer: bytes | bytearray | memoryview,
+        start: int = 0,
+        end: int = -1,
+        strict: bool = True,
+    ):
+        """
+        Instantiates a :class: `ACLData` object from Linux getfacl output
+        that hasn't been decoded, e.g. one path's block in the raw stdout of
+        a multi-path getfacl call, without decoding the whole output. Only
+        names are decoded up front (names that aren't valid UTF-8 are
+        decoded with os.fsdecode); raw_system_output is decoded from the
+        block's bytes the first time it is read. Results and errors are
+        the same as from_getfacl_cmd_output(os.fsdecode(block)).
+        :param buffer: getfacl std out, as bytes (or a view of them)
+        :param start: offset of the block in buffer
+        :param end: end of the block in buffer. -1 --> end of buffer
+        :param strict: if False, repeated single-value lines aren't an
+        error (see :meth: `from_getfacl_cmd_output`)
+        :return :class: `ACLData` object
+        """
+        if end < 0:
+            end = len(buffer)
+        parse_started = started = ins.start()
+        # the one copy made of the block: split into lines here, and kept
+        # (undecoded) for raw_system_output
+        block = bytes(buffer[start:end])
+        kwargs = osp._decode_getfacl_block_bytes(block, strict)
+        ins.stop("parse.bytes.decode", started, nbytes=len(block))
+        started = ins.start()
+        acl_data = _BytesBackedACLData(**kwargs)
+        # raw_system_output pending: decoded from block on first read
+        acl_data.__dict__.update(_raw_system_output=None, _raw_block=block)
+        ins.stop("parse.bytes.construct", started)
+        ins.stop("parse.bytes", parse_started, nbytes=len(block))
+        return acl_data
+
+    @property
+    def effective_permissions(self):
+        """
+        :class: `EffectivePermissions` of this ACL, memoized until one of
+        the fields it is computed from is reassigned
+        """
+        inputs = _effective_permission_inputs(self)
+        cached = self.__dict__.get("_effective_permissions")
+        if (
+            cached is None
+            or cached[1]._acl_data is not self
+            or cached[0] != inputs
+        ):
+            cached = (inputs, EffectivePermissions(self))
+            self.__dict__["_effective_permissions"] = cached
+        return cached[1]
+
+    def with_resolved_names(self):
+        """
+        Converts numeric user / group ids (as reported in numeric_ids mode)
+        to names, using the shared name cache. Ids that can't be resolved,
+        and entries that are already names, are kept as they are.
+        :return: new :class: `ACLData` object (raw_system_output unchanged)
+        """
+        return dataclasses.replace(self, **_resolved_name_kwargs(self))
+
+
+def _resolved_name_kwargs(acl_data) -> dict:
+    def resolve_keys(entries, resolve):
+        return {resolve(name): value for name, value in entries.items()}
+
+    return {
+        "owning_user": nr.resolve_user_name(acl_data.owning_user),
+        "owning_group": nr.resolve_group_name(acl_data.owning_group),
+        "special_users": resolve_keys(
+            acl_data.special_users, nr.resolve_user_name
+        ),
+        "special_groups": resolve_keys(
+            acl_data.special_groups, nr.resolve_group_name
+        ),
+        "default_special_users": resolve_keys(
+            acl_data.default_special_users, nr.resolve_user_name
+        ),
+        "default_special_groups": resolve_keys(
+            acl_data.default_special_groups, nr.resolve_group_name
+        ),
+    }
+
+
+_NAMED_ENTRY_FIELDS = (
+    "special_users",
+    "special_groups",
+    "default_special_users",
+    "default_special_groups",
+)
+_ACL_DATA_FIELD_NAMES = tuple(acl_field.name for acl_field in fields(ACLData))
+_SINGLE_VALUE_FIELDS = tuple(
+    acl_field.name
+    for acl_field in fields(ACLData)
+    if acl_field.name not in _NAMED_ENTRY_FIELDS
+    and acl_field.name != "raw_system_output"
+)
+
+# shared by every CompactACLData without named entries
+_EMPTY_PERMISSIONS_MAP = types.MappingProxyType({})
+
+
+def _named_entries_property(attribute: str) -> property:
+    def getter(self) -> types.MappingProxyType:
+        pairs = getattr(self, attribute)
+        if not pairs:
+            return _EMPTY_PERMISSIONS_MAP
+        return types.MappingProxyType(dict(pairs))
+
+    return property(getter)
+
+
+class CompactACLData:
+    """
+    Immutable, memory-lean counterpart of :class: `ACLData` for holding
+    large numbers of results in memory. Has the same attributes as ACLData,
+    but stores them in __slots__, interns owner / group / principal names,
+    keeps named entries as tuples of (name, permission) pairs (exposed as
+    read-only mappings), and only keeps raw_system_output if asked to.
+    """
+
+    _FIELD_SLOTS = (
+        *_SINGLE_VALUE_FIELDS,
+        "raw_system_output",
+        *[f"_{attribute}" for attribute in _NAMED_ENTRY_FIELDS],
+    )
+    # memoized EffectivePermissions (not a field: set on first access)
+    __slots__ = (*_FIELD_SLOTS, "_effective_permissions")
+
+    special_users = _named_entries_property("_special_users")
+    special_groups = _named_entries_property("_special_groups")
+    default_special_users = _named_entries_property("_default_special_users")
+    default_special_groups = _named_entries_property(
+        "_default_special_groups"
+    )
+
+    def __init__(self, raw_system_output: str = "", **kwargs):
+        """
+        Takes the same keyword arguments as :class: `ACLData`
+        """
+        for attribute in _SINGLE_VALUE_FIELDS:
+            value = kwargs[attribute]
+            if attribute in ("owning_user", "owning_group"):
+                value = sys.intern(value)
+            object.__setattr__(self, attribute, value)
+        object.__setattr__(self, "raw_system_output", raw_system_output)
+        for attribute in _NAMED_ENTRY_FIELDS:
+            entries = kwargs.get(attribute) or {}
+            object.__setattr__(
+                self,
+                f"_{attribute}",
+                tuple(
+                    (sys.intern(name), permission)
+                    for name, permission in entries.items()
+                ),
+            )
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def _astuple(self) -> tuple:
+        return tuple(getattr(self, name) for name in self._FIELD_SLOTS)
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactACLData):
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    def __hash__(self):
+        return hash(self._astuple())
+
+    def __reduce__(self):
+        return _compact_acl_data_from_kwargs, (self._as_kwargs(),)
+
+    def __repr__(self):
+        field_reprs = ", ".join(
+            f"{name}={value!r}" for name, value in self._as_kwargs().items()
+        )
+        return f"{type(self).__name__}({field_reprs})"
+
+    def _as_kwargs(self) -> dict:
+        # in ACLData field order
+        return {
+            acl_field.name: (
+                dict(getattr(self, f"_{acl_field.name}"))
+                if acl_field.name in _NAMED_ENTRY_FIELDS
+                else getattr(self, acl_field.name)
+            )
+            for acl_field in fields(ACLData)
+        }
+
+    @classmethod
+    def from_acl_data(cls, acl_data: ACLData, keep_raw: bool = False):
+        """
+        Instantiates a :class: `CompactACLData` object from an ACLData object
+        :param acl_data: :class: `ACLData` object to convert
+        :param keep_raw: whether to keep acl_data.raw_system_output
+        :return :class: `CompactACLData` object
+        """
+        kwargs = {
+            attribute: getattr(acl_data, attribute)
+            for attribute in (*_SINGLE_VALUE_FIELDS, *_NAMED_ENTRY_FIELDS)
+        }
+        if keep_raw:
+            kwargs["raw_system_output"] = acl_data.raw_system_output
         return cls(**kwargs)
 
+    @classmethod
+    def from_getfacl_cmd_output(
+        cls, cmd_output: str, keep_raw: bool = False, strict: bool = True
+    ):
+        """
+        Instantiates a :class: `CompactACLData` object from Linux getfacl
+        output
+        :param cmd_output: Linux getfacl std out
+        :param keep_raw: whether to keep cmd_output as raw_system_output
+        :param strict: as in :meth: `ACLData.from_getfacl_cmd_output`
+        :return :class: `CompactACLData` object
+        """
+        return cls.from_acl_data(
+            ACLData.from_getfacl_cmd_output(cmd_output, strict=strict),
+            keep_raw=keep_raw,
+        )
+
+    def to_acl_data(self) -> ACLData:
+        return ACLData(**self._as_kwargs())
+
+    def with_resolved_names(self):
+        """
+        Counterpart of :meth: `ACLData.with_resolved_names`
+        :return: new :class: `CompactACLData` object
+        """
+        return CompactACLData(
+            **{**self._as_kwargs(), **_resolved_name_kwargs(self)}
+        )
+
     @property
     def effective_permissions(self):
-        return EffectivePermissions(self)
+        try:
+            return self._effective_permissions
+        except AttributeError:
+            effective = EffectivePermissions(self)
+            object.__setattr__(self, "_effective_permissions", effective)
+            return effective
 
 
-class EffectivePermissions:
-    def __init__(self, acl_data: ACLData):
-        self.user = acl_data.user
-        self.special_users = {
-                user: fs.compute_effective_permissions(
-                    base=permission, mask=acl_data.mask
-                )
-                for user, permission in acl_data.special_users.items()
-            }
-        self.group = fs.compute_effective_permissions(
-                base=acl_data.group, mask=acl_data.mask
+def _compact_acl_data_from_kwargs(kwargs: dict) -> CompactACLData:
+    return CompactACLData(**kwargs)
+
+
+_ITEMS_BY_ATTRIBUTE = {
+    item.attribute: item for item in osp.GETFACL_OUTPUT_ITEMS
+}
+
+
+class LazyACLData(ACLData):
+    """
+    :class: `ACLData` that keeps getfacl output, or the span of one path's
+    block in a shared multi-path output buffer, and parses each field the
+    first time it is read (then keeps it). Compares equal to, and has the
+    same repr as, an :class: `ACLData` with the same field values. Errors
+    in the text are raised when an affected field is read, not on
+    construction. Copies, pickles and with_resolved_names() results are
+    plain :class: `ACLData` objects; dataclasses.replace() isn't
+    supported. The whole buffer stays in memory while any object
+    referring to it is alive.
+    """
+
+    def __init__(
+        self,
+        cmd_output: str,
+        start: int = 0,
+        end: int = -1,
+        strict: bool = True,
+    ):
+        """
+        Constructor. Doesn't parse anything.
+        :param cmd_output: Linux getfacl std out, possibly for many paths
+        :param start: offset where this path's block starts (0 or just
+        after a newline)
+        :param end: offset where the block ends. -1 --> end of cmd_output
+        :param strict: if False, repeated single-value lines aren't an
+        error (see :meth: `ACLData.from_getfacl_cmd_output`)
+        """
+        # ACLData.__init__ isn't called: fields are filled in on access
+        self._buffer = cmd_output
+        self._start = start
+        self._end = len(cmd_output) if end < 0 else end
+        self._strict = strict
+
+    @classmethod
+    def from_getfacl_cmd_output(cls, cmd_output: str, strict: bool = True):
+        return cls(cmd_output, strict=strict)
+
+    @classmethod
+    def from_batch_output(cls, cmd_output: str, strict: bool = True):
+        """
+        One :class: `LazyACLData` per path in the output of a multi-path
+        getfacl call, all sharing cmd_output instead of copying blocks
+        :return: list, in the order getfacl printed the paths
+        """
+        return [
+            cls(cmd_output, start, end, strict=strict)
+            for start, end in osp.getfacl_block_spans(cmd_output)
+        ]
+
+    def __getattr__(self, name: str):
+        # only called for fields that haven't been read (or set) yet
+        item = _ITEMS_BY_ATTRIBUTE.get(name)
+        if item is None:
+            raise AttributeError(
+                f"{type(self).__name__!r} object has no attribute {name!r}"
             )
+        started = ins.start()
+        values = osp.find_item_values(
+            item, self._buffer, self._start, self._end
+        )
+        value = item.to_validated_acl_format(values, strict=self._strict)
+        ins.stop("parse.lazy_field", started)
+        self.__dict__[name] = value
+        return value
 
-        self.special_groups = {
-                user: fs.compute_effective_permissions(
-                    base=permission, mask=acl_data.mask
-                )
-                for user, permission in acl_data.special_groups.items()
-            }
+    # ACLData has a class level default for raw_system_output, which would
+    # hide it from __getattr__
+    @property
+    def raw_system_output(self) -> str:
+        raw_output = self.__dict__.get("_raw_system_output")
+        if raw_output is None:
+            raw_output = self._buffer[self._start:self._end]
+            self.__dict__["_raw_system_output"] = raw_output
+        return raw_output
 
-        self.other = acl_data.other
-        self.default_user = acl_data.default_user
-        self.default_special_users = {
-                user: fs.compute_effective_permissions(
-                    base=permission, mask=acl_data.default_mask
-                )
-                for user, permission in acl_data.default_special_users.items()
-            }
+    @raw_system_output.setter
+    def raw_system_output(self, value: str):
+        self.__dict__["_raw_system_output"] = value
 
-        self.default_group = fs.compute_effective_permissions(
-                base=acl_data.default_group, mask=acl_data.default_mask
+    def _field_values(self) -> tuple:
+        return tuple(getattr(self, name) for name in _ACL_DATA_FIELD_NAMES)
+
+    def __eq__(self, other):
+        if not isinstance(other, ACLData):
+            return NotImplemented
+        return self._field_values() == tuple(
+            getattr(other, name) for name in _ACL_DATA_FIELD_NAMES
+        )
+
+    def __repr__(self):
+        field_reprs = ", ".join(
+            f"{name}={value!r}"
+            for name, value in zip(
+                _ACL_DATA_FIELD_NAMES, self._field_values()
             )
+        )
+        return f"{ACLData.__qualname__}({field_reprs})"
+
+    def __reduce__(self):
+        return self.to_acl_data().__reduce__()
 
-        self.default_special_groups = {
-                group: fs.compute_effective_permissions(
-                    base=permission, mask=acl_data.default_mask
+    def to_acl_data(self) -> ACLData:
+        """
+        Parses every field
+        :return: equal :class: `ACLData` object
+        """
+        return ACLData(
+            **{
+                name: dict(value) if name in _NAMED_ENTRY_FIELDS else value
+                for name, value in zip(
+                    _ACL_DATA_FIELD_NAMES, self._field_values()
                 )
-                for group, permission in acl_data.default_special_groups.items()
             }
+        )
+
+    def with_resolved_names(self) -> ACLData:
+        return self.to_acl_data().with_resolved_names()
 
-        self.default_other = acl_data.default_other
+    def __setattr__(self, name, value):
+        self.__dict__.pop("_effective_permissions", None)
+        super().__setattr__(name, value)
+
+    @property
+    def effective_permissions(self):
+        # comparing the fields it is computed from would parse all of them,
+        # so the memoized object is dropped when a field is set instead
+        effective = self.__dict__.get("_effective_permissions")
+        if effective is None:
+            effective = EffectivePermissions(self)
+            self.__dict__["_effective_permissions"] = effective
+        return effective
+
+
+class _BytesBackedACLData(ACLData):
+    """
+    :class: `ACLData` made by :meth: `ACLData.from_getfacl_bytes`. Keeps
+    its getfacl output block as bytes and decodes raw_system_output the
+    first time it is read. Otherwise a plain :class: `ACLData`: compares
+    equal to, and has the same repr as, one with the same field values;
+    copies and pickles are plain :class: `ACLData` objects.
+    """
+
+    @property
+    def raw_system_output(self) -> str:
+        raw_output = self.__dict__.get("_raw_system_output")
+        if raw_output is None:
+            started = ins.start()
+            raw_output = os.fsdecode(self.__dict__.pop("_raw_block", b""))
+            self.__dict__["_raw_system_output"] = raw_output
+            ins.stop("parse.raw_decode", started, nbytes=len(raw_output))
+        return raw_output
+
+    @raw_system_output.setter
+    def raw_system_output(self, value: str):
+        self.__dict__.pop("_raw_block", None)
+        self.__dict__["_raw_system_output"] = value
+
+    _field_values = LazyACLData._field_values
+    __eq__ = LazyACLData.__eq__
+    __repr__ = LazyACLData.__repr__
+
+    def __reduce__(self):
+        return ACLData(
+            **dict(zip(_ACL_DATA_FIELD_NAMES, self._field_values()))
+        ).__reduce__()
+
+
+# effective permission attribute --> attribute holding the mask applied
+# to it (None --> not subject to a mask)
+_EFFECTIVE_PERMISSION_MASKS = {
+    "user": None,
+    "special_users": "mask",
+    "group": "mask",
+    "special_groups": "mask",
+    "other": None,
+    "default_user": None,
+    "default_special_users": "default_mask",
+    "default_group": "default_mask",
+    "default_special_groups": "default_mask",
+    "default_other": None,
+}
+
+
+# fields EffectivePermissions is computed from
+_effective_permission_inputs = operator.attrgetter(
+    *_EFFECTIVE_PERMISSION_MASKS, "mask", "default_mask"
+)
+
+
+def _effective_value(acl_data: ACLData | CompactACLData, attribute: str):
+    value = getattr(acl_data, attribute)
+    mask_attribute = _EFFECTIVE_PERMISSION_MASKS[attribute]
+    if mask_attribute is None:
+        return value
+    mask = getattr(acl_data, mask_attribute)
+    if attribute in _NAMED_ENTRY_FIELDS:
+        return {
+            name: fs.compute_effective_permissions(base=permission, mask=mask)
+            for name, permission in value.items()
+        }
+    return fs.compute_effective_permissions(base=value, mask=mask)
+
+
+def _effective_permission_property(
+    attribute: str,
+) -> functools.cached_property:
+    def getter(self):
+        return _effective_value(self._acl_data, attribute)
+
+    getter.__name__ = attribute
+    return functools.cached_property(getter)
+
+
+class EffectivePermissions:
+    """
+    Permissions of each ACL entry after applying the mask (or default
+    mask). Each attribute is computed on first access and then memoized, so
+    reading one of them doesn't pay for the others. Values reflect the
+    ACL info at the time they are first read.
+    """
+
+    def __init__(self, acl_data: ACLData | CompactACLData):
+        self._acl_data = acl_data
+
+    user = _effective_permission_property("user")
+    special_users = _effective_permission_property("special_users")
+    group = _effective_permission_property("group")
+    special_groups = _effective_permission_property("special_groups")
+    other = _effective_permission_property("other")
+    default_user = _effective_permission_property("default_user")
+    default_special_users = _effective_permission_property(
+        "default_special_users"
+    )
+    default_group = _effective_permission_property("default_group")
+    default_special_groups = _effective_permission_property(
+        "default_special_groups"
+    )
+    default_other = _effective_permission_property("default_other")
 
     def __repr__(self):
-        return "\n".join([f"{key}: {val}" for key, val in vars(self).items()])
+        return "\n".join(
+            f"{attribute}: {getattr(self, attribute)}"
+            for attribute in _EFFECTIVE_PERMISSION_MASKS
+        )
+
+
+def effective_permissions_many(
+    acl_data_items: Iterable[ACLData | CompactACLData], attribute: str
+) -> list:
+    """
+    Computes one effective permission attribute for many ACLs in a single
+    pass, without building an :class: `EffectivePermissions` per item
+    :param acl_data_items: :class: `ACLData` / :class: `CompactACLData`
+    objects
+    :param attribute: name of an EffectivePermissions attribute
+    (e.g. "group", "special_users")
+    :return: list with the effective value for each item, in input order
+    """
+    if attribute not in _EFFECTIVE_PERMISSION_MASKS:
+        raise ValueError(
+            f"{attribute!r} is not an effective permission attribute"
+        )
+    mask_attribute = _EFFECTIVE_PERMISSION_MASKS[attribute]
+    get_value = operator.attrgetter(attribute)
+    if mask_attribute is None:
+        return [get_value(acl_data) for acl_data in acl_data_items]
+
+    get_mask = operator.attrgetter(mask_attribute)
+    settings = fs._PERMISSION_SETTINGS
+    results = []
+    if attribute in _NAMED_ENTRY_FIELDS:
+        for acl_data in acl_data_items:
+            mask = get_mask(acl_data)
+            entries = get_value(acl_data)
+            if mask is None or not entries:
+                results.append(dict(entries))
+                continue
+            mask_bits = mask.bits
+            results.append(
+                {
+                    name: settings[permission.bits & mask_bits]
+                    for name, permission in entries.items()
+                }
+            )
+    else:
+        for acl_data in acl_data_items:
+            base = get_value(acl_data)
+            mask = get_mask(acl_data)
+            if base is None or mask is None:
+                results.append(base)
+            else:
+                results.append(settings[base.bits & mask.bits])
+    return results
 
 
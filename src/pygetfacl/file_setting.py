@@ -14,11 +14,10 @@ def validate_bit_string(
         or (not len(no_bits_set_repr) == required_length)
         or (
             not all(
-                [
-                    (bit_string[i] == all_bits_set_repr[i])
-                    or (bit_string[i] == no_bits_set_repr[i])
-                    for i in range(len(bit_string))
-                ]
+                (char == all_bits_set_char) or (char == no_bits_set_char)
+                for char, all_bits_set_char, no_bits_set_char in zip(
+                    bit_string, all_bits_set_repr, no_bits_set_repr
+                )
             )
         )
     ):
@@ -27,51 +26,94 @@ def validate_bit_string(
             all_bits_set=all_bits_set_repr,
             no_bits_set=no_bits_set_repr,
         )
-    # except AssertionError:
-    #     raise InvalidFileSettingString
+
+
+def _bits_to_string(bits: int, all_bits_set_repr: str) -> str:
+    return "".join(
+        char if bits & (4 >> idx) else "-"
+        for idx, char in enumerate(all_bits_set_repr)
+    )
 
 
 class PermissionSetting:
-    def __init__(self, r: bool, w: bool, x: bool):
-        self._r = r
-        self._w = w
-        self._x = x
+    """
+    Immutable r/w/x permission triple stored as a 3-bit mask
+    (r = 4, w = 2, x = 1, same as the mode bits).
+    Only 8 values are possible, so instances are interned: the constructor,
+    from_string() and from_bits() all return one of 8 shared objects.
+    """
+
+    __slots__ = ("_bits",)
+
+    def __new__(cls, r: bool, w: bool, x: bool):
+        return _PERMISSION_SETTINGS[(bool(r) << 2) | (bool(w) << 1) | bool(x)]
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
 
     def __eq__(self, other):
-        return all(
-            [self._r == other.r, self._w == other.w, self._x == other.x]
-        )
+        if not isinstance(other, PermissionSetting):
+            return NotImplemented
+        return self._bits == other._bits
+
+    def __hash__(self):
+        return hash(self._bits)
+
+    def __reduce__(self):
+        # preserves interning across pickle / copy
+        return PermissionSetting.from_bits, (self._bits,)
 
     def __repr__(self):
-        r_char = "r" if self._r else "-"
-        w_char = "w" if self._w else "-"
-        x_char = "x" if self._x else "-"
-        return f"{r_char}{w_char}{x_char}"
+        return _PERMISSION_STRINGS[self._bits]
+
+    @property
+    def bits(self) -> int:
+        return self._bits
 
     @property
     def r(self) -> bool:
-        return self._r
+        return bool(self._bits & 4)
 
     @property
     def w(self) -> bool:
-        return self._w
+        return bool(self._bits & 2)
 
     @property
     def x(self) -> bool:
-        return self._x
+        return bool(self._bits & 1)
+
+    @classmethod
+    def from_bits(cls, bits: int):
+        return _PERMISSION_SETTINGS[bits]
 
     @classmethod
     def from_string(cls, permission_string: str):
-        validate_bit_string(
-            bit_string=permission_string,
-            all_bits_set_repr="rwx",
-            no_bits_set_repr="---",
-            required_length=3,
-        )
-        r = permission_string[0] == "r"
-        w = permission_string[1] == "w"
-        x = permission_string[2] == "x"
-        return cls(r=r, w=w, x=x)
+        try:
+            return _PERMISSION_SETTINGS_BY_STRING[permission_string]
+        except (KeyError, TypeError):
+            validate_bit_string(
+                bit_string=permission_string,
+                all_bits_set_repr="rwx",
+                no_bits_set_repr="---",
+                required_length=3,
+            )
+            raise
+
+
+def _make_interned(cls, bits: int):
+    instance = object.__new__(cls)
+    object.__setattr__(instance, "_bits", bits)
+    return instance
+
+
+_PERMISSION_STRINGS = tuple(_bits_to_string(bits, "rwx") for bits in range(8))
+_PERMISSION_SETTINGS = tuple(
+    _make_interned(PermissionSetting, bits) for bits in range(8)
+)
+_PERMISSION_SETTINGS_BY_STRING = {
+    string: setting
+    for string, setting in zip(_PERMISSION_STRINGS, _PERMISSION_SETTINGS)
+}
 
 
 def compute_effective_permissions(
@@ -81,51 +123,77 @@ def compute_effective_permissions(
         return None
     if mask is None:
         return base
-    return PermissionSetting(
-        r=(base.r and mask.r), w=(base.w and mask.w), x=(base.x and mask.x)
-    )
+    return _PERMISSION_SETTINGS[base.bits & mask.bits]
 
 
 class FlagSetting:
-    def __init__(self, uid: bool, gid: bool, sticky: bool):
-        self._uid = uid
-        self._gid = gid
-        self._sticky = sticky
+    """
+    Immutable setuid/setgid/sticky triple stored as a 3-bit mask
+    (uid = 4, gid = 2, sticky = 1). Interned like :class: `PermissionSetting`.
+    """
+
+    __slots__ = ("_bits",)
+
+    def __new__(cls, uid: bool, gid: bool, sticky: bool):
+        bits = (bool(uid) << 2) | (bool(gid) << 1) | bool(sticky)
+        return _FLAG_SETTINGS[bits]
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, FlagSetting):
+            return NotImplemented
+        return self._bits == other._bits
+
+    def __hash__(self):
+        return hash(self._bits)
+
+    def __reduce__(self):
+        return FlagSetting.from_bits, (self._bits,)
 
     def __repr__(self):
-        uid_char = "s" if self._uid else "-"
-        gid_char = "s" if self._gid else "-"
-        sticky_char = "t" if self._sticky else "-"
-        return f"{uid_char}{gid_char}{sticky_char}"
+        return _FLAG_STRINGS[self._bits]
+
+    @classmethod
+    def from_bits(cls, bits: int):
+        return _FLAG_SETTINGS[bits]
 
     @classmethod
     def from_string(cls, flag_string: str):
-        validate_bit_string(
-            bit_string=flag_string,
-            all_bits_set_repr="sst",
-            no_bits_set_repr="---",
-            required_length=3,
-        )
-        uid = flag_string[0] == "s"
-        gid = flag_string[1] == "s"
-        sticky = flag_string[2] == "t"
-        return cls(
-            uid=uid,
-            gid=gid,
-            sticky=sticky,
-        )
+        try:
+            return _FLAG_SETTINGS_BY_STRING[flag_string]
+        except (KeyError, TypeError):
+            validate_bit_string(
+                bit_string=flag_string,
+                all_bits_set_repr="sst",
+                no_bits_set_repr="---",
+                required_length=3,
+            )
+            raise
+
+    @property
+    def bits(self) -> int:
+        return self._bits
 
     @property
     def uid(self) -> bool:
-        return self._uid
+        return bool(self._bits & 4)
 
     @property
     def gid(self):
-        return self._gid
+        return bool(self._bits & 2)
 
     @property
     def sticky(self):
-        return self._sticky
+        return bool(self._bits & 1)
+
+
+_FLAG_STRINGS = tuple(_bits_to_string(bits, "sst") for bits in range(8))
+_FLAG_SETTINGS = tuple(_make_interned(FlagSetting, bits) for bits in range(8))
+_FLAG_SETTINGS_BY_STRING = {
+    string: setting for string, setting in zip(_FLAG_STRINGS, _FLAG_SETTINGS)
+}
 
 
 @dataclass
@@ -0,0 +1,230 @@
+import os
+from dataclasses import dataclass, fields
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import pygetfacl.acl_info_retriever as air
+import pygetfacl.data_containers as dc
+import pygetfacl.snapshot as sn
+import pygetfacl.tree_scanner as ts
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+
+_NAMED_ENTRY_FIELDS = (
+    "special_users",
+    "special_groups",
+    "default_special_users",
+    "default_special_groups",
+)
+_COMPARED_FIELDS = tuple(
+    acl_field.name
+    for acl_field in fields(dc.ACLData)
+    if acl_field.name != "raw_system_output"
+)
+
+
+@dataclass(frozen=True)
+class ACLEntryChange:
+    """
+    Change to one ACL entry. name is the principal for named entries
+    (special_users etc.) and None for the other fields. old / new are None
+    where the entry doesn't exist.
+    """
+
+    field: str
+    name: str | None
+    old: Any
+    new: Any
+
+
+@dataclass(frozen=True)
+class ACLDiff:
+    """
+    Difference between a path's ACL info in a snapshot and on disk. kind is
+    ADDED, REMOVED or MODIFIED; old is None for added paths, new is None
+    for removed ones.
+    """
+
+    path: Path
+    kind: str
+    old: dc.ACLData | None
+    new: dc.ACLData | dc.CompactACLData | None
+    changes: tuple[ACLEntryChange, ...]
+
+
+def diff_acl_data(
+    old: dc.ACLData | dc.CompactACLData | None,
+    new: dc.ACLData | dc.CompactACLData | None,
+) -> list[ACLEntryChange]:
+    """
+    Compares two ACLs field by field (raw_system_output is ignored).
+    Either side may be None, in which case every entry of the other side
+    is reported.
+    :return: list of :class: `ACLEntryChange`, in ACLData field order
+    """
+    changes = []
+    for field_name in _COMPARED_FIELDS:
+        old_value = None if old is None else getattr(old, field_name)
+        new_value = None if new is None else getattr(new, field_name)
+        if field_name not in _NAMED_ENTRY_FIELDS:
+            if old_value != new_value:
+                changes.append(
+                    ACLEntryChange(field_name, None, old_value, new_value)
+                )
+            continue
+        old_entries = old_value or {}
+        new_entries = new_value or {}
+        for name, old_permission in old_entries.items():
+            new_permission = new_entries.get(name)
+            if old_permission != new_permission:
+                changes.append(
+                    ACLEntryChange(
+                        field_name, name, old_permission, new_permission
+                    )
+                )
+        changes.extend(
+            ACLEntryChange(field_name, name, None, new_permission)
+            for name, new_permission in new_entries.items()
+            if name not in old_entries
+        )
+    return changes
+
+
+def _in_tree(path_bytes: bytes, root_bytes: bytes) -> bool:
+    """
+    Whether path is root or under it, with both spelled as _walk spells
+    them: paths under a "." root have no "./" prefix
+    """
+    if root_bytes == b".":
+        return not (
+            path_bytes.startswith(b"/")
+            or path_bytes == b".."
+            or path_bytes.startswith(b"../")
+        )
+    return path_bytes == root_bytes or path_bytes.startswith(
+        root_bytes.rstrip(b"/") + b"/"
+    )
+
+
+def incremental_rescan(
+    snapshot: sn.Snapshot,
+    root: str | Path,
+    symlinks: str = "skip",
+    one_filesystem: bool = False,
+    max_depth: int | None = None,
+    include: Callable[[Path], bool] | None = None,
+    exclude: Callable[[Path], bool] | None = None,
+    onerror: Callable[[OSError], None] | None = None,
+    batch_size: int = air.DEFAULT_BATCH_SIZE,
+    backend: str | None = None,
+    numeric_ids: bool = False,
+    strict: bool = True,
+    write_to: str | Path | None = None,
+) -> Iterator[ACLDiff]:
+    """
+    Walks the tree under root, stats every path, and only retrieves ACL
+    info for paths that are new or whose (st_dev, st_ino, st_ctime_ns)
+    differs from the snapshot. Every ACL, mode or ownership change updates
+    ctime, so unchanged paths can't have a different ACL. Paths whose ctime
+    changed for another reason (e.g. a write) are re-read but only reported
+    if their ACL info differs. Snapshot paths under root that weren't found
+    are reported as removed, so the walk options should match those of the
+    scan that produced the snapshot.
+    :param snapshot: :class: `Snapshot` of an earlier scan of root
+    :param root: top of the tree (given as it was for the earlier scan)
+    :param write_to: if given, a snapshot of the current state of the tree
+    is written here once the returned iterator is exhausted. May be the
+    file snapshot was opened from.
+    (other params are as in :func: `getfacl_tree`)
+    :return: iterator of :class: `ACLDiff`: added and modified paths in
+    walk order, then removed paths in path order
+    """
+    root = air._to_path(root)
+    seen = bytearray(len(snapshot))
+    # (path, ACL info, stat) of every path, for write_to
+    current = [] if write_to is not None else None
+    decoded: dict[int, dc.ACLData] = {}
+
+    paths = ts._walk(
+        root,
+        symlinks=symlinks,
+        one_filesystem=one_filesystem,
+        max_depth=max_depth,
+        include=include,
+        exclude=exclude,
+        onerror=onerror,
+    )
+    while batch := list(islice(paths, batch_size)):
+        # path --> (stat, snapshot record or None, snapshot index or None)
+        to_read = {}
+        for path in batch:
+            try:
+                st = os.stat(path)
+            except OSError as err:
+                # gone since it was listed; reported as removed below
+                if onerror is not None:
+                    onerror(err)
+                continue
+            idx = snapshot._find(path)
+            record = None
+            if idx is not None:
+                seen[idx] = 1
+                record = snapshot._make_record(idx)
+                if (record.st_dev, record.st_ino, record.st_ctime_ns) == (
+                    st.st_dev,
+                    st.st_ino,
+                    st.st_ctime_ns,
+                ):
+                    if current is not None:
+                        acl_data = decoded.get(record.acl_id)
+                        if acl_data is None:
+                            acl_data = snapshot.acl(record.acl_id)
+                            decoded[record.acl_id] = acl_data
+                        current.append((path, acl_data, st))
+                    continue
+            to_read[path] = (st, record, idx)
+
+        retrieved = air._MultiPathACLInfoRetriever(
+            list(to_read),
+            batch_size=batch_size,
+            backend=backend,
+            numeric_ids=numeric_ids,
+            strict=strict,
+            onerror=onerror if onerror is not None else ts._ignore_error,
+        ).iter_getfacl()
+        for path, new in retrieved:
+            st, record, _ = to_read.pop(path)
+            if current is not None:
+                current.append((path, new, st))
+            if record is None:
+                yield ACLDiff(
+                    path, ADDED, None, new, tuple(diff_acl_data(None, new))
+                )
+                continue
+            old = snapshot.acl(record.acl_id)
+            changes = diff_acl_data(old, new)
+            if changes:
+                yield ACLDiff(path, MODIFIED, old, new, tuple(changes))
+        # left over: getfacl failed on them (gone since they were stat'ed),
+        # so they're reported as removed below
+        for _, _, idx in to_read.values():
+            if idx is not None:
+                seen[idx] = 0
+
+    root_bytes = os.fsencode(root)
+    for idx, was_seen in enumerate(seen):
+        if was_seen or not _in_tree(
+            snapshot._record_path_bytes(idx), root_bytes
+        ):
+            continue
+        record = snapshot._make_record(idx)
+        old = snapshot.acl(record.acl_id)
+        yield ACLDiff(
+            record.path, REMOVED, old, None, tuple(diff_acl_data(old, None))
+        )
+
+    if current is not None:
+        sn.write_snapshot(write_to, current)
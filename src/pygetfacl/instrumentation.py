@@ -0,0 +1,219 @@
+import contextlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+# Checked by every instrumented call site before doing any work, so when
+# instrumentation is off (the default) the cost is one attribute lookup.
+# Use enable() / disable() / collect() rather than setting it directly.
+enabled = False
+
+# latency histogram buckets: bucket i counts durations in [2**i, 2**(i+1))
+# ns (bucket 0 also holds 0 ns). 2**40 ns is about 18 minutes.
+NUM_BUCKETS = 41
+
+
+@dataclass(frozen=True)
+class Event:
+    """
+    One instrumented operation. elapsed_ns is None for plain counters;
+    nbytes is the amount of data handled, where that makes sense.
+    """
+
+    name: str
+    elapsed_ns: int | None = None
+    nbytes: int = 0
+    count: int = 1
+
+
+@dataclass(frozen=True)
+class MetricSnapshot:
+    name: str
+    count: int
+    nbytes: int
+    total_ns: int
+    min_ns: int | None
+    max_ns: int | None
+    # (bucket lower bound in ns, number of timings in bucket), non-empty
+    # buckets only
+    histogram: tuple[tuple[int, int], ...]
+
+    @property
+    def mean_ns(self) -> float | None:
+        timed = sum(num for _, num in self.histogram)
+        return self.total_ns / timed if timed else None
+
+
+class _Metric:
+    __slots__ = ("count", "nbytes", "total_ns", "min_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.nbytes = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = None
+        self.buckets = [0] * NUM_BUCKETS
+
+    def add(self, event: Event):
+        self.count += event.count
+        self.nbytes += event.nbytes
+        elapsed_ns = event.elapsed_ns
+        if elapsed_ns is None:
+            return
+        self.total_ns += elapsed_ns
+        if self.min_ns is None or elapsed_ns < self.min_ns:
+            self.min_ns = elapsed_ns
+        if self.max_ns is None or elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        bucket = min(max(elapsed_ns.bit_length() - 1, 0), NUM_BUCKETS - 1)
+        self.buckets[bucket] += 1
+
+    def snapshot(self, name: str) -> MetricSnapshot:
+        return MetricSnapshot(
+            name=name,
+            count=self.count,
+            nbytes=self.nbytes,
+            total_ns=self.total_ns,
+            min_ns=self.min_ns,
+            max_ns=self.max_ns,
+            histogram=tuple(
+                (1 << bucket if bucket else 0, num)
+                for bucket, num in enumerate(self.buckets)
+                if num
+            ),
+        )
+
+
+class Registry:
+    """
+    Thread-safe aggregate of events: a call count, byte count and latency
+    histogram per metric name. Can be used as a sink.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event):
+        with self._lock:
+            metric = self._metrics.get(event.name)
+            if metric is None:
+                metric = self._metrics[event.name] = _Metric()
+            metric.add(event)
+
+    def snapshot(self) -> dict[str, MetricSnapshot]:
+        """
+        :return: dict mapping metric name to a :class: `MetricSnapshot`
+        """
+        with self._lock:
+            return {
+                name: metric.snapshot(name)
+                for name, metric in sorted(self._metrics.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+# process-wide registry; always receives events while enabled
+registry = Registry()
+_sinks: list[Callable[[Event], None]] = [registry]
+_sinks_lock = threading.Lock()
+_collecting = 0
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def add_sink(sink: Callable[[Event], None]):
+    """
+    Registers a callable that receives every :class: `Event` recorded
+    while instrumentation is enabled. Sinks are called on the thread that
+    did the work, so they should be quick.
+    """
+    global _sinks
+    with _sinks_lock:
+        # copy on write, so emit() can iterate without the lock
+        _sinks = [*_sinks, sink]
+
+
+def remove_sink(sink: Callable[[Event], None]):
+    global _sinks
+    with _sinks_lock:
+        sinks = list(_sinks)
+        sinks.remove(sink)
+        _sinks = sinks
+
+
+def emit(event: Event):
+    for sink in _sinks:
+        sink(event)
+
+
+def start() -> int | None:
+    """
+    Start time for :func: `stop`, or None when instrumentation is disabled
+    """
+    return time.perf_counter_ns() if enabled else None
+
+
+def stop(name: str, started: int | None, nbytes: int = 0, count: int = 1):
+    """
+    Records the time since started (from :func: `start`) under name
+    """
+    if started is not None:
+        emit(Event(name, time.perf_counter_ns() - started, nbytes, count))
+
+
+def increment(name: str, count: int = 1, nbytes: int = 0):
+    """
+    Records a counter event (no timing) under name
+    """
+    if enabled:
+        emit(Event(name, None, nbytes, count))
+
+
+def snapshot() -> dict[str, MetricSnapshot]:
+    """
+    Snapshot of the process-wide registry
+    """
+    return registry.snapshot()
+
+
+def reset():
+    registry.reset()
+
+
+@contextlib.contextmanager
+def collect() -> Iterator[Registry]:
+    """
+    Context manager that enables instrumentation for its duration and
+    yields a :class: `Registry` holding only the events recorded inside it
+    (by any thread). Instrumentation is disabled again on exit unless it
+    was enabled before or another collect() is still active.
+    """
+    global _collecting
+    scoped = Registry()
+    with _sinks_lock:
+        was_enabled = enabled and not _collecting
+        _collecting += 1
+    add_sink(scoped)
+    enable()
+    try:
+        yield scoped
+    finally:
+        remove_sink(scoped)
+        with _sinks_lock:
+            _collecting -= 1
+            if not _collecting and not was_enabled:
+                disable()
@@ -0,0 +1,114 @@
+import grp
+import pwd
+import threading
+from typing import Callable
+
+import pygetfacl.bounded_cache as bc
+import pygetfacl.instrumentation as ins
+
+DEFAULT_NAME_CACHE_SIZE = 4096
+# Seconds before an id that couldn't be resolved is looked up again, so a
+# directory service that was briefly unreachable doesn't leave numbers
+# behind for the life of the process
+NEGATIVE_CACHE_TTL = 300.0
+
+
+class _NameCache:
+    """
+    Thread-safe, bounded id --> name cache shared by every caller in the
+    process. Ids that can't be resolved are cached too (for
+    NEGATIVE_CACHE_TTL seconds), since a failed NSS lookup is usually the
+    slowest kind.
+    """
+
+    def __init__(self, lookup: Callable[[int], str], metric: str = "nss"):
+        """
+        Constructor
+        :param lookup: id --> name, raising KeyError for unknown ids
+        :param metric: instrumentation name for lookups
+        """
+        self._lookup = lookup
+        self._metric = metric
+        self._names = bc.BoundedLRUCache(DEFAULT_NAME_CACHE_SIZE)
+        self._unresolved = bc.BoundedLRUCache(
+            DEFAULT_NAME_CACHE_SIZE, ttl=NEGATIVE_CACHE_TTL
+        )
+        self._lock = threading.Lock()
+
+    def __call__(self, numeric_id: int) -> str:
+        with self._lock:
+            name = self._names.get(numeric_id)
+            if name is not None:
+                ins.increment(f"{self._metric}.hit")
+                return name
+            if self._unresolved.get(numeric_id) is not None:
+                ins.increment(f"{self._metric}.hit")
+                return str(numeric_id)
+        # looked up without the lock, so a slow lookup doesn't block
+        # threads resolving other ids
+        started = ins.start()
+        try:
+            name = self._lookup(numeric_id)
+        except KeyError:
+            ins.stop(f"{self._metric}.lookup_failed", started)
+            with self._lock:
+                self._unresolved.put(numeric_id, True)
+            return str(numeric_id)
+        ins.stop(f"{self._metric}.lookup", started)
+        with self._lock:
+            self._names.put(numeric_id, name)
+        return name
+
+    def clear(self):
+        with self._lock:
+            self._names.clear()
+            self._unresolved.clear()
+
+
+_user_names = _NameCache(
+    lambda uid: pwd.getpwuid(uid).pw_name, metric="nss.user"
+)
+_group_names = _NameCache(
+    lambda gid: grp.getgrgid(gid).gr_name, metric="nss.group"
+)
+
+
+def user_name(uid: int) -> str:
+    """
+    Looks up the user name for a uid the same way getfacl does: numeric
+    ids without a passwd entry are reported as the number itself.
+    :param uid: numeric user id
+    :return: user name, or str(uid) if uid can't be resolved
+    """
+    return _user_names(uid)
+
+
+def group_name(gid: int) -> str:
+    """
+    Looks up the group name for a gid. Unresolvable gids are reported as
+    str(gid).
+    :param gid: numeric group id
+    :return: group name, or str(gid) if gid can't be resolved
+    """
+    return _group_names(gid)
+
+
+def resolve_user_name(name: str) -> str:
+    """
+    Converts a user as reported in numeric mode (e.g. "1000") to a name.
+    Entries that aren't numeric are returned as they are.
+    """
+    return user_name(int(name)) if name.isdigit() else name
+
+
+def resolve_group_name(name: str) -> str:
+    """
+    Converts a group as reported in numeric mode (e.g. "1000") to a name.
+    Entries that aren't numeric are returned as they are.
+    """
+    return group_name(int(name)) if name.isdigit() else name
+
+
+def clear_caches():
+    _user_names.clear()
+    _group_names.clear()
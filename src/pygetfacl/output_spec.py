@@ -1,3 +1,6 @@
+import functools
+import os
+import re
 from dataclasses import dataclass
 from typing import Callable
 
@@ -13,13 +16,14 @@ import pygetfacl.aclpath_exceptions as ae
 import pygetfacl.file_setting as fs
 
 
-@dataclass
+@dataclass(frozen=True)
 class ItemFromGetFacl:
     """
     Specification for piece of information returned by a line in system
     getfacl output.
     attribute: Name used in ACLData class
-    regex: string regex used to extract info from sys getfacl output
+    line_prefix: start of the getfacl output lines that hold this item. The
+    rest of each such line is the item's value.
     file_setting_type: Enum corresponding to concrete implementation of
     FileSettingString
     required: bool indicating whether item must be present
@@ -28,7 +32,7 @@ class ItemFromGetFacl:
     """
 
     attribute: str
-    regex: str
+    line_prefix: str
     required: bool
     max_entries: int | None
     acl_data_type: (
@@ -51,6 +55,34 @@ class ItemFromGetFacl:
                 self.attribute, len(matched_groups)
             )
 
+    def validated_matches(
+        self, matched_groups: list[str], strict: bool = True
+    ) -> list[str]:
+        """
+        validate_matches(), for strict or non-strict parsing
+        :param strict: if False, a repeated single-value line isn't an
+        error (the last one wins). Missing required lines still are.
+        :return: the matches to_acl_constructor_format() should use
+        """
+        if strict:
+            self.validate_matches(matched_groups)
+            return matched_groups
+        if self.required and not matched_groups:
+            raise ae.InsufficientRegexMatches(self.attribute, 0)
+        if self.max_entries == 1:
+            return matched_groups[-1:]
+        return matched_groups
+
+    def to_validated_acl_format(
+        self, matched_groups: list[str], strict: bool = True
+    ):
+        """
+        validated_matches() then to_acl_constructor_format()
+        """
+        return self.to_acl_constructor_format(
+            self.validated_matches(matched_groups, strict=strict)
+        )
+
     def to_max_one_item_acl_format(self, matched_groups: list[str]):
         assert len(matched_groups) <= 1
         if len(matched_groups) == 0:
@@ -63,9 +95,11 @@ class ItemFromGetFacl:
             return {}
         else:
             pairs = [item.split(":") for item in matched_groups]
-            assert all([len(pair) == 2 for pair in pairs])
+            for pair in pairs:
+                if len(pair) != 2:
+                    raise ae.SpecialPermissionsParsingError(len(pair))
             return {
-                name: self.acl_data_type(permission)
+                unescape_getfacl_name(name): self.acl_data_type(permission)
                 for name, permission in pairs
             }
 
@@ -97,6 +131,145 @@ class ItemFromGetFacl:
     #         return {key: value for key, value in key_vals}
 
 
+# backslash + three octal digits, as getfacl escapes bytes in names
+_NAME_ESCAPE_REGEX = re.compile(rb"\\([0-3][0-7]{2})")
+
+
+def _unescape_byte(match: re.Match) -> bytes:
+    return bytes((int(match.group(1), 8),))
+
+
+def unescape_getfacl_name(name: str | bytes) -> str:
+    """
+    Undoes the escaping getfacl applies to file, user and group names
+    (spaces, backslashes, non-ASCII bytes): each backslash + three octal
+    digit escape becomes the byte it stands for. Bytes that aren't valid
+    UTF-8 are kept as surrogate escapes (like os.fsdecode), so
+    os.fsencode() of the result gives back the original name. Inverse of
+    :func: `escape_getfacl_name`.
+    """
+    if isinstance(name, str):
+        if "\\" not in name:
+            return name
+        name = os.fsencode(name)
+    elif b"\\" not in name:
+        return os.fsdecode(name)
+    return os.fsdecode(_NAME_ESCAPE_REGEX.sub(_unescape_byte, name))
+
+
+# Built once at import; ItemFromGetFacl is frozen, so these are shared by
+# every parse.
+GETFACL_OUTPUT_ITEMS = (
+    ItemFromGetFacl(
+        attribute="owning_user",
+        line_prefix="# owner:",
+        required=True,
+        max_entries=1,
+        acl_data_type=unescape_getfacl_name,
+    ),
+    ItemFromGetFacl(
+        attribute="owning_group",
+        line_prefix="# group:",
+        required=True,
+        max_entries=1,
+        acl_data_type=unescape_getfacl_name,
+    ),
+    ItemFromGetFacl(
+        attribute="flags",
+        line_prefix="# flags:",
+        required=False,
+        max_entries=1,
+        acl_data_type=fs.FlagSetting.from_string,
+    ),
+    ItemFromGetFacl(
+        attribute="user",
+        line_prefix="user::",
+        required=True,
+        max_entries=1,
+        acl_data_type=fs.PermissionSetting.from_string,
+    ),
+    ItemFromGetFacl(
+        attribute="special_users",
+        line_prefix="user:",
+        required=False,
+        max_entries=None,
+        acl_data_type=fs.PermissionSetting.from_string,
+    ),
+    ItemFromGetFacl(
+        attribute="group",
+        line_prefix="group::",
+        required=True,
+        max_entries=1,
+        acl_data_type=fs.PermissionSetting.from_string,
+    ),
+    ItemFromGetFacl(
+        attribute="special_groups",
+        line_prefix="group:",
+        required=False,
+        max_entries=None,
+        acl_data_type=fs.PermissionSetting.from_string,
+    ),
+    ItemFromGetFacl(
+        attribute="mask",
+        line_prefix="mask::",
+        required=False,
+        max_entries=1,
+        acl_data_type=fs.PermissionSetting.from_string,
+    ),
+    ItemFromGetFacl(
+        attribute="other",
+        line_prefix="other::",
+        required=True,
+        max_entries=1,
+        acl_data_type=fs.PermissionSetting.from_string,
+    ),
+    ItemFromGetFacl(
+        attribute="default_user",
+        line_prefix="default:user::",
+        required=False,
+        max_entries=1,
+        acl_data_type=fs.PermissionSetting.from_string,
+    ),
+    ItemFromGetFacl(
+        attribute="default_special_users",
+        line_prefix="default:user:",
+        required=False,
+        max_entries=None,
+        acl_data_type=fs.PermissionSetting.from_string,
+    ),
+    ItemFromGetFacl(
+        attribute="default_group",
+        line_prefix="default:group::",
+        required=False,
+        max_entries=1,
+        acl_data_type=fs.PermissionSetting.from_string,
+    ),
+    ItemFromGetFacl(
+        attribute="default_special_groups",
+        line_prefix="default:group:",
+        required=False,
+        max_entries=None,
+        acl_data_type=fs.PermissionSetting.from_string,
+    ),
+    ItemFromGetFacl(
+        attribute="default_mask",
+        line_prefix="default:mask::",
+        required=False,
+        max_entries=1,
+        acl_data_type=fs.PermissionSetting.from_string,
+    ),
+    ItemFromGetFacl(
+        attribute="default_other",
+        line_prefix="default:other::",
+        required=False,
+        max_entries=1,
+        acl_data_type=fs.PermissionSetting.from_string,
+    ),
+)
+
+_ITEMS_BY_PREFIX = {item.line_prefix: item for item in GETFACL_OUTPUT_ITEMS}
+
+
 def getfacl_output_items() -> list[ItemFromGetFacl]:
     """
     Provides output spec entry for each possible type of info from getfacl
@@ -104,110 +277,374 @@ def getfacl_output_items() -> list[ItemFromGetFacl]:
         List of ItemFromGetFacl objects
 
     """
-    return [
-        ItemFromGetFacl(
-            attribute="owning_user",
-            regex="(?<=^# owner:).*$",
-            required=True,
-            max_entries=1,
-            acl_data_type=str,
-        ),
-        ItemFromGetFacl(
-            attribute="owning_group",
-            regex="(?<=^# group:).*$",
-            required=True,
-            max_entries=1,
-            acl_data_type=str,
-        ),
-        ItemFromGetFacl(
-            attribute="flags",
-            regex="(?<=^# flags:).*$",
-            required=False,
-            max_entries=1,
-            acl_data_type=fs.FlagSetting.from_string,
-        ),
-        ItemFromGetFacl(
-            attribute="user",
-            regex="(?<=^user::).*$",
-            required=True,
-            max_entries=1,
-            acl_data_type=fs.PermissionSetting.from_string,
-        ),
-        ItemFromGetFacl(
-            attribute="special_users",
-            regex="(?<=^user:)(?!:).*$",
-            required=False,
-            max_entries=None,
-            acl_data_type=fs.PermissionSetting.from_string,
-        ),
-        ItemFromGetFacl(
-            attribute="group",
-            regex="(?<=^group::).*$",
-            required=True,
-            max_entries=1,
-            acl_data_type=fs.PermissionSetting.from_string,
-        ),
-        ItemFromGetFacl(
-            attribute="special_groups",
-            regex="(?<=^group:)(?!:).*$",
-            required=False,
-            max_entries=None,
-            acl_data_type=fs.PermissionSetting.from_string,
-        ),
-        ItemFromGetFacl(
-            attribute="mask",
-            regex="(?<=^mask::).*$",
-            required=False,
-            max_entries=1,
-            acl_data_type=fs.PermissionSetting.from_string,
-        ),
-        ItemFromGetFacl(
-            attribute="other",
-            regex="(?<=^other::).*$",
-            required=True,
-            max_entries=1,
-            acl_data_type=fs.PermissionSetting.from_string,
-        ),
-        ItemFromGetFacl(
-            attribute="default_user",
-            regex="(?<=^default:user::).*$",
-            required=False,
-            max_entries=1,
-            acl_data_type=fs.PermissionSetting.from_string,
-        ),
-        ItemFromGetFacl(
-            attribute="default_special_users",
-            regex="(?<=^default:user:)(?!:).*$",
-            required=False,
-            max_entries=None,
-            acl_data_type=fs.PermissionSetting.from_string,
-        ),
-        ItemFromGetFacl(
-            attribute="default_group",
-            regex="(?<=^default:group::).*$",
-            required=False,
-            max_entries=1,
-            acl_data_type=fs.PermissionSetting.from_string,
-        ),
-        ItemFromGetFacl(
-            attribute="default_special_groups",
-            regex="(?<=^default:group:)(?!:).*$",
-            required=False,
-            max_entries=None,
-            acl_data_type=fs.PermissionSetting.from_string,
-        ),
-        ItemFromGetFacl(
-            attribute="default_mask",
-            regex="(?<=^default:mask::)(?!:).*$",
-            required=False,
-            max_entries=1,
-            acl_data_type=fs.PermissionSetting.from_string,
-        ),
-        ItemFromGetFacl(
-            attribute="default_other",
-            regex="(?<=^default:other::).*$",
-            required=False,
-            max_entries=1,
-            acl_data_type=fs.PermissionSetting.from_string,
+    return list(GETFACL_OUTPUT_ITEMS)
+
+
+def _line_prefix_end(line: str) -> int:
+    """
+    Finds where the item prefix of a getfacl output line ends, e.g. after
+    "# owner:", "user::", "user:" (named entry) or "default:mask::".
+    Returns 0 if line has no prefix.
+    """
+    if line.startswith("#"):
+        return line.find(":") + 1
+    start = 8 if line.startswith("default:") else 0
+    end = line.find(":", start) + 1
+    if end and line.startswith(":", end):
+        # "::" --> base entry (no user/group name)
+        end += 1
+    return end
+
+
+def _item_line_regex(item: ItemFromGetFacl) -> re.Pattern:
+    # same lines tokenize_getfacl_output() files under item: a named entry
+    # prefix ("user:") must not be followed by a second ":" ("user::")
+    named_entry = item.max_entries is None
+    return re.compile(
+        f"^{re.escape(item.line_prefix)}{'(?!:)' if named_entry else ''}(.*)$",
+        flags=re.MULTILINE,
+    )
+
+
+_ITEM_LINE_REGEXES = {
+    item.attribute: _item_line_regex(item) for item in GETFACL_OUTPUT_ITEMS
+}
+
+
+def find_item_values(
+    item: ItemFromGetFacl, cmd_output: str, start: int = 0, end: int = -1
+) -> list[str]:
+    """
+    Finds the values of the lines holding item in cmd_output[start:end],
+    without tokenizing the other lines or copying the text. start must be
+    0 or just after a newline.
+    Returns:
+        Same list as tokenize_getfacl_output(cmd_output[start:end]) has
+        under item.attribute
+    """
+    if end < 0:
+        end = len(cmd_output)
+    return _ITEM_LINE_REGEXES[item.attribute].findall(cmd_output, start, end)
+
+
+def tokenize_getfacl_output(cmd_output: str) -> dict[str, list[str]]:
+    """
+    Makes a single pass over getfacl output, sorting the value of each line
+    under the attribute of the ItemFromGetFacl its prefix belongs to.
+    Lines without a known prefix (e.g. "# file:") are ignored.
+    Returns:
+        Dict mapping each attribute name to its (possibly empty) list of
+        values, in output order
+    """
+    matches = {item.attribute: [] for item in GETFACL_OUTPUT_ITEMS}
+    for line in cmd_output.split("\n"):
+        end = _line_prefix_end(line)
+        item = _ITEMS_BY_PREFIX.get(line[:end])
+        if item is not None:
+            matches[item.attribute].append(line[end:])
+    return matches
+
+
+def decode_getfacl_output(cmd_output: str, strict: bool = True) -> dict:
+    """
+    Tokenizes getfacl output, validates each item and converts it to its
+    ACLData constructor argument
+    :param strict: if False, a repeated single-value line isn't an error
+    (the last one wins)
+    Raises:
+        ExcessRegexMatches, InsufficientRegexMatches,
+        InvalidFileSettingString, SpecialPermissionsParsingError
+    Returns:
+        Dict mapping each attribute name to its value (without
+        raw_system_output)
+    """
+    matches = tokenize_getfacl_output(cmd_output)
+    return {
+        item.attribute: item.to_validated_acl_format(
+            matches[item.attribute], strict=strict
+        )
+        for item in GETFACL_OUTPUT_ITEMS
+    }
+
+
+def _decode_trusted_name(value: str) -> str:
+    return unescape_getfacl_name(value.strip())
+
+
+def _decode_trusted_flags(value: str) -> fs.FlagSetting:
+    return fs._FLAG_SETTINGS_BY_STRING[value.strip()]
+
+
+# "# owner" etc. --> (attribute, decoder) for the trusted parse. Header
+# values keep the space after the ":", so are stripped.
+_TRUSTED_HEADERS = {
+    item.line_prefix[:-1]: (
+        item.attribute,
+        (
+            _decode_trusted_name
+            if item.acl_data_type is unescape_getfacl_name
+            else _decode_trusted_flags
         ),
+    )
+    for item in GETFACL_OUTPUT_ITEMS
+    if item.line_prefix.startswith("#")
+}
+# entry tag ("user", "default:group", ...) --> attribute of its base entry
+# ("user::rwx") and of its named entries ("user:name:rwx")
+_TRUSTED_ENTRIES = {}
+for _item in GETFACL_OUTPUT_ITEMS:
+    if _item.line_prefix.endswith("::"):
+        _TRUSTED_ENTRIES.setdefault(_item.line_prefix[:-2], [None, None])[
+            0
+        ] = _item.attribute
+    elif not _item.line_prefix.startswith("#"):
+        _TRUSTED_ENTRIES.setdefault(_item.line_prefix[:-1], [None, None])[
+            1
+        ] = _item.attribute
+del _item
+_SINGLE_VALUE_ATTRIBUTES = tuple(
+    item.attribute for item in GETFACL_OUTPUT_ITEMS if item.max_entries == 1
+)
+_NAMED_ENTRY_ATTRIBUTES = tuple(
+    item.attribute for item in GETFACL_OUTPUT_ITEMS if item.max_entries is None
+)
+_REQUIRED_ATTRIBUTES = tuple(
+    item.attribute for item in GETFACL_OUTPUT_ITEMS if item.required
+)
+
+
+def decode_trusted_getfacl_output(cmd_output: str) -> dict | None:
+    """
+    Decodes getfacl -E output straight into ACLData constructor arguments,
+    splitting each entry line at its last two ":" and looking the
+    permission string up in a table. validate_matches and
+    validate_bit_string are skipped. Meant for output of the getfacl
+    executable, which is well-formed by construction. A repeated
+    single-value line is not reported (the last one wins).
+    Returns:
+        Dict mapping each attribute name to its value (without
+        raw_system_output), or None if a permission string isn't valid, an
+        entry line can't be resolved, a required line is missing, or the
+        output has "#effective:" comments (no -E). Callers then fall back
+        to the validating parse, which raises the appropriate exception
+        (or ignores lines it doesn't recognize).
+    """
+    if "\t" in cmd_output:
+        return None
+    kwargs = dict.fromkeys(_SINGLE_VALUE_ATTRIBUTES)
+    for attribute in _NAMED_ENTRY_ATTRIBUTES:
+        kwargs[attribute] = {}
+    permissions = fs._PERMISSION_SETTINGS_BY_STRING
+    try:
+        for line in cmd_output.split("\n"):
+            if not line:
+                continue
+            if line[0] == "#":
+                head, sep, value = line.partition(":")
+                header = _TRUSTED_HEADERS.get(head)
+                if header is not None and sep:
+                    attribute, decode = header
+                    kwargs[attribute] = decode(value)
+                continue
+            head, _, permission = line.rpartition(":")
+            tag, _, name = head.rpartition(":")
+            entry = _TRUSTED_ENTRIES.get(tag)
+            if entry is None:
+                return None
+            if name:
+                if "\\" in name:
+                    name = unescape_getfacl_name(name)
+                kwargs[entry[1]][name] = permissions[permission]
+            else:
+                kwargs[entry[0]] = permissions[permission]
+    except KeyError:
+        return None
+    for attribute in _REQUIRED_ATTRIBUTES:
+        if kwargs[attribute] is None:
+            return None
+    return kwargs
+
+
+# header line prefix --> attribute, for getfacl output held in bytes
+_BYTES_HEADERS = {
+    head.encode(): attribute
+    for head, (attribute, _) in _TRUSTED_HEADERS.items()
+}
+_BYTES_ENTRIES = {
+    tag.encode(): attributes for tag, attributes in _TRUSTED_ENTRIES.items()
+}
+_PERMISSIONS_BY_BYTES = {
+    string.encode(): setting
+    for string, setting in fs._PERMISSION_SETTINGS_BY_STRING.items()
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _decode_name_bytes(name: bytes) -> str:
+    # the same few principals appear on most paths, so decode each once
+    return unescape_getfacl_name(name)
+
+
+_FLAGS_BY_BYTES = {
+    string.encode(): setting
+    for string, setting in fs._FLAG_SETTINGS_BY_STRING.items()
+}
+
+
+def _has_entry_prefix(line: bytes) -> bool:
+    """
+    Whether tokenize_getfacl_output() would file line under an entry item
+    (see _line_prefix_end)
+    """
+    colon = line.find(b":", 8 if line.startswith(b"default:") else 0)
+    entry = _BYTES_ENTRIES.get(line[:colon]) if colon >= 0 else None
+    if entry is None:
+        return False
+    return line[colon + 1:colon + 2] == b":" or entry[1] is not None
+
+
+def _decode_getfacl_block_bytes(block: bytes, strict: bool) -> dict:
+    """
+    decode_getfacl_output_bytes() for a block that has already been sliced
+    out of its buffer. Entry lines are split at their last two ":", as in
+    the trusted parse, with table lookups for names, permissions and
+    flags. Anything that doesn't decode that way (a bad permission string, a
+    named entry without exactly one name and one permission, a missing or
+    repeated line) is handed to decode_getfacl_output(), so errors (and
+    results) are exactly those of the str parse.
+    """
+    kwargs = dict.fromkeys(_SINGLE_VALUE_ATTRIBUTES)
+    for attribute in _NAMED_ENTRY_ATTRIBUTES:
+        kwargs[attribute] = {}
+    permissions = _PERMISSIONS_BY_BYTES
+    decode_name = _decode_name_bytes
+    repeated = False
+    try:
+        for line in block.split(b"\n"):
+            if not line:
+                continue
+            if line[0] == 0x23:  # "#"
+                head, sep, value = line.partition(b":")
+                attribute = _BYTES_HEADERS.get(head)
+                if attribute is None or not sep:
+                    continue
+                if attribute == "flags":
+                    value = _FLAGS_BY_BYTES[value.strip()]
+                else:
+                    value = decode_name(value.strip())
+            else:
+                head, _, permission = line.rpartition(b":")
+                tag, _, name = head.rpartition(b":")
+                entry = _BYTES_ENTRIES.get(tag)
+                if entry is None:
+                    if _has_entry_prefix(line):
+                        # e.g. "user:name" (no permission field)
+                        raise KeyError(tag)
+                    continue
+                if name:
+                    if entry[1] is not None:
+                        kwargs[entry[1]][decode_name(name)] = permissions[
+                            permission
+                        ]
+                    continue
+                attribute = entry[0]
+                value = permissions[permission]
+            if kwargs[attribute] is not None:
+                repeated = True
+            kwargs[attribute] = value
+    except KeyError:
+        return decode_getfacl_output(os.fsdecode(block), strict=strict)
+    if (strict and repeated) or None in (
+        kwargs[attribute] for attribute in _REQUIRED_ATTRIBUTES
+    ):
+        return decode_getfacl_output(os.fsdecode(block), strict=strict)
+    return kwargs
+
+
+def decode_getfacl_output_bytes(
+    buffer: bytes | bytearray | memoryview,
+    start: int = 0,
+    end: int = -1,
+    strict: bool = True,
+) -> dict:
+    """
+    Parses the getfacl output in buffer[start:end] without decoding it to
+    str first, e.g. one path's block in the raw output of a multi-path
+    getfacl call. Only that block is copied out of buffer, and only the
+    names in it are decoded. Names are unescaped (see
+    :func: `unescape_getfacl_name`), and names that aren't valid UTF-8
+    don't fail. Results and errors are the same as those of
+    :func: `decode_getfacl_output` for os.fsdecode() of the block.
+    :param strict: if False, a repeated single-value line isn't an error
+    (the last one wins)
+    Raises:
+        ExcessRegexMatches, InsufficientRegexMatches,
+        InvalidFileSettingString, SpecialPermissionsParsingError
+    Returns:
+        Dict mapping each attribute name to its value (without
+        raw_system_output)
+    """
+    if end < 0:
+        end = len(buffer)
+    return _decode_getfacl_block_bytes(bytes(buffer[start:end]), strict)
+
+
+_FILE_HEADER_REGEX = re.compile("^(?=# file:)", flags=re.MULTILINE)
+_NON_SPACE_REGEX = re.compile(r"\S")
+_FILE_HEADER_REGEX_BYTES = re.compile(rb"^(?=# file:)", flags=re.MULTILINE)
+_NON_SPACE_REGEX_BYTES = re.compile(rb"\S")
+
+
+def getfacl_block_spans(
+    cmd_output: str | bytes | bytearray | memoryview,
+) -> list[tuple[int, int]]:
+    """
+    Finds the block of each path in the output of a multi-path getfacl
+    call (as str or bytes), without copying them out.
+    Returns:
+        List of (start, end) offsets into cmd_output, in the order getfacl
+        printed the blocks. cmd_output[start:end] is the block
+        split_getfacl_output() returns.
+    """
+    if isinstance(cmd_output, str):
+        header_regex, non_space_regex = _FILE_HEADER_REGEX, _NON_SPACE_REGEX
+    else:
+        header_regex = _FILE_HEADER_REGEX_BYTES
+        non_space_regex = _NON_SPACE_REGEX_BYTES
+    bounds = [0]
+    bounds.extend(
+        match.start()
+        for match in header_regex.finditer(cmd_output)
+        if match.start()
+    )
+    bounds.append(len(cmd_output))
+    return [
+        (start, end)
+        for start, end in zip(bounds, bounds[1:])
+        if non_space_regex.search(cmd_output, start, end)
     ]
+
+
+def split_getfacl_output(cmd_output: str) -> list[str]:
+    """
+    Splits output of a multi-path getfacl call into one block per path.
+    Each block starts at its "# file:" header.
+    Returns:
+        List of single-path getfacl outputs, in the order getfacl printed them
+    """
+    blocks = _FILE_HEADER_REGEX.split(cmd_output)
+    return [block for block in blocks if block.strip()]
+
+
+def escape_getfacl_name(name: str | bytes) -> str:
+    """
+    Escapes a file name the way getfacl prints it in "# file:" headers:
+    every byte that is whitespace, non-printable, non-ASCII or a backslash
+    becomes a backslash followed by three octal digits (e.g. " " --> \\040).
+    """
+    return "".join(
+        chr(byte)
+        if 0x21 <= byte <= 0x7E and byte != 0x5C
+        else f"\\{byte:03o}"
+        for byte in os.fsencode(name)
+    )
@@ -0,0 +1,282 @@
+import os
+from collections import Counter, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pygetfacl.acl_info_retriever as air
+import pygetfacl.data_containers as dc
+import pygetfacl.tree_scanner as ts
+
+# max number of directory entries a worker visits per task before handing
+# its not-yet-visited directories back to the scheduler
+DEFAULT_ENTRY_BUDGET = 2000
+
+
+def _retrieve_paths(
+    paths: list[Path],
+    batch_size: int,
+    backend: str,
+    numeric_ids: bool = False,
+    strict: bool = True,
+) -> tuple[
+    list[tuple[Path, dc.ACLData]],
+    list[tuple[Path, int, int]],
+    list[list[Path]],
+    list[OSError],
+]:
+    """
+    Worker task: retrieves ACL info for paths split off an oversized
+    directory listing by :func: `_scan_subtree`
+    :return: same as :func: `_scan_subtree` (with nothing left over)
+    """
+    errors = []
+    results = list(
+        air._MultiPathACLInfoRetriever(
+            paths,
+            batch_size=batch_size,
+            backend=backend,
+            numeric_ids=numeric_ids,
+            strict=strict,
+            onerror=errors.append,
+        ).iter_getfacl()
+    )
+    return results, [], [], errors
+
+
+def _scan_subtree(
+    dir_path: Path,
+    depth: int,
+    root_dev: int,
+    entry_budget: int,
+    batch_size: int,
+    backend: str,
+    walk_kwargs: dict,
+    numeric_ids: bool = False,
+    strict: bool = True,
+) -> tuple[
+    list[tuple[Path, dc.ACLData]],
+    list[tuple[Path, int, int]],
+    list[list[Path]],
+    list[OSError],
+]:
+    """
+    Worker task: walks depth-first from dir_path until it has listed
+    entry_budget directory entries (reported by include or not), then
+    retrieves the ACL info of the paths found in batches. If a single
+    directory has more entries than that, only the first entry_budget
+    paths are retrieved, and the rest are handed back in entry_budget sized
+    chunks.
+    :return: (results, (directory, depth, st_dev) of directories left
+    unvisited, chunks of paths left to retrieve, errors to pass to the
+    caller's onerror)
+    """
+    errors = []
+    reported = []
+    # entries listed so far, so a selective include doesn't make one task
+    # walk the whole tree
+    num_listed = 0
+    stack = [(dir_path, depth)]
+    while stack and num_listed < entry_budget:
+        current_dir, current_depth = stack.pop()
+        found, subdirs, num_entries = ts._scan_directory(
+            current_dir,
+            current_depth,
+            root_dev=root_dev,
+            visited=set(),
+            onerror=errors.append,
+            **walk_kwargs,
+        )
+        reported.extend(found)
+        num_listed += num_entries
+        stack.extend(reversed(subdirs))
+
+    chunks = [
+        reported[start: start + entry_budget]
+        for start in range(entry_budget, len(reported), entry_budget)
+    ]
+    results, _, _, retrieval_errors = _retrieve_paths(
+        reported[:entry_budget],
+        batch_size=batch_size,
+        backend=backend,
+        numeric_ids=numeric_ids,
+        strict=strict,
+    )
+    errors.extend(retrieval_errors)
+
+    leftovers = []
+    for leftover_dir, leftover_depth in stack:
+        try:
+            leftover_dev = os.stat(leftover_dir).st_dev
+        except OSError as err:
+            errors.append(err)
+            continue
+        leftovers.append((leftover_dir, leftover_depth, leftover_dev))
+    return results, leftovers, chunks, errors
+
+
+def getfacl_tree_parallel(
+    root: str | Path,
+    max_workers: int | None = None,
+    symlinks: str = "skip",
+    one_filesystem: bool = False,
+    max_depth: int | None = None,
+    include: Callable[[Path], bool] | None = None,
+    exclude: Callable[[Path], bool] | None = None,
+    onerror: Callable[[OSError], None] | None = None,
+    batch_size: int = air.DEFAULT_BATCH_SIZE,
+    backend: str | None = None,
+    entry_budget: int = DEFAULT_ENTRY_BUDGET,
+    max_in_flight: int | None = None,
+    max_in_flight_per_device: int | None = None,
+    numeric_ids: bool = False,
+    strict: bool = True,
+) -> Iterator[tuple[Path, dc.ACLData]]:
+    """
+    Parallel counterpart of :func: `getfacl_tree` for very large trees.
+    Subtrees are scanned by a process pool. Each task walks until it has
+    listed entry_budget entries, then hands the directories it didn't get to
+    back to the scheduler, so large subtrees are split up among idle
+    workers as the scan proceeds. Pending directories are queued per st_dev
+    and dispatched round-robin, with a per-device cap on running tasks, so
+    a slow mount can't occupy every worker. Results are yielded as tasks
+    finish (not in walk order); at most max_in_flight tasks, each holding
+    at most entry_budget results, are outstanding at a time. A directory
+    with more than entry_budget entries is split across several tasks.
+    :param root: top of the tree
+    :param max_workers: number of worker processes. None --> os.cpu_count()
+    :param symlinks: "skip" or "yield" ("follow" isn't supported, since
+    workers can't share the set of visited directories)
+    :param include: as in getfacl_tree. Must be picklable (e.g. a module
+    level function), as must exclude.
+    :param onerror: called in this process with each OSError found
+    :param entry_budget: number of directory entries a task lists before
+    handing the rest of its subtree back, and max number of paths it
+    reports
+    :param max_in_flight: max number of outstanding tasks.
+    None --> 2 * max_workers
+    :param max_in_flight_per_device: max number of outstanding tasks per
+    device while more than one device has pending work.
+    None --> max_workers // 2 (at least 1)
+    (other params are as in :func: `getfacl_tree`)
+    :return: iterator of (path, :class: `ACLData`) pairs
+    """
+    ts._validate_symlink_policy(symlinks)
+    if symlinks == "follow":
+        raise ValueError("symlinks='follow' is not supported in parallel")
+    if entry_budget < 1:
+        raise ValueError("entry_budget must be >= 1")
+    if backend is None:
+        # resolve here, since workers may not share this process's default
+        backend = air.get_default_backend()
+    air._validate_backend(backend)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = 2 * max_workers
+    if max_in_flight_per_device is None:
+        max_in_flight_per_device = max(1, max_workers // 2)
+
+    root = air._to_path(root)
+    if exclude is not None and exclude(root):
+        return
+    root_dev = os.stat(root).st_dev
+    if include is None or include(root):
+        yield from air._MultiPathACLInfoRetriever(
+            [root],
+            backend=backend,
+            numeric_ids=numeric_ids,
+            strict=strict,
+            onerror=onerror if onerror is not None else ts._ignore_error,
+        ).iter_getfacl()
+    if not os.path.isdir(root):
+        return
+
+    walk_kwargs = {
+        "symlinks": symlinks,
+        "one_filesystem": one_filesystem,
+        "max_depth": max_depth,
+        "include": include,
+        "exclude": exclude,
+    }
+    # st_dev --> (directory, depth) pairs waiting to be scanned, and lists
+    # of paths (split off oversized directories) waiting to be retrieved
+    pending = defaultdict(deque)
+    pending[root_dev].append((root, 0))
+    # future --> st_dev of the directory it scans (or its paths are in)
+    in_flight = {}
+    running_per_device = Counter()
+
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit_ready():
+        submitted = True
+        while submitted and len(in_flight) < max_in_flight:
+            submitted = False
+            active_devices = set(pending) | set(running_per_device)
+            device_cap = (
+                max_in_flight_per_device
+                if len(active_devices) > 1
+                else max_in_flight
+            )
+            for device in list(pending):
+                if len(in_flight) >= max_in_flight:
+                    break
+                if running_per_device[device] >= device_cap:
+                    continue
+                item = pending[device].popleft()
+                if not pending[device]:
+                    del pending[device]
+                if isinstance(item, list):
+                    future = executor.submit(
+                        _retrieve_paths,
+                        item,
+                        batch_size=batch_size,
+                        backend=backend,
+                        numeric_ids=numeric_ids,
+                        strict=strict,
+                    )
+                else:
+                    dir_path, depth = item
+                    future = executor.submit(
+                        _scan_subtree,
+                        dir_path,
+                        depth,
+                        root_dev=root_dev,
+                        entry_budget=entry_budget,
+                        batch_size=batch_size,
+                        backend=backend,
+                        walk_kwargs=walk_kwargs,
+                        numeric_ids=numeric_ids,
+                        strict=strict,
+                    )
+                in_flight[future] = device
+                running_per_device[device] += 1
+                submitted = True
+
+    try:
+        submit_ready()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                device = in_flight.pop(future)
+                running_per_device[device] -= 1
+                if not running_per_device[device]:
+                    del running_per_device[device]
+                results, leftovers, chunks, errors = future.result()
+                if chunks:
+                    # retrieved before going deeper, so a large listing
+                    # isn't held for long
+                    pending[device].extendleft(reversed(chunks))
+                for leftover_dir, leftover_depth, leftover_dev in leftovers:
+                    pending[leftover_dev].append(
+                        (leftover_dir, leftover_depth)
+                    )
+                # keep workers busy while the caller consumes results
+                submit_ready()
+                if onerror is not None:
+                    for err in errors:
+                        onerror(err)
+                yield from results
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,68 @@
+import pygetfacl.bounded_cache as bc
+import pygetfacl.data_containers as dc
+import pygetfacl.instrumentation as ins
+
+DEFAULT_PARSE_CACHE_SIZE = 1024
+
+
+def normalize_getfacl_output(cmd_output: str) -> str:
+    """
+    Strips the parts of single-path getfacl output that are specific to the
+    path (the "# file:" header) so identical ACLs have identical text.
+    """
+    if cmd_output.startswith("# file:"):
+        cmd_output = cmd_output[cmd_output.find("\n") + 1:]
+    return cmd_output.rstrip("\n")
+
+
+class ParseCache:
+    """
+    LRU cache of parsed getfacl output, keyed by the normalized entry text
+    and the strict flag it was parsed with.
+    In typical trees most paths share one of a few distinct ACLs, so most
+    parses become a dict lookup, and every path with the same ACL shares one
+    immutable :class: `CompactACLData` object.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_PARSE_CACHE_SIZE):
+        """
+        Constructor
+        :param maxsize: max number of distinct ACLs held
+        """
+        self._cache = bc.BoundedLRUCache(maxsize)
+
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    def stats(self) -> bc.CacheStats:
+        return self._cache.stats
+
+    def parse(
+        self, cmd_output: str, strict: bool = True
+    ) -> dc.CompactACLData:
+        """
+        Parses single-path getfacl output, reusing the result of an earlier
+        parse of the same ACL when possible
+        :param cmd_output: Linux getfacl std out
+        :param strict: as in :meth: `ACLData.from_getfacl_cmd_output`
+        :return: shared :class: `CompactACLData` object (without
+        raw_system_output, since that differs from path to path)
+        """
+        text = normalize_getfacl_output(cmd_output)
+        # a lenient parse accepts text a strict one rejects, so the two
+        # don't share entries
+        key = (text, strict)
+        acl_data = self._cache.get(key)
+        if acl_data is None:
+            ins.increment("parse_cache.miss")
+            acl_data = dc.CompactACLData.from_getfacl_cmd_output(
+                text, strict=strict
+            )
+            self._cache.put(key, acl_data)
+        else:
+            ins.increment("parse_cache.hit")
+        return acl_data
+
+    def clear(self):
+        self._cache.clear()
@@ -0,0 +1,308 @@
+import array
+import os
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import pygetfacl.data_containers as dc
+import pygetfacl.snapshot as sn
+
+USER = "user"
+GROUP = "group"
+# permission --> bit, as in PermissionSetting.bits
+_PERMISSION_BITS = {"r": 4, "w": 2, "x": 1}
+
+
+class PathIdSet:
+    """
+    Sorted set of integer path ids stored as runs of consecutive ids
+    (parallel arrays of run starts and exclusive run ends). Paths are
+    numbered in sorted order, so the many files of a directory that share
+    an ACL collapse into a single run.
+    """
+
+    def __init__(self):
+        self._starts = array.array("I")
+        self._ends = array.array("I")
+        self._len = 0
+
+    def add(self, path_id: int):
+        """
+        Adds path_id, which must be greater than every id already added
+        """
+        if self._ends and self._ends[-1] == path_id:
+            self._ends[-1] = path_id + 1
+        else:
+            self._starts.append(path_id)
+            self._ends.append(path_id + 1)
+        self._len += 1
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, path_id: int):
+        idx = bisect_right(self._starts, path_id) - 1
+        return idx >= 0 and path_id < self._ends[idx]
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in zip(self._starts, self._ends):
+            yield from range(start, end)
+
+    @property
+    def num_runs(self) -> int:
+        return len(self._starts)
+
+    def in_range(self, low: int, high: int) -> Iterator[int]:
+        """
+        Ids in [low, high), in order
+        """
+        idx = max(bisect_right(self._starts, low) - 1, 0)
+        while idx < len(self._starts) and self._starts[idx] < high:
+            yield from range(
+                max(self._starts[idx], low), min(self._ends[idx], high)
+            )
+            idx += 1
+
+    def intersects(self, low: int, high: int) -> bool:
+        return next(self.in_range(low, high), None) is not None
+
+
+class _Grants:
+    """
+    Path ids where a principal has an entry, and where that entry
+    (after the mask) grants r, w and x
+    """
+
+    __slots__ = ("present", "r", "w", "x")
+
+    def __init__(self):
+        self.present = PathIdSet()
+        self.r = PathIdSet()
+        self.w = PathIdSet()
+        self.x = PathIdSet()
+
+    def add(self, path_id: int, bits: int):
+        self.present.add(path_id)
+        if bits & 4:
+            self.r.add(path_id)
+        if bits & 2:
+            self.w.add(path_id)
+        if bits & 1:
+            self.x.add(path_id)
+
+
+def _masked_bits(permission, mask) -> int:
+    return permission.bits if mask is None else permission.bits & mask.bits
+
+
+def _entries(
+    acl_data: dc.ACLData | dc.CompactACLData, default: bool
+) -> Iterator[tuple[str, str, int]]:
+    """
+    (kind, name, effective bits) of each entry naming a user or group
+    """
+    if default:
+        if acl_data.default_user is None:
+            return
+        prefix, mask = "default_", acl_data.default_mask
+        owner_bits = acl_data.default_user.bits
+        group_permission = acl_data.default_group
+    else:
+        prefix, mask = "", acl_data.mask
+        owner_bits = acl_data.user.bits
+        group_permission = acl_data.group
+    yield USER, acl_data.owning_user, owner_bits
+    for name, permission in getattr(
+        acl_data, f"{prefix}special_users"
+    ).items():
+        yield USER, name, _masked_bits(permission, mask)
+    if group_permission is not None:
+        yield GROUP, acl_data.owning_group, _masked_bits(
+            group_permission, mask
+        )
+    for name, permission in getattr(
+        acl_data, f"{prefix}special_groups"
+    ).items():
+        yield GROUP, name, _masked_bits(permission, mask)
+
+
+class PrincipalIndex:
+    """
+    Reverse index from users and groups to the paths whose ACL entries
+    name them: owning user / group, named users / groups, and (kept apart)
+    the default ACL entries. Permissions are indexed after applying the
+    mask. Paths are numbered in sorted (byte) order, so the paths under a
+    directory are a contiguous range of ids, and per-principal id sets are
+    stored as runs (see :class: `PathIdSet`).
+    This records which entries grant what; it doesn't apply the full
+    access check (entry precedence, ancestor search permission), for which
+    see access_check.
+    """
+
+    def __init__(self, sorted_results: Iterable[tuple[bytes, object]]):
+        """
+        Constructor. Use from_results() or from_snapshot() instead.
+        :param sorted_results: (fsencoded path, ACL info) pairs sorted by
+        path
+        """
+        self._paths: list[bytes] = []
+        # (kind, name, default) --> _Grants
+        self._grants: dict[tuple[str, str, bool], _Grants] = {}
+        for path_id, (path_bytes, acl_data) in enumerate(sorted_results):
+            self._paths.append(path_bytes)
+            # a principal can have more than one entry (e.g. the owner can
+            # also be a named user), so combine them first
+            path_grants: dict[tuple[str, str, bool], int] = {}
+            for default in (False, True):
+                for kind, name, bits in _entries(acl_data, default):
+                    key = (kind, name, default)
+                    path_grants[key] = path_grants.get(key, 0) | bits
+            for key, bits in path_grants.items():
+                grants = self._grants.get(key)
+                if grants is None:
+                    grants = self._grants[key] = _Grants()
+                grants.add(path_id, bits)
+
+    @classmethod
+    def from_results(
+        cls,
+        results: Iterable[tuple[Path, dc.ACLData | dc.CompactACLData]],
+    ):
+        """
+        Builds an index from (path, ACL info) pairs, e.g. the output of
+        getfacl_tree()
+        """
+        return cls(
+            sorted(
+                ((os.fsencode(path), acl_data) for path, acl_data in results),
+                key=itemgetter(0),
+            )
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: sn.Snapshot):
+        """
+        Builds an index from a :class: `Snapshot`, whose records are
+        already in path order
+        """
+        return cls(
+            (os.fsencode(path), acl_data)
+            for path, acl_data in snapshot.items()
+        )
+
+    def __len__(self):
+        return len(self._paths)
+
+    def path(self, path_id: int) -> Path:
+        return Path(os.fsdecode(self._paths[path_id]))
+
+    def _subtree_ranges(self, under: str | Path) -> list[tuple[int, int]]:
+        """
+        Id ranges covering under and every path below it
+        """
+        under_bytes = os.fsencode(under)
+        prefix = under_bytes.rstrip(b"/") + b"/"
+        # smallest byte string greater than everything starting with prefix
+        prefix_end = prefix[:-1] + b"0"
+        ranges = []
+        root_idx = bisect_left(self._paths, under_bytes)
+        if (
+            root_idx < len(self._paths)
+            and self._paths[root_idx] == under_bytes
+            and under_bytes != prefix
+        ):
+            ranges.append((root_idx, root_idx + 1))
+        ranges.append(
+            (
+                bisect_left(self._paths, prefix),
+                bisect_left(self._paths, prefix_end),
+            )
+        )
+        return ranges
+
+    def _id_set(
+        self, kind: str, name: str, permission: str | None, default: bool
+    ) -> PathIdSet | None:
+        grants = self._grants.get((kind, name, default))
+        if grants is None:
+            return None
+        if permission is None:
+            return grants.present
+        if permission not in _PERMISSION_BITS:
+            raise ValueError("permission must be one of 'r', 'w', 'x'")
+        return getattr(grants, permission)
+
+    def path_ids(
+        self,
+        name: str,
+        permission: str | None = None,
+        kind: str = USER,
+        default: bool = False,
+        under: str | Path | None = None,
+    ) -> Iterator[int]:
+        """
+        Ids of paths where name has an entry granting permission
+        :param name: user or group name (as stored in the ACL info)
+        :param permission: "r", "w" or "x". None --> any entry, even one
+        granting nothing
+        :param kind: USER or GROUP
+        :param default: if True, look at default ACL entries instead
+        :param under: if given, only paths at or below this one
+        :return: iterator of path ids, in path order
+        """
+        id_set = self._id_set(kind, name, permission, default)
+        if id_set is None:
+            return
+        if under is None:
+            yield from id_set
+            return
+        for low, high in self._subtree_ranges(under):
+            yield from id_set.in_range(low, high)
+
+    def paths(
+        self,
+        name: str,
+        permission: str | None = None,
+        kind: str = USER,
+        default: bool = False,
+        under: str | Path | None = None,
+    ) -> list[Path]:
+        """
+        Paths where name has an entry granting permission, e.g.
+        paths("user_b", "w") for every path user_b's entries let them write
+        (params are as in :meth: `path_ids`)
+        """
+        return [
+            self.path(path_id)
+            for path_id in self.path_ids(
+                name, permission, kind=kind, default=default, under=under
+            )
+        ]
+
+    def principals(
+        self,
+        kind: str = GROUP,
+        under: str | Path | None = None,
+        default: bool | None = None,
+    ) -> set[str]:
+        """
+        Names of the users or groups with an entry anywhere (or anywhere at
+        or below under)
+        :param kind: USER or GROUP
+        :param under: if given, only consider paths at or below this one
+        :param default: True / False --> only default / access ACL entries.
+        None --> both
+        """
+        ranges = None if under is None else self._subtree_ranges(under)
+        found = set()
+        for (entry_kind, name, entry_default), grants in self._grants.items():
+            if entry_kind != kind or name in found:
+                continue
+            if default is not None and entry_default != default:
+                continue
+            if ranges is None or any(
+                grants.present.intersects(low, high) for low, high in ranges
+            ):
+                found.add(name)
+        return found
@@ -0,0 +1,144 @@
+import dataclasses
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pygetfacl.acl_info_retriever as air
+import pygetfacl.bounded_cache as bc
+import pygetfacl.data_containers as dc
+import pygetfacl.instrumentation as ins
+
+DEFAULT_RESULT_CACHE_SIZE = 4096
+
+
+@dataclass
+class _CachedResult:
+    ctime_ns: int
+    # path raw_output / acl_data were retrieved for. Its name is in their
+    # "# file:" header.
+    path: str | None = None
+    raw_output: str | None = None
+    acl_data: dc.ACLData | None = None
+    # other path to the same inode (a hard link, or another spelling of
+    # path) --> acl_data with that path's "# file:" header
+    aliases: dict[str, dc.ACLData] = field(default_factory=dict)
+
+
+def _with_header_for(raw_output: str, path: str) -> str:
+    """
+    raw_output with its "# file:" line replaced by the one getfacl prints
+    for path
+    """
+    header = os.fsdecode(air._getfacl_header(Path(path)))
+    return header + raw_output[raw_output.find("\n") + 1:]
+
+
+class ACLResultCache:
+    """
+    Opt-in cache of ACL retrieval results for frequently queried paths.
+    Entries are keyed by (st_dev, st_ino) and are only reused while the
+    path's st_ctime_ns is unchanged. Since every ACL, mode or ownership
+    change updates ctime, a cheap os.stat decides whether getfacl needs to
+    run at all. Paths that share an inode (hard links, other spellings of
+    a path) share an entry, but each gets raw output with its own
+    "# file:" header.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_RESULT_CACHE_SIZE,
+        ttl: float | None = None,
+        backend: str | None = None,
+    ):
+        """
+        Constructor
+        :param maxsize: max number of paths held
+        :param ttl: seconds a result may be reused for even if ctime is
+        unchanged. None --> no expiry
+        :param backend: backend used for getfacl(). None --> module default
+        at the time of each call
+        """
+        self._cache = bc.BoundedLRUCache(maxsize, ttl=ttl)
+        self._backend = backend
+
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    def stats(self) -> bc.CacheStats:
+        return self._cache.stats
+
+    def _lookup(self, path: str | Path) -> _CachedResult:
+        # stat before retrieving, so a change that races with retrieval
+        # leaves a stale ctime behind and is picked up by the next lookup
+        st = os.stat(path)
+        key = (st.st_dev, st.st_ino)
+        cached = self._cache.get(
+            key, is_valid=lambda result: result.ctime_ns == st.st_ctime_ns
+        )
+        if cached is None:
+            ins.increment("result_cache.miss")
+            cached = _CachedResult(ctime_ns=st.st_ctime_ns)
+            self._cache.put(key, cached)
+        else:
+            ins.increment("result_cache.hit")
+        return cached
+
+    def getfacl_raw(self, path: str | Path) -> str:
+        cached = self._lookup(path)
+        name = str(air._to_path(path))
+        if cached.raw_output is None:
+            cached.raw_output = air._ACLInfoRetriever(path).getfacl_raw()
+            cached.path = name
+        if name == cached.path:
+            return cached.raw_output
+        return _with_header_for(cached.raw_output, name)
+
+    def getfacl(self, path: str | Path) -> dc.ACLData:
+        """
+        Gets ACL info for path, reusing an earlier result if path hasn't
+        changed since. The returned object is shared between calls, so
+        treat it as read-only.
+        :return: a :class: `ACLData` object
+        """
+        cached = self._lookup(path)
+        name = str(air._to_path(path))
+        if cached.acl_data is None:
+            retriever = air._ACLInfoRetriever(path, backend=self._backend)
+            if retriever._backend == "subprocess":
+                if cached.raw_output is None:
+                    cached.raw_output = retriever.getfacl_raw()
+                    cached.path = name
+                cached.acl_data = dc.ACLData.from_getfacl_cmd_output(
+                    cached.raw_output
+                )
+            else:
+                cached.acl_data = retriever.getfacl()
+                cached.path = name
+        if name == cached.path or not (
+            cached.acl_data.raw_system_output.startswith("# file:")
+        ):
+            return cached.acl_data
+        acl_data = cached.aliases.get(name)
+        if acl_data is None:
+            acl_data = dataclasses.replace(
+                cached.acl_data,
+                raw_system_output=_with_header_for(
+                    cached.acl_data.raw_system_output, name
+                ),
+            )
+            cached.aliases[name] = acl_data
+        return acl_data
+
+    def invalidate(self, path: str | Path):
+        """
+        Drops the cached result for path, if any
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return
+        self._cache.invalidate((st.st_dev, st.st_ino))
+
+    def clear(self):
+        self._cache.clear()
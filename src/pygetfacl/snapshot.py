@@ -0,0 +1,423 @@
+import array
+import mmap
+import os
+import struct
+import sys
+from dataclasses import dataclass
+from operator import itemgetter
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import pygetfacl.aclpath_exceptions as ae
+import pygetfacl.data_containers as dc
+import pygetfacl.file_setting as fs
+
+# File layout (all integers little-endian):
+#   header
+#   records: fixed-width, sorted by path bytes (so lookups can bisect)
+#   ACL index: acl_count + 1 u64 offsets into the ACL pool
+#   ACL pool: each distinct ACL once, variable length (see _encode_acl)
+#   string index: string_count + 1 u64 offsets into the string data
+#   string data: paths and principal names, fsencode'd
+SNAPSHOT_MAGIC = b"PGFACLSN"
+SNAPSHOT_VERSION = 1
+
+# magic, version, reserved, record / ACL / string counts, section offsets
+_HEADER = struct.Struct("<8sII3Q5Q")
+# path string id, ACL id, st_dev, st_ino, st_ctime_ns
+_RECORD = struct.Struct("<IIQQq")
+# owning user / group string ids, flags, 8 permission entries,
+# number of entries in each of the 4 named entry fields
+_ACL_FIXED = struct.Struct("<II9B4I")
+# name string id, permission bits
+_NAMED_ENTRY = struct.Struct("<IB")
+_OFFSET = struct.Struct("<Q")
+
+# stored in place of an absent permission / flags entry
+_NONE = 0xFF
+
+_PERMISSION_FIELDS = (
+    "user",
+    "group",
+    "mask",
+    "other",
+    "default_user",
+    "default_group",
+    "default_mask",
+    "default_other",
+)
+_NAMED_ENTRY_FIELDS = (
+    "special_users",
+    "special_groups",
+    "default_special_users",
+    "default_special_groups",
+)
+
+
+@dataclass(frozen=True)
+class SnapshotRecord:
+    path: Path
+    acl_id: int
+    st_dev: int
+    st_ino: int
+    st_ctime_ns: int
+
+
+class _StringTableBuilder:
+    def __init__(self):
+        self._ids: dict[bytes, int] = {}
+        self.encoded: list[bytes] = []
+
+    def id(self, encoded: bytes) -> int:
+        string_id = self._ids.get(encoded)
+        if string_id is None:
+            string_id = self._ids[encoded] = len(self.encoded)
+            self.encoded.append(encoded)
+        return string_id
+
+
+def _permission_byte(setting) -> int:
+    return _NONE if setting is None else setting.bits
+
+
+def _encode_acl(
+    acl_data: dc.ACLData | dc.CompactACLData, strings: _StringTableBuilder
+) -> bytes:
+    named_entries = [
+        getattr(acl_data, field_name) for field_name in _NAMED_ENTRY_FIELDS
+    ]
+    parts = [
+        _ACL_FIXED.pack(
+            strings.id(os.fsencode(acl_data.owning_user)),
+            strings.id(os.fsencode(acl_data.owning_group)),
+            _permission_byte(acl_data.flags),
+            *[
+                _permission_byte(getattr(acl_data, field_name))
+                for field_name in _PERMISSION_FIELDS
+            ],
+            *[len(entries) for entries in named_entries],
+        )
+    ]
+    for entries in named_entries:
+        parts.extend(
+            _NAMED_ENTRY.pack(strings.id(os.fsencode(name)), permission.bits)
+            for name, permission in entries.items()
+        )
+    return b"".join(parts)
+
+
+def _offsets_bytes(lengths: Iterable[int]) -> bytes:
+    offsets = array.array("Q", [0])
+    total = 0
+    for length in lengths:
+        total += length
+        offsets.append(total)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    return offsets.tobytes()
+
+
+def _stat_or_none(path: Path) -> os.stat_result | None:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def write_snapshot(
+    file_path: str | Path,
+    results: Iterable[
+        tuple[Path, dc.ACLData | dc.CompactACLData]
+        | tuple[Path, dc.ACLData | dc.CompactACLData, os.stat_result]
+    ],
+) -> int:
+    """
+    Saves scan results (e.g. from getfacl_tree()) to a binary snapshot
+    that :class: `Snapshot` can open without reading it into memory.
+    Identical ACLs are stored once, and raw_system_output is not kept.
+    The file is written under a temporary name and then renamed into place.
+    :param file_path: snapshot file to create (or replace)
+    :param results: (path, ACL info) pairs, optionally with an
+    os.stat_result for the path as a third item. Paths without one are
+    stat'ed (st_dev / st_ino / st_ctime_ns are 0 if that fails).
+    :return: number of records written
+    """
+    strings = _StringTableBuilder()
+    acl_ids: dict[bytes, int] = {}
+    acl_blobs: list[bytes] = []
+    records = []
+    for path, acl_data, *stat_result in results:
+        st = stat_result[0] if stat_result else _stat_or_none(path)
+        blob = _encode_acl(acl_data, strings)
+        acl_id = acl_ids.get(blob)
+        if acl_id is None:
+            acl_id = acl_ids[blob] = len(acl_blobs)
+            acl_blobs.append(blob)
+        records.append(
+            (
+                os.fsencode(path),
+                acl_id,
+                0 if st is None else st.st_dev,
+                0 if st is None else st.st_ino,
+                0 if st is None else st.st_ctime_ns,
+            )
+        )
+    records.sort(key=itemgetter(0))
+
+    record_bytes = b"".join(
+        _RECORD.pack(strings.id(path_bytes), *fields)
+        for path_bytes, *fields in records
+    )
+    acl_index = _offsets_bytes(len(blob) for blob in acl_blobs)
+    acl_pool = b"".join(acl_blobs)
+    string_index = _offsets_bytes(len(encoded) for encoded in strings.encoded)
+    string_data = b"".join(strings.encoded)
+
+    sections = [record_bytes, acl_index, acl_pool, string_index, string_data]
+    section_offsets = []
+    offset = _HEADER.size
+    for section in sections:
+        section_offsets.append(offset)
+        offset += len(section)
+    header = _HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        0,
+        len(records),
+        len(acl_blobs),
+        len(strings.encoded),
+        *section_offsets,
+    )
+
+    file_path = Path(file_path)
+    temp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(temp_path, "wb") as snapshot_file:
+            snapshot_file.write(header)
+            for section in sections:
+                snapshot_file.write(section)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return len(records)
+
+
+class Snapshot:
+    """
+    Read-only view of a file written by :func: `write_snapshot`. The file
+    is memory-mapped, so opening it costs the same regardless of its size;
+    lookups by path bisect the sorted record table, and ACL info is only
+    decoded into :class: `ACLData` objects when asked for.
+    """
+
+    def __init__(self, file_path: str | Path):
+        """
+        Constructor
+        :param file_path: snapshot file to open
+        """
+        self._file_path = str(file_path)
+        with open(file_path, "rb") as snapshot_file:
+            try:
+                self._mmap = mmap.mmap(
+                    snapshot_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            except ValueError:
+                # mmap refuses empty files
+                raise ae.InvalidSnapshotFile(
+                    self._file_path, "file is empty"
+                ) from None
+        self._read_header()
+        # principal names repeat across ACLs; paths mostly don't
+        self._names: dict[int, str] = {}
+
+    def _read_header(self):
+        if len(self._mmap) < _HEADER.size:
+            self.close()
+            raise ae.InvalidSnapshotFile(self._file_path, "file is truncated")
+        (
+            magic,
+            version,
+            _,
+            self._record_count,
+            self._acl_count,
+            self._string_count,
+            self._records_offset,
+            self._acl_index_offset,
+            self._acl_pool_offset,
+            self._string_index_offset,
+            self._string_data_offset,
+        ) = _HEADER.unpack_from(self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC:
+            self.close()
+            raise ae.InvalidSnapshotFile(self._file_path, "bad magic number")
+        if version != SNAPSHOT_VERSION:
+            self.close()
+            raise ae.InvalidSnapshotFile(
+                self._file_path, f"unsupported version {version}"
+            )
+        string_index_end = self._string_index_offset + (
+            (self._string_count + 1) * _OFFSET.size
+        )
+        if string_index_end > len(self._mmap) or (
+            self._string_data_offset
+            + _OFFSET.unpack_from(
+                self._mmap, string_index_end - _OFFSET.size
+            )[0]
+            > len(self._mmap)
+        ):
+            self.close()
+            raise ae.InvalidSnapshotFile(self._file_path, "file is truncated")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    def __len__(self):
+        return self._record_count
+
+    @property
+    def acl_count(self) -> int:
+        """
+        Number of distinct ACLs in the snapshot
+        """
+        return self._acl_count
+
+    def _string_bytes(self, string_id: int) -> bytes:
+        start, end = struct.unpack_from(
+            "<QQ", self._mmap, self._string_index_offset + string_id * 8
+        )
+        return self._mmap[
+            self._string_data_offset + start: self._string_data_offset + end
+        ]
+
+    def _name(self, string_id: int) -> str:
+        name = self._names.get(string_id)
+        if name is None:
+            name = self._names[string_id] = sys.intern(
+                os.fsdecode(self._string_bytes(string_id))
+            )
+        return name
+
+    def _raw_record(self, idx: int) -> tuple[int, int, int, int, int]:
+        return _RECORD.unpack_from(
+            self._mmap, self._records_offset + idx * _RECORD.size
+        )
+
+    def _record_path_bytes(self, idx: int) -> bytes:
+        return self._string_bytes(self._raw_record(idx)[0])
+
+    def _find(self, path: str | Path) -> int | None:
+        key = os.fsencode(path)
+        low, high = 0, self._record_count
+        while low < high:
+            mid = (low + high) // 2
+            if self._record_path_bytes(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self._record_count and self._record_path_bytes(low) == key:
+            return low
+        return None
+
+    def _make_record(self, idx: int) -> SnapshotRecord:
+        path_id, acl_id, st_dev, st_ino, st_ctime_ns = self._raw_record(idx)
+        return SnapshotRecord(
+            path=Path(os.fsdecode(self._string_bytes(path_id))),
+            acl_id=acl_id,
+            st_dev=st_dev,
+            st_ino=st_ino,
+            st_ctime_ns=st_ctime_ns,
+        )
+
+    def record(self, path: str | Path) -> SnapshotRecord | None:
+        """
+        :return: the :class: `SnapshotRecord` for path, or None if path
+        isn't in the snapshot
+        """
+        idx = self._find(path)
+        return None if idx is None else self._make_record(idx)
+
+    def records(self) -> Iterator[SnapshotRecord]:
+        """
+        All records, in path (byte) order
+        """
+        for idx in range(self._record_count):
+            yield self._make_record(idx)
+
+    def acl(self, acl_id: int) -> dc.ACLData:
+        """
+        Decodes one ACL from the pool
+        :return: a new :class: `ACLData` object (raw_system_output is empty)
+        """
+        if not 0 <= acl_id < self._acl_count:
+            raise IndexError(f"no ACL with id {acl_id}")
+        (start,) = _OFFSET.unpack_from(
+            self._mmap, self._acl_index_offset + acl_id * _OFFSET.size
+        )
+        offset = self._acl_pool_offset + start
+        owning_user, owning_group, flags, *fixed = _ACL_FIXED.unpack_from(
+            self._mmap, offset
+        )
+        offset += _ACL_FIXED.size
+        permissions, counts = fixed[:8], fixed[8:]
+        kwargs = {
+            "owning_user": self._name(owning_user),
+            "owning_group": self._name(owning_group),
+            "flags": (
+                None if flags == _NONE else fs.FlagSetting.from_bits(flags)
+            ),
+        }
+        for field_name, bits in zip(_PERMISSION_FIELDS, permissions):
+            kwargs[field_name] = (
+                None if bits == _NONE else fs.PermissionSetting.from_bits(bits)
+            )
+        for field_name, count in zip(_NAMED_ENTRY_FIELDS, counts):
+            entries = {}
+            for _ in range(count):
+                name_id, bits = _NAMED_ENTRY.unpack_from(self._mmap, offset)
+                offset += _NAMED_ENTRY.size
+                entries[self._name(name_id)] = fs.PermissionSetting.from_bits(
+                    bits
+                )
+            kwargs[field_name] = entries
+        return dc.ACLData(**kwargs)
+
+    def get(
+        self, path: str | Path, default: dc.ACLData | None = None
+    ) -> dc.ACLData | None:
+        idx = self._find(path)
+        if idx is None:
+            return default
+        return self.acl(self._raw_record(idx)[1])
+
+    def __getitem__(self, path: str | Path) -> dc.ACLData:
+        acl_data = self.get(path)
+        if acl_data is None:
+            raise KeyError(path)
+        return acl_data
+
+    def __contains__(self, path: str | Path) -> bool:
+        return self._find(path) is not None
+
+    def __iter__(self) -> Iterator[Path]:
+        for idx in range(self._record_count):
+            yield Path(os.fsdecode(self._record_path_bytes(idx)))
+
+    def items(self) -> Iterator[tuple[Path, dc.ACLData]]:
+        """
+        (path, :class: `ACLData`) pairs in path (byte) order. Each
+        distinct ACL is decoded once per call, and paths with identical ACLs
+        share one ACLData object.
+        """
+        decoded: dict[int, dc.ACLData] = {}
+        for record in self.records():
+            acl_data = decoded.get(record.acl_id)
+            if acl_data is None:
+                acl_data = decoded[record.acl_id] = self.acl(record.acl_id)
+            yield record.path, acl_data
@@ -1,6 +1,7 @@
 import subprocess
 # from .aclpath_exceptions import SubprocessException
 import pygetfacl.aclpath_exceptions as ae
+import pygetfacl.instrumentation as ins
 
 
 class SubProcessCaller:
@@ -26,10 +27,63 @@ class SubProcessCaller:
         Returns:
             string obtained from subprocess standard out
         """
+        stdout = self.call_with_stdout_capture_bytes()
+        started = ins.start()
+        decoded = stdout.decode("utf-8")
+        ins.stop("subprocess.decode", started, nbytes=len(stdout))
+        return decoded
+
+    def call_with_stdout_capture_bytes(self) -> bytes:
+        """
+        Same as call_with_stdout_capture(), but standard out is returned
+        without decoding it.
+        Returns:
+            bytes obtained from subprocess standard out
+        """
+        if ins.enabled:
+            return self._timed_call_with_stdout_capture_bytes()
         subprocess_result = subprocess.run(
             self._command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
         )
         if subprocess_result.returncode != 0:
             raise ae.SubprocessException(subprocess_result)
 
-        return subprocess_result.stdout.decode("utf-8")
+        return subprocess_result.stdout
+
+    def _timed_call_with_stdout_capture_bytes(self) -> bytes:
+        """
+        call_with_stdout_capture_bytes() with spawn and wait timed separately
+        """
+        started = ins.start()
+        with subprocess.Popen(
+            self._command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        ) as process:
+            ins.stop("subprocess.spawn", started)
+            started = ins.start()
+            try:
+                stdout, stderr = process.communicate()
+            except BaseException:
+                process.kill()
+                raise
+            ins.stop("subprocess.wait", started, nbytes=len(stdout))
+        if process.returncode != 0:
+            raise ae.SubprocessException(
+                subprocess.CompletedProcess(
+                    process.args, process.returncode, stdout, stderr
+                )
+            )
+        return stdout
+
+    def start_with_pipes(self) -> subprocess.Popen:
+        """
+        Starts subprocess without waiting for it, with binary pipes connected
+        to its standard in, standard out and standard error.
+        Returns:
+            the running subprocess.Popen object
+        """
+        return subprocess.Popen(
+            self._command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
@@ -0,0 +1,203 @@
+import os
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pygetfacl.acl_info_retriever as air
+import pygetfacl.data_containers as dc
+import pygetfacl.parse_cache as pc
+
+# "skip": ignore symlinks entirely
+# "yield": report the ACL of the link target, but don't descend into it
+# "follow": report and descend into symlinked directories
+SYMLINK_POLICIES = ("skip", "yield", "follow")
+
+
+def _validate_symlink_policy(symlinks: str):
+    if symlinks not in SYMLINK_POLICIES:
+        raise ValueError(
+            f"Unknown symlink policy {symlinks!r}. Must be one of"
+            f" {SYMLINK_POLICIES}"
+        )
+
+
+def _ignore_error(err: OSError):
+    pass
+
+
+def _scan_directory(
+    dir_path: Path,
+    depth: int,
+    root_dev: int,
+    visited: set[tuple[int, int]],
+    symlinks: str = "skip",
+    one_filesystem: bool = False,
+    max_depth: int | None = None,
+    include: Callable[[Path], bool] | None = None,
+    exclude: Callable[[Path], bool] | None = None,
+    onerror: Callable[[OSError], None] | None = None,
+) -> tuple[list[Path], list[tuple[Path, int]], int]:
+    """
+    Lists one directory of a walk
+    :param dir_path: directory to list
+    :param depth: depth of dir_path (root has depth 0)
+    :param root_dev: st_dev of the walk's root, for one_filesystem
+    :param visited: (st_dev, st_ino) of directories entered via symlinks.
+    Updated in place.
+    :return: (paths to report, (subdirectory, depth) pairs to descend into,
+    number of entries listed)
+    """
+    if max_depth is not None and depth >= max_depth:
+        return [], [], 0
+    try:
+        with os.scandir(dir_path) as entries:
+            entries = list(entries)
+    except OSError as err:
+        if onerror is not None:
+            onerror(err)
+        return [], [], 0
+
+    reported = []
+    subdirs = []
+    for entry in entries:
+        path = Path(entry.path)
+        if exclude is not None and exclude(path):
+            continue
+        try:
+            is_symlink = entry.is_symlink()
+            if is_symlink:
+                if symlinks == "skip":
+                    continue
+                # dangling links have no ACL to report
+                entry_stat = entry.stat(follow_symlinks=True)
+            is_dir = entry.is_dir(follow_symlinks=True)
+        except OSError as err:
+            if onerror is not None:
+                onerror(err)
+            continue
+
+        if include is None or include(path):
+            reported.append(path)
+
+        if not is_dir or (is_symlink and symlinks != "follow"):
+            continue
+        if one_filesystem and (
+            entry.stat(follow_symlinks=True).st_dev != root_dev
+        ):
+            continue
+        if is_symlink:
+            dir_id = (entry_stat.st_dev, entry_stat.st_ino)
+            if dir_id in visited:
+                continue
+            visited.add(dir_id)
+        subdirs.append((path, depth + 1))
+    return reported, subdirs, len(entries)
+
+
+def _walk(
+    root: Path,
+    symlinks: str = "skip",
+    one_filesystem: bool = False,
+    max_depth: int | None = None,
+    include: Callable[[Path], bool] | None = None,
+    exclude: Callable[[Path], bool] | None = None,
+    onerror: Callable[[OSError], None] | None = None,
+) -> Iterator[Path]:
+    """
+    Depth-first walk of root that yields paths as they are found. Only the
+    stack of not-yet-visited directories is held in memory.
+    """
+    _validate_symlink_policy(symlinks)
+    if exclude is not None and exclude(root):
+        return
+    root_stat = os.stat(root)
+    visited = {(root_stat.st_dev, root_stat.st_ino)}
+
+    if include is None or include(root):
+        yield root
+    if not os.path.isdir(root):
+        return
+
+    stack = [(root, 0)]
+    while stack:
+        dir_path, depth = stack.pop()
+        reported, subdirs, _ = _scan_directory(
+            dir_path,
+            depth,
+            root_dev=root_stat.st_dev,
+            visited=visited,
+            symlinks=symlinks,
+            one_filesystem=one_filesystem,
+            max_depth=max_depth,
+            include=include,
+            exclude=exclude,
+            onerror=onerror,
+        )
+        yield from reported
+        # reversed so directories are entered in scandir order
+        stack.extend(reversed(subdirs))
+
+
+def getfacl_tree(
+    root: str | Path,
+    symlinks: str = "skip",
+    one_filesystem: bool = False,
+    max_depth: int | None = None,
+    include: Callable[[Path], bool] | None = None,
+    exclude: Callable[[Path], bool] | None = None,
+    onerror: Callable[[OSError], None] | None = None,
+    batch_size: int = air.DEFAULT_BATCH_SIZE,
+    backend: str | None = None,
+    parse_cache: pc.ParseCache | None = None,
+    numeric_ids: bool = False,
+    strict: bool = True,
+    lazy: bool = False,
+) -> Iterator[tuple[Path, dc.ACLData | dc.CompactACLData]]:
+    """
+    Walks the directory tree under root and yields ACL info for root and
+    every path below it. Results are produced one batch at a time, so memory
+    use does not grow with the size of the tree.
+    :param root: top of the tree
+    :param symlinks: one of SYMLINK_POLICIES
+    :param one_filesystem: if True, don't descend into directories on a
+    different device than root (mount points themselves are still reported)
+    :param max_depth: max depth of reported paths (root has depth 0).
+    None --> unlimited
+    :param include: if given, only paths for which include(path) is True are
+    reported. Directories are still descended into regardless.
+    :param exclude: paths for which exclude(path) is True are neither
+    reported nor descended into
+    :param onerror: called with the OSError when a directory can't be
+    listed, an entry can't be stat'ed, or getfacl fails on a path (e.g. one
+    removed since it was listed). Default is to skip silently.
+    :param batch_size: max number of paths passed to each getfacl call
+    :param backend: one of acl_info_retriever.BACKENDS. None --> module
+    default
+    :param parse_cache: if given, getfacl output is parsed through this
+    cache, and shared :class: `CompactACLData` objects are yielded
+    :param numeric_ids: if True, users and groups are reported as numeric
+    ids (getfacl -n) and no names are looked up
+    :param strict: if False, getfacl output is trusted and parsed without
+    per-entry validation (see :meth: `ACLData.from_getfacl_cmd_output`)
+    :param lazy: if True, yield :class: `LazyACLData` objects, which only
+    parse the fields that are read (e.g. for filters on one or two fields)
+    :return: iterator of (path, :class: `ACLData`) pairs, in walk order
+    """
+    paths = _walk(
+        root=air._to_path(root),
+        symlinks=symlinks,
+        one_filesystem=one_filesystem,
+        max_depth=max_depth,
+        include=include,
+        exclude=exclude,
+        onerror=onerror,
+    )
+    return air._MultiPathACLInfoRetriever(
+        paths,
+        batch_size=batch_size,
+        backend=backend,
+        parse_cache=parse_cache,
+        numeric_ids=numeric_ids,
+        strict=strict,
+        lazy=lazy,
+        onerror=onerror if onerror is not None else _ignore_error,
+    ).iter_getfacl()
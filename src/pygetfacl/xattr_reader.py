@@ -0,0 +1,208 @@
+import errno
+import os
+import stat
+import struct
+from pathlib import Path
+
+import pygetfacl.aclpath_exceptions as ae
+import pygetfacl.data_containers as dc
+import pygetfacl.file_setting as fs
+import pygetfacl.name_resolver as nr
+
+ACCESS_ACL_XATTR = "system.posix_acl_access"
+DEFAULT_ACL_XATTR = "system.posix_acl_default"
+
+# Binary layout used by the Linux kernel for the POSIX ACL xattrs
+# (see linux/posix_acl_xattr.h): a little-endian u32 version header
+# followed by (u16 tag, u16 perm, u32 id) entries.
+POSIX_ACL_XATTR_VERSION = 0x0002
+ACL_UNDEFINED_ID = 0xFFFFFFFF
+
+ACL_USER_OBJ = 0x01
+ACL_USER = 0x02
+ACL_GROUP_OBJ = 0x04
+ACL_GROUP = 0x08
+ACL_MASK = 0x10
+ACL_OTHER = 0x20
+
+_HEADER = struct.Struct("<I")
+_ENTRY = struct.Struct("<HHI")
+
+# errnos meaning "no ACL here" rather than "couldn't look"
+_NO_ACL_ERRNOS = {errno.ENODATA, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+
+def decode_posix_acl_xattr(
+    blob: bytes, attribute_name: str = ACCESS_ACL_XATTR
+) -> list[tuple[int, int, int]]:
+    """
+    Decodes the value of a system.posix_acl_* extended attribute
+    :param blob: raw attribute value returned by os.getxattr
+    :param attribute_name: attribute name (only used in error messages)
+    :return: list of (tag, perm, id) tuples in stored order
+    """
+    if len(blob) < _HEADER.size or (
+        (len(blob) - _HEADER.size) % _ENTRY.size != 0
+    ):
+        raise ae.InvalidPosixACLXattr(
+            attribute_name, len(blob), "unexpected length"
+        )
+    (version,) = _HEADER.unpack_from(blob, 0)
+    if version != POSIX_ACL_XATTR_VERSION:
+        raise ae.InvalidPosixACLXattr(
+            attribute_name, len(blob), f"unsupported version {version}"
+        )
+    return list(_ENTRY.iter_unpack(memoryview(blob)[_HEADER.size:]))
+
+
+def encode_posix_acl_xattr(entries: list[tuple[int, int, int]]) -> bytes:
+    """
+    Inverse of :func: `decode_posix_acl_xattr`
+    :param entries: (tag, perm, id) tuples
+    :return: bytes suitable for os.setxattr
+    """
+    return _HEADER.pack(POSIX_ACL_XATTR_VERSION) + b"".join(
+        _ENTRY.pack(*entry) for entry in entries
+    )
+
+
+def read_acl_xattr(path: str | Path, attribute_name: str) -> bytes | None:
+    """
+    Reads a POSIX ACL xattr
+    :return: attribute value, or None if path has no such attribute or its
+    filesystem doesn't support ACLs
+    """
+    try:
+        return os.getxattr(path, attribute_name)
+    except OSError as err:
+        if err.errno in _NO_ACL_ERRNOS:
+            return None
+        raise
+
+
+def _flags_from_mode(mode: int) -> fs.FlagSetting | None:
+    # getfacl only prints a "# flags:" line when at least one bit is set
+    # S_ISUID, S_ISGID, S_ISVTX line up with FlagSetting's uid, gid, sticky
+    flag_bits = mode >> 9 & 7
+    if not flag_bits:
+        return None
+    return fs.FlagSetting.from_bits(flag_bits)
+
+
+def _apply_entries(
+    kwargs: dict,
+    entries: list[tuple[int, int, int]],
+    prefix: str,
+    numeric_ids: bool = False,
+):
+    user_name = str if numeric_ids else nr.user_name
+    group_name = str if numeric_ids else nr.group_name
+    special_users = kwargs[f"{prefix}special_users"]
+    special_groups = kwargs[f"{prefix}special_groups"]
+    for tag, perm, qualifier in entries:
+        permission = fs.PermissionSetting.from_bits(perm & 7)
+        if tag == ACL_USER_OBJ:
+            kwargs[f"{prefix}user"] = permission
+        elif tag == ACL_USER:
+            special_users[user_name(qualifier)] = permission
+        elif tag == ACL_GROUP_OBJ:
+            kwargs[f"{prefix}group"] = permission
+        elif tag == ACL_GROUP:
+            special_groups[group_name(qualifier)] = permission
+        elif tag == ACL_MASK:
+            kwargs[f"{prefix}mask"] = permission
+        elif tag == ACL_OTHER:
+            kwargs[f"{prefix}other"] = permission
+
+
+def has_acl_xattrs(path: str | Path, is_dir: bool) -> bool:
+    """
+    Checks with a single listxattr call (following symlinks) whether path
+    carries an access ACL, or for a directory a default ACL. The kernel
+    doesn't store ACLs that only mirror the mode bits, so for most files
+    this is False.
+    :param is_dir: whether path is a directory
+    """
+    try:
+        names = os.listxattr(path)
+    except OSError as err:
+        if err.errno in _NO_ACL_ERRNOS:
+            return False
+        raise
+    return ACCESS_ACL_XATTR in names or (
+        is_dir and DEFAULT_ACL_XATTR in names
+    )
+
+
+def _stat_kwargs(st: os.stat_result, numeric_ids: bool) -> dict:
+    return {
+        "owning_user": (
+            str(st.st_uid) if numeric_ids else nr.user_name(st.st_uid)
+        ),
+        "owning_group": (
+            str(st.st_gid) if numeric_ids else nr.group_name(st.st_gid)
+        ),
+        "flags": _flags_from_mode(st.st_mode),
+        "user": fs.PermissionSetting.from_bits(st.st_mode >> 6 & 7),
+        "group": fs.PermissionSetting.from_bits(st.st_mode >> 3 & 7),
+        "mask": None,
+        "other": fs.PermissionSetting.from_bits(st.st_mode & 7),
+        "default_user": None,
+        "default_group": None,
+        "default_mask": None,
+        "default_other": None,
+        "special_users": {},
+        "special_groups": {},
+        "default_special_users": {},
+        "default_special_groups": {},
+    }
+
+
+def acl_data_from_stat(
+    st: os.stat_result, numeric_ids: bool = False
+) -> dc.ACLData:
+    """
+    Builds the :class: `ACLData` of a path without extended ACL entries,
+    which is fully determined by its mode and ownership: user, group and
+    other entries from the permission bits, flags from the setuid, setgid
+    and sticky bits, and owner names from the shared name cache.
+    :param st: os.stat result for the path
+    :param numeric_ids: if True, report uid / gid as numbers
+    :return: a :class: `ACLData` object (raw_system_output is empty)
+    """
+    return dc.ACLData(**_stat_kwargs(st, numeric_ids))
+
+
+def getfacl(path: str | Path, numeric_ids: bool = False) -> dc.ACLData:
+    """
+    Builds an :class: `ACLData` for path from os.stat and the POSIX ACL
+    xattrs, without running the getfacl executable. Like getfacl, follows
+    symlinks, and falls back to the mode bits when path has no access ACL.
+    :param path: filepath that ACL info is retrieved for
+    :param numeric_ids: if True, report uids / gids as numbers (like
+    getfacl -n) instead of looking up names
+    :return: a :class: `ACLData` object (raw_system_output is empty)
+    """
+    st = os.stat(path)
+    kwargs = _stat_kwargs(st, numeric_ids)
+
+    access_blob = read_acl_xattr(path, ACCESS_ACL_XATTR)
+    if access_blob is not None:
+        _apply_entries(
+            kwargs,
+            decode_posix_acl_xattr(access_blob, ACCESS_ACL_XATTR),
+            prefix="",
+            numeric_ids=numeric_ids,
+        )
+
+    if stat.S_ISDIR(st.st_mode):
+        default_blob = read_acl_xattr(path, DEFAULT_ACL_XATTR)
+        if default_blob is not None:
+            _apply_entries(
+                kwargs,
+                decode_posix_acl_xattr(default_blob, DEFAULT_ACL_XATTR),
+                prefix="default_",
+                numeric_ids=numeric_ids,
+            )
+
+    return dc.ACLData(**kwargs)
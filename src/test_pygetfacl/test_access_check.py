@@ -0,0 +1,221 @@
+import os
+import pwd
+import shutil
+import tempfile
+from pathlib import Path
+import pytest
+import pygetfacl.acl_info_retriever as air
+import pygetfacl.file_setting as fs
+import pygetfacl.xattr_reader as xr
+from pygetfacl.access_check import (
+    AccessChecker,
+    acl_grants,
+    can_access,
+    check_access,
+    clear_shared_cache,
+    resolve_principal,
+)
+from pygetfacl.data_containers import ACLData
+
+
+def perm(permission_string):
+    return fs.PermissionSetting.from_string(permission_string)
+
+
+@pytest.fixture
+def nobody():
+    try:
+        return resolve_principal(pwd.getpwnam("nobody").pw_uid)
+    except KeyError:
+        pytest.skip("no 'nobody' user")
+
+
+@pytest.fixture
+def acl_data():
+    return ACLData(
+        owning_user="owner_a",
+        owning_group="group_a",
+        flags=None,
+        user=perm("rw-"),
+        group=perm("r--"),
+        mask=perm("r-x"),
+        other=perm("---"),
+        default_user=None,
+        default_group=None,
+        default_mask=None,
+        default_other=None,
+        special_users={"nobody": perm("rwx")},
+        special_groups={"group_b": perm("rw-")},
+    )
+
+
+class TestAclGrants:
+    def test_named_user_limited_by_mask(self, acl_data, nobody):
+        assert acl_grants(acl_data, nobody, "rx")
+        assert not acl_grants(acl_data, nobody, "w")
+
+    def test_owner(self, acl_data, nobody):
+        owner = resolve_principal(nobody.uid)
+        acl_data.owning_user = "nobody"
+        assert acl_grants(acl_data, owner, os.R_OK | os.W_OK)
+        assert not acl_grants(acl_data, owner, "x")
+
+    def test_group_class(self, acl_data, nobody):
+        acl_data.special_users = {}
+        acl_data.special_groups = {
+            name: perm("r-x") for name in nobody.group_names
+        }
+        assert acl_grants(acl_data, nobody, "x")
+        assert not acl_grants(acl_data, nobody, "w")
+
+    def test_other(self, acl_data, nobody):
+        acl_data.special_users = {}
+        assert not acl_grants(acl_data, nobody, "r")
+        acl_data.other = perm("r--")
+        assert acl_grants(acl_data, nobody, "r")
+
+    def test_root(self, acl_data):
+        root = resolve_principal(0)
+        assert acl_grants(acl_data, root, "rw")
+        assert acl_grants(acl_data, root, "x")
+        acl_data.mask = perm("r--")
+        assert not acl_grants(acl_data, root, "x")
+        assert acl_grants(acl_data, root, "x", is_dir=True)
+
+    def test_invalid_mode(self, acl_data, nobody):
+        with pytest.raises(ValueError):
+            acl_grants(acl_data, nobody, "q")
+
+
+@pytest.fixture
+def world_searchable_dir():
+    # pytest's tmp_path lives under a 0700 directory, which would hide
+    # everything from other users
+    top = tempfile.mkdtemp()
+    os.chmod(top, 0o755)
+    parent = os.path.dirname(top)
+    while parent != os.path.dirname(parent):
+        if not os.stat(parent).st_mode & 0o001:
+            shutil.rmtree(top)
+            pytest.skip(f"{parent} isn't searchable by others")
+        parent = os.path.dirname(parent)
+    yield top
+    shutil.rmtree(top)
+
+
+@pytest.fixture
+def tree(world_searchable_dir):
+    open_dir = os.path.join(world_searchable_dir, "open")
+    closed_dir = os.path.join(world_searchable_dir, "closed")
+    for directory in (open_dir, closed_dir):
+        os.mkdir(directory)
+    os.chmod(open_dir, 0o755)
+    os.chmod(closed_dir, 0o700)
+    files = []
+    for directory in (open_dir, closed_dir):
+        for idx in range(3):
+            file_path = os.path.join(directory, f"file_{idx}")
+            open(file_path, "w").close()
+            os.chmod(file_path, 0o644)
+            files.append(file_path)
+    return open_dir, closed_dir, files
+
+
+class TestAccessChecker:
+    def test_ancestor_search_permission(self, tree, nobody):
+        open_dir, closed_dir, _ = tree
+        checker = AccessChecker(backend="xattr")
+        assert checker.can_access(os.path.join(open_dir, "file_0"), "nobody")
+        assert not checker.can_access(
+            os.path.join(closed_dir, "file_0"), "nobody"
+        )
+        assert not can_access(
+            os.path.join(open_dir, "file_0"), "nobody", "w", backend="xattr"
+        )
+
+    def test_named_user_on_directory(self, tree, nobody):
+        _, closed_dir, _ = tree
+        xr_entries = [
+            (xr.ACL_USER_OBJ, 7, xr.ACL_UNDEFINED_ID),
+            (xr.ACL_USER, 1, nobody.uid),
+            (xr.ACL_GROUP_OBJ, 0, xr.ACL_UNDEFINED_ID),
+            (xr.ACL_MASK, 1, xr.ACL_UNDEFINED_ID),
+            (xr.ACL_OTHER, 0, xr.ACL_UNDEFINED_ID),
+        ]
+        try:
+            os.setxattr(
+                closed_dir,
+                xr.ACCESS_ACL_XATTR,
+                xr.encode_posix_acl_xattr(xr_entries),
+            )
+        except OSError as err:
+            pytest.skip(f"can't set ACL: {err}")
+        assert can_access(
+            os.path.join(closed_dir, "file_1"), nobody.uid, backend="xattr"
+        )
+
+    def test_check_access_memoizes_ancestors(
+        self, tree, nobody, monkeypatch
+    ):
+        open_dir, closed_dir, files = tree
+        directory_reads = []
+        real_getfacl = air.getfacl
+
+        def counting_getfacl(path, backend=None):
+            directory_reads.append(path)
+            return real_getfacl(path, backend=backend)
+
+        monkeypatch.setattr(air, "getfacl", counting_getfacl)
+        checker = AccessChecker(backend="xattr")
+        results = checker.check_access(files, ["nobody", 0])
+        assert [result["nobody"] for result in results.values()] == [
+            True, True, True, False, False, False
+        ]
+        assert all(result[0] for result in results.values())
+        # every directory from / down to open_dir / closed_dir, read once
+        assert len(directory_reads) == len(set(directory_reads))
+        assert len(directory_reads) == len(
+            {*map(os.path.dirname, files), *_ancestors(open_dir)}
+        )
+
+    def test_matches_can_access(self, tree):
+        _, _, files = tree
+        results = check_access(files, ["nobody"], "r", backend="xattr")
+        assert results == {
+            Path(path): {
+                "nobody": can_access(path, "nobody", backend="xattr")
+            }
+            for path in files
+        }
+
+    def test_module_level_calls_share_ancestors(
+        self, tree, nobody, monkeypatch
+    ):
+        open_dir, _, files = tree
+        clear_shared_cache()
+        reads = []
+        real_getfacl = air.getfacl
+
+        def counting_getfacl(path, backend=None):
+            reads.append(path)
+            return real_getfacl(path, backend=backend)
+
+        monkeypatch.setattr(air, "getfacl", counting_getfacl)
+        assert can_access(files[0], "nobody", backend="xattr")
+        assert len(reads) == 1 + len(_ancestors(files[0]))
+        reads.clear()
+        assert can_access(files[1], "nobody", backend="xattr")
+        # only the file itself; its ancestors were kept from the first call
+        assert reads == [Path(files[1])]
+        clear_shared_cache()
+        reads.clear()
+        assert can_access(files[1], "nobody", backend="xattr")
+        assert len(reads) == 1 + len(_ancestors(files[1]))
+
+
+def _ancestors(path):
+    found = []
+    while path != os.path.dirname(path):
+        path = os.path.dirname(path)
+        found.append(path)
+    return found
@@ -1,6 +1,21 @@
+import copy
+import dataclasses
+import pickle
 import pytest
-from pygetfacl.data_containers import ACLData, EffectivePermissions
+from pygetfacl.aclpath_exceptions import (
+    ExcessRegexMatches,
+    InsufficientRegexMatches,
+    InvalidFileSettingString,
+)
+from pygetfacl.data_containers import (
+    ACLData,
+    CompactACLData,
+    EffectivePermissions,
+    LazyACLData,
+    effective_permissions_many,
+)
 import pygetfacl.file_setting as fs
+import pygetfacl.output_spec as osp
 
 
 @pytest.fixture
@@ -55,6 +70,272 @@ class TestACLData:
         assert str(my_acl_data.default_group) == "rwx"
         assert str(my_acl_data.default_other) == "r-x"
 
+    def test_duplicate_single_entry(self, example_system_getfacl_result):
+        with pytest.raises(ExcessRegexMatches):
+            ACLData.from_getfacl_cmd_output(
+                example_system_getfacl_result + "other::rwx\n"
+            )
+
+    def test_missing_required_entry(self, example_system_getfacl_result):
+        with pytest.raises(InsufficientRegexMatches):
+            ACLData.from_getfacl_cmd_output(
+                example_system_getfacl_result.replace("# owner: user_a\n", "")
+            )
+
+
+class TestTrustedParse:
+    def test_matches_strict_parse(self, example_system_getfacl_result):
+        text = example_system_getfacl_result.replace(
+            "# group: user_a\n", "# group: user_a\n# flags: s-t\n"
+        )
+        expected = ACLData.from_getfacl_cmd_output(text)
+        assert ACLData.from_getfacl_cmd_output(text, strict=False) == expected
+        assert CompactACLData.from_getfacl_cmd_output(
+            text, strict=False
+        ) == CompactACLData.from_getfacl_cmd_output(text)
+
+    def test_skips_duplicate_check(self, example_system_getfacl_result):
+        acl_data = ACLData.from_getfacl_cmd_output(
+            example_system_getfacl_result + "other::rwx\n", strict=False
+        )
+        assert str(acl_data.other) == "rwx"
+
+    def test_missing_required_entry_still_raises(
+        self, example_system_getfacl_result
+    ):
+        with pytest.raises(InsufficientRegexMatches):
+            ACLData.from_getfacl_cmd_output(
+                example_system_getfacl_result.replace("other::r-x\n", ""),
+                strict=False,
+            )
+
+    def test_bad_permission_still_raises(
+        self, example_system_getfacl_result
+    ):
+        with pytest.raises(InvalidFileSettingString):
+            ACLData.from_getfacl_cmd_output(
+                example_system_getfacl_result.replace(
+                    "other::r-x", "other::r-q"
+                ),
+                strict=False,
+            )
+
+
+class TestBytesParse:
+    def test_matches_str_parse(self, example_system_getfacl_result):
+        text = example_system_getfacl_result.replace(
+            "# group: user_a\n", "# group: user_a\n# flags: s-t\n"
+        )
+        acl_data = ACLData.from_getfacl_bytes(text.encode())
+        assert acl_data == ACLData.from_getfacl_cmd_output(text)
+        assert acl_data.raw_system_output == text
+
+    def test_block_of_memoryview(self, example_system_getfacl_result):
+        encoded = example_system_getfacl_result.encode()
+        buffer = memoryview(b"\n" + encoded + encoded)
+        acl_data = ACLData.from_getfacl_bytes(buffer, 1, 1 + len(encoded))
+        assert acl_data == ACLData.from_getfacl_cmd_output(
+            example_system_getfacl_result
+        )
+        assert acl_data.raw_system_output == example_system_getfacl_result
+
+    def test_escaped_names(self, example_system_getfacl_result):
+        text = example_system_getfacl_result.replace(
+            "pygetfacl_test_user", "user\\040b"
+        ).replace("# owner: user_a", "# owner: caf\\303\\251")
+        for acl_data in (
+            ACLData.from_getfacl_bytes(text.encode()),
+            ACLData.from_getfacl_cmd_output(text),
+            ACLData.from_getfacl_cmd_output(text, strict=False),
+        ):
+            assert acl_data.owning_user == "caf\u00e9"
+            assert list(acl_data.special_users) == ["user b"]
+
+    def test_raw_output_decoded_on_read(
+        self, example_system_getfacl_result
+    ):
+        encoded = example_system_getfacl_result.encode()
+        acl_data = ACLData.from_getfacl_bytes(b"\n" + encoded, 1)
+        expected = ACLData.from_getfacl_cmd_output(
+            example_system_getfacl_result
+        )
+        assert "_raw_block" in vars(acl_data)
+        assert repr(acl_data) == repr(expected)
+        assert "_raw_block" not in vars(acl_data)
+        assert acl_data.raw_system_output == example_system_getfacl_result
+        for copied in (
+            copy.copy(acl_data),
+            pickle.loads(pickle.dumps(acl_data)),
+        ):
+            assert type(copied) is ACLData
+            assert copied == expected
+        replaced = dataclasses.replace(acl_data, owning_user="user_b")
+        assert replaced.raw_system_output == example_system_getfacl_result
+        assert replaced.owning_user == "user_b"
+        acl_data.raw_system_output = ""
+        assert acl_data.raw_system_output == ""
+
+    def test_name_not_utf8(self, example_system_getfacl_result):
+        text = example_system_getfacl_result.replace(
+            "pygetfacl_test_user", "user_\\377"
+        )
+        acl_data = ACLData.from_getfacl_bytes(text.encode())
+        assert list(acl_data.special_users) == ["user_\udcff"]
+        assert acl_data == ACLData.from_getfacl_cmd_output(text)
+
+    def test_strict_errors(self, example_system_getfacl_result):
+        text = example_system_getfacl_result + "other::rwx\n"
+        with pytest.raises(ExcessRegexMatches):
+            ACLData.from_getfacl_bytes(text.encode())
+        acl_data = ACLData.from_getfacl_bytes(text.encode(), strict=False)
+        assert str(acl_data.other) == "rwx"
+        with pytest.raises(InsufficientRegexMatches):
+            ACLData.from_getfacl_bytes(
+                example_system_getfacl_result.replace(
+                    "other::r-x\n", ""
+                ).encode(),
+                strict=False,
+            )
+        with pytest.raises(InvalidFileSettingString):
+            ACLData.from_getfacl_bytes(
+                example_system_getfacl_result.replace(
+                    "other::r-x", "other::r-q"
+                ).encode()
+            )
+
+
+MALFORMED_LINES = [
+    "user:bob\n",
+    "user:bob:rwx:extra\n",
+    "default:group:staff\n",
+    "user:bob:rwq\n",
+    "user:bob:rwx \n",
+    "user:bob:rwx\t#effective:r-x\n",
+    "mask::\n",
+    "other::rwx\n",
+    "user::rwx \n",
+    "# flags: ssx\n",
+    "# owner\n",
+    "mask:bob:rwx\n",
+    "bogus:x:rwx\n",
+    "garbage\n",
+    " user::rwx\n",
+]
+
+
+def _parse_outcome(parse):
+    try:
+        return parse()
+    except Exception as err:
+        return type(err)
+
+
+@pytest.mark.parametrize("strict", [True, False])
+@pytest.mark.parametrize("extra_line", MALFORMED_LINES)
+def test_parsers_agree_on_malformed_input(
+    example_system_getfacl_result, extra_line, strict
+):
+    text = example_system_getfacl_result + extra_line
+    # validating parse only
+    expected = _parse_outcome(
+        lambda: ACLData(
+            raw_system_output=text,
+            **osp.decode_getfacl_output(text, strict=strict),
+        )
+    )
+    # (trusted parse first when not strict)
+    assert _parse_outcome(
+        lambda: ACLData.from_getfacl_cmd_output(text, strict=strict)
+    ) == expected
+    assert _parse_outcome(
+        lambda: ACLData.from_getfacl_bytes(text.encode(), strict=strict)
+    ) == expected
+    assert _parse_outcome(
+        lambda: LazyACLData(text, strict=strict).to_acl_data()
+    ) == expected
+    # without the extra line, every parser succeeds
+    assert isinstance(
+        ACLData.from_getfacl_bytes(
+            example_system_getfacl_result.encode(), strict=strict
+        ),
+        ACLData,
+    )
+
+
+class TestLazyACLData:
+    def test_matches_eager(self, example_system_getfacl_result):
+        lazy = LazyACLData(example_system_getfacl_result)
+        eager = ACLData.from_getfacl_cmd_output(example_system_getfacl_result)
+        assert lazy == eager
+        assert eager == lazy
+        assert repr(lazy) == repr(eager)
+        assert lazy.raw_system_output == example_system_getfacl_result
+        assert lazy.to_acl_data() == eager
+        assert type(lazy.to_acl_data()) is ACLData
+        assert lazy != dataclasses.replace(eager, owning_user="user_b")
+
+    def test_parses_only_fields_read(self, example_system_getfacl_result):
+        lazy = LazyACLData(example_system_getfacl_result)
+        assert lazy.owning_user == "user_a"
+        assert str(lazy.mask) == "rwx"
+        parsed = {name for name in vars(lazy) if not name.startswith("_")}
+        assert parsed == {"owning_user", "mask"}
+        assert lazy.owning_user is lazy.owning_user
+
+    def test_errors_raised_on_access(self, example_system_getfacl_result):
+        lazy = LazyACLData(example_system_getfacl_result + "other::rwx\n")
+        assert lazy.owning_user == "user_a"
+        with pytest.raises(ExcessRegexMatches):
+            lazy.other
+        trusted = LazyACLData(
+            example_system_getfacl_result + "other::rwx\n", strict=False
+        )
+        assert str(trusted.other) == "rwx"
+        with pytest.raises(AttributeError):
+            lazy.not_a_field
+
+    def test_missing_required_field_raises(
+        self, example_system_getfacl_result
+    ):
+        text = example_system_getfacl_result.replace("other::r-x\n", "")
+        for strict in (True, False):
+            with pytest.raises(InsufficientRegexMatches):
+                ACLData.from_getfacl_cmd_output(text, strict=strict)
+            with pytest.raises(InsufficientRegexMatches):
+                LazyACLData(text, strict=strict).other
+
+    def test_fields_can_be_set(self, example_system_getfacl_result):
+        lazy = LazyACLData(example_system_getfacl_result)
+        lazy.raw_system_output = ""
+        lazy.owning_user = "user_b"
+        assert lazy.raw_system_output == ""
+        assert lazy.owning_user == "user_b"
+
+    def test_shared_batch_buffer(self, example_system_getfacl_result):
+        other_result = example_system_getfacl_result.replace(
+            "pygetfacl_test_dir", "other_dir"
+        ).replace("other::r-x", "other::---")
+        batch_output = example_system_getfacl_result + other_result
+        first, second = LazyACLData.from_batch_output(batch_output)
+        assert first == ACLData.from_getfacl_cmd_output(
+            example_system_getfacl_result
+        )
+        assert second == ACLData.from_getfacl_cmd_output(other_result)
+        assert str(second.other) == "---"
+        assert first._buffer is second._buffer is batch_output
+
+    def test_pickle_and_copy_are_eager(self, example_acl_data):
+        lazy = LazyACLData(example_acl_data.raw_system_output)
+        for copied in (pickle.loads(pickle.dumps(lazy)), copy.copy(lazy)):
+            assert type(copied) is ACLData
+            assert copied == example_acl_data
+
+    def test_effective_permissions(self, example_acl_data):
+        lazy = LazyACLData(example_acl_data.raw_system_output)
+        assert repr(lazy.effective_permissions) == repr(
+            example_acl_data.effective_permissions
+        )
+
 
 class TestEffectivePermissions:
 
@@ -80,5 +361,138 @@ class TestEffectivePermissions:
 
         print("debugger break point")
 
+    def test_lazy_and_memoized(self, example_acl_data):
+        ep = EffectivePermissions(example_acl_data)
+        assert "group" not in vars(ep)
+        group = ep.group
+        assert vars(ep)["group"] is group
+        assert "special_users" not in vars(ep)
+        assert ep.group is group
+
+    @pytest.mark.parametrize(
+        "to_item",
+        [
+            copy.copy,
+            CompactACLData.from_acl_data,
+            lambda acl_data: LazyACLData(acl_data.raw_system_output),
+        ],
+    )
+    def test_memoized_per_acl_data(self, example_acl_data, to_item):
+        item = to_item(example_acl_data)
+        effective = item.effective_permissions
+        group = effective.group
+        assert item.effective_permissions is effective
+        assert item.effective_permissions.group is group
+        assert item == to_item(example_acl_data)
+
+    @pytest.mark.parametrize(
+        "to_item",
+        [
+            copy.copy,
+            lambda acl_data: LazyACLData(acl_data.raw_system_output),
+        ],
+    )
+    def test_field_change_clears_memo(self, example_acl_data, to_item):
+        item = to_item(example_acl_data)
+        assert str(item.effective_permissions.group) == "r-x"
+        item.mask = fs.PermissionSetting(r=False, w=False, x=True)
+        assert str(item.effective_permissions.group) == "--x"
+        # a copy doesn't share the original's memo
+        copied = copy.copy(item)
+        copied.group = fs.PermissionSetting(r=False, w=False, x=False)
+        assert str(copied.effective_permissions.group) == "---"
+        assert str(item.effective_permissions.group) == "--x"
+
+    def test_repr_lists_every_attribute(self, example_acl_data):
+        lines = repr(EffectivePermissions(example_acl_data)).split("\n")
+        assert [line.split(":")[0] for line in lines] == [
+            "user",
+            "special_users",
+            "group",
+            "special_groups",
+            "other",
+            "default_user",
+            "default_special_users",
+            "default_group",
+            "default_special_groups",
+            "default_other",
+        ]
+
+
+class TestEffectivePermissionsMany:
+
+    @pytest.mark.parametrize(
+        "attribute",
+        [
+            "user",
+            "special_users",
+            "group",
+            "special_groups",
+            "default_group",
+            "default_special_users",
+        ],
+    )
+    def test_matches_effective_permissions(self, example_acl_data, attribute):
+        masked = dataclasses.replace(
+            example_acl_data, mask=fs.PermissionSetting.from_string("r--")
+        )
+        items = [
+            example_acl_data, masked, CompactACLData.from_acl_data(masked)
+        ]
+        assert effective_permissions_many(items, attribute) == [
+            getattr(item.effective_permissions, attribute) for item in items
+        ]
+
+    def test_no_mask(self, example_acl_data):
+        unmasked = dataclasses.replace(example_acl_data, mask=None)
+        [special_users] = effective_permissions_many(
+            [unmasked], "special_users"
+        )
+        assert special_users == unmasked.special_users
+
+    def test_unknown_attribute(self, example_acl_data):
+        with pytest.raises(ValueError):
+            effective_permissions_many([example_acl_data], "mask")
+
+
+
+
+
+class TestCompactACLData:
+
+    def test_round_trip(self, example_acl_data):
+        compact = CompactACLData.from_acl_data(example_acl_data, keep_raw=True)
+        assert compact.to_acl_data() == example_acl_data
+
+    def test_same_attributes(self, example_acl_data):
+        compact = CompactACLData.from_acl_data(example_acl_data)
+        assert compact.owning_user == example_acl_data.owning_user
+        assert compact.mask is example_acl_data.mask
+        assert compact.special_users == example_acl_data.special_users
+        assert compact.default_special_users == {}
+        assert compact.raw_system_output == ""
+        assert str(compact.effective_permissions) == str(
+            example_acl_data.effective_permissions
+        )
+
+    def test_shares_empty_maps(self, example_acl_data):
+        compact_a = CompactACLData.from_acl_data(example_acl_data)
+        compact_b = CompactACLData.from_getfacl_cmd_output(
+            example_acl_data.raw_system_output
+        )
+        assert compact_a == compact_b
+        assert hash(compact_a) == hash(compact_b)
+        assert compact_a.default_special_users is (
+            compact_b.default_special_groups
+        )
 
+    def test_immutable(self, example_acl_data):
+        compact = CompactACLData.from_acl_data(example_acl_data)
+        with pytest.raises(AttributeError):
+            compact.owning_user = "user_b"
+        with pytest.raises(TypeError):
+            compact.special_users["user_b"] = compact.user
 
+    def test_pickle(self, example_acl_data):
+        compact = CompactACLData.from_acl_data(example_acl_data)
+        assert pickle.loads(pickle.dumps(compact)) == compact
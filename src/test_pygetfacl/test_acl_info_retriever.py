@@ -1,8 +1,11 @@
 from pathlib import Path
 import os
 import pygetfacl
+import pygetfacl.acl_info_retriever as air
 import pytest
+import shutil
 import subprocess
+from pygetfacl.aclpath_exceptions import GetFaclSubprocessException
 
 
 @pytest.fixture
@@ -25,3 +28,151 @@ def test_getfacl(temp_dir_with_some_facl_settings):
 
 def test_getfacl_raw(temp_dir_with_some_facl_settings):
     pygetfacl.getfacl_raw(temp_dir_with_some_facl_settings)
+
+
+@pytest.fixture
+def temp_files(tmp_path) -> list[Path]:
+    paths = [tmp_path / f"file_{idx}" for idx in range(5)]
+    for idx, path in enumerate(paths):
+        path.touch()
+        path.chmod(0o600 + idx)
+    return paths
+
+
+@pytest.mark.skipif(
+    shutil.which("getfacl") is None, reason="getfacl not installed"
+)
+@pytest.mark.parametrize("batch_size", [1, 2, 10])
+def test_getfacl_many(temp_files, batch_size):
+    result = pygetfacl.getfacl_many(temp_files, batch_size=batch_size)
+    assert list(result.keys()) == temp_files
+    for path, acl_data in result.items():
+        assert acl_data == pygetfacl.getfacl(path)
+
+
+@pytest.mark.skipif(
+    shutil.which("getfacl") is None, reason="getfacl not installed"
+)
+def test_getfacl_many_trusted_parse(temp_files):
+    result = pygetfacl.getfacl_many(temp_files, batch_size=2, strict=False)
+    assert result == pygetfacl.getfacl_many(temp_files, batch_size=2)
+    for path, acl_data in result.items():
+        assert acl_data == pygetfacl.getfacl(path, strict=False)
+
+
+@pytest.mark.skipif(
+    shutil.which("getfacl") is None, reason="getfacl not installed"
+)
+def test_getfacl_many_lazy(temp_files):
+    result = pygetfacl.getfacl_many(temp_files, batch_size=2, lazy=True)
+    assert all(
+        isinstance(acl_data, pygetfacl.LazyACLData)
+        for acl_data in result.values()
+    )
+    assert result == pygetfacl.getfacl_many(temp_files, batch_size=2)
+
+
+@pytest.mark.skipif(
+    shutil.which("getfacl") is None, reason="getfacl not installed"
+)
+def test_getfacl_many_escaped_file_names(tmp_path):
+    # getfacl escapes spaces and non-ASCII bytes in the "# file:" header
+    paths = [tmp_path / "a b", Path(os.fsdecode(bytes(tmp_path) + b"/c\xff"))]
+    for path in paths:
+        path.touch()
+    for lazy in (False, True):
+        result = pygetfacl.getfacl_many(paths, lazy=lazy)
+        assert list(result) == paths
+        for path, acl_data in result.items():
+            assert acl_data == pygetfacl.getfacl(path)
+    assert "c\\377" in pygetfacl.getfacl_raw(paths[1])
+
+
+def test_getfacl_many_lazy_with_parse_cache(temp_files):
+    with pytest.raises(ValueError):
+        pygetfacl.getfacl_many(
+            temp_files, lazy=True, parse_cache=pygetfacl.ParseCache()
+        )
+
+
+def test_getfacl_many_xattr_backend(temp_files):
+    result = pygetfacl.getfacl_many(temp_files, backend="xattr")
+    assert list(result.keys()) == temp_files
+    assert [str(acl_data.other) for acl_data in result.values()] == [
+        "---", "--x", "-w-", "-wx", "r--"
+    ]
+
+
+def test_getfacl_many_bad_batch_size(temp_files):
+    with pytest.raises(ValueError):
+        pygetfacl.getfacl_many(temp_files, batch_size=0)
+
+
+@pytest.mark.skipif(
+    shutil.which("getfacl") is None, reason="getfacl not installed"
+)
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"strict": False}, {"lazy": True}, {"parse_cache": None}],
+)
+def test_getfacl_many_missing_path(temp_files, options):
+    if "parse_cache" in options:
+        options = {"parse_cache": pygetfacl.ParseCache()}
+    missing = temp_files[0].parent / "missing"
+    paths = [*temp_files[:2], missing, *temp_files[2:]]
+    # getfacl exits 1, but the blocks it printed are still used
+    results = []
+    with pytest.raises(GetFaclSubprocessException) as err:
+        for path, acl_data in pygetfacl.iter_getfacl_many(
+            paths, batch_size=10, **options
+        ):
+            results.append((path, acl_data))
+    assert str(missing) in err.value.completed_process.args
+    assert results == list(
+        pygetfacl.getfacl_many(temp_files, batch_size=10, **options).items()
+    )
+
+    errors = []
+    result = pygetfacl.getfacl_many(
+        paths, batch_size=10, onerror=errors.append, **options
+    )
+    assert list(result) == temp_files
+    assert [type(error) for error in errors] == [FileNotFoundError]
+    assert errors[0].filename == str(missing)
+
+
+@pytest.mark.skipif(
+    shutil.which("getfacl") is None, reason="getfacl not installed"
+)
+def test_getfacl_many_missing_path_auto_backend(temp_files, monkeypatch):
+    # every path goes to getfacl, including one removed since it was stat'ed
+    missing = temp_files[0].parent / "missing"
+    monkeypatch.setattr(
+        air, "_acl_data_from_stat_if_no_acl", lambda path, numeric_ids: None
+    )
+    errors = []
+    result = pygetfacl.getfacl_many(
+        [missing, *temp_files], backend="auto", onerror=errors.append
+    )
+    assert list(result) == temp_files
+    assert [error.filename for error in errors] == [str(missing)]
+
+
+@pytest.mark.parametrize("backend", ["xattr", "auto"])
+def test_getfacl_many_missing_path_without_getfacl(temp_files, backend):
+    missing = temp_files[0].parent / "missing"
+    paths = [*temp_files[:2], missing, *temp_files[2:]]
+    results = []
+    with pytest.raises(FileNotFoundError):
+        for path, acl_data in pygetfacl.iter_getfacl_many(
+            paths, backend=backend
+        ):
+            results.append(path)
+    assert results == temp_files
+
+    errors = []
+    result = pygetfacl.getfacl_many(
+        paths, backend=backend, onerror=errors.append
+    )
+    assert list(result) == temp_files
+    assert [error.filename for error in errors] == [str(missing)]
@@ -0,0 +1,164 @@
+import os
+import shutil
+import subprocess
+import pytest
+import pygetfacl.acl_info_retriever as air
+import pygetfacl.aclpath_exceptions as ae
+import pygetfacl.xattr_reader as xr
+from pygetfacl.acl_watcher import ACLWatcher
+
+
+@pytest.fixture
+def temp_tree(tmp_path):
+    root = tmp_path / "root"
+    (root / "dir_a").mkdir(parents=True)
+    (root / "dir_a" / "file_a").touch()
+    os.chmod(root / "dir_a" / "file_a", 0o640)
+    return root
+
+
+@pytest.fixture
+def watcher(temp_tree):
+    with ACLWatcher(temp_tree, backend="xattr") as acl_watcher:
+        yield acl_watcher
+
+
+def test_initial_scan(watcher, temp_tree):
+    assert len(watcher) == 3
+    assert str(watcher.get(temp_tree / "dir_a" / "file_a").group) == "r--"
+    assert watcher.poll() == []
+
+
+def test_chmod(watcher, temp_tree):
+    file_a = temp_tree / "dir_a" / "file_a"
+    os.chmod(file_a, 0o600)
+    events = watcher.poll(timeout=1)
+    assert len(events) == 1
+    assert events[0].path == file_a
+    assert str(events[0].old.group) == "r--"
+    assert str(events[0].new.group) == "---"
+    assert watcher.get(file_a) is events[0].new
+
+
+def test_acl_change(watcher, temp_tree):
+    dir_a = temp_tree / "dir_a"
+    try:
+        os.setxattr(
+            dir_a,
+            xr.DEFAULT_ACL_XATTR,
+            xr.encode_posix_acl_xattr(
+                [
+                    (xr.ACL_USER_OBJ, 7, xr.ACL_UNDEFINED_ID),
+                    (xr.ACL_GROUP_OBJ, 0, xr.ACL_UNDEFINED_ID),
+                    (xr.ACL_OTHER, 0, xr.ACL_UNDEFINED_ID),
+                ]
+            ),
+        )
+    except OSError as err:
+        pytest.skip(f"can't set default ACL: {err}")
+    events = watcher.poll(timeout=1)
+    assert [event.path for event in events] == [dir_a]
+    assert events[0].old.default_user is None
+    assert str(watcher.get(dir_a).default_user) == "rwx"
+
+
+def test_create_and_delete(watcher, temp_tree):
+    received = []
+    watcher._callback = received.append
+    new_dir = temp_tree / "dir_a" / "new_dir"
+    new_dir.mkdir()
+    (new_dir / "new_file").touch()
+    events = watcher.poll(timeout=1)
+    assert {event.path for event in events} == {
+        new_dir,
+        new_dir / "new_file",
+    }
+    assert all(event.old is None for event in events)
+    assert received == events
+
+    (new_dir / "new_file").unlink()
+    new_dir.rmdir()
+    events = watcher.poll(timeout=1)
+    assert {event.path for event in events} == {
+        new_dir,
+        new_dir / "new_file",
+    }
+    assert all(event.new is None for event in events)
+    assert watcher.get(new_dir) is None
+
+
+def test_overflow_rescan(watcher, temp_tree):
+    file_a = temp_tree / "dir_a" / "file_a"
+    os.chmod(file_a, 0o600)
+    events = watcher._rescan()
+    assert [event.path for event in events] == [file_a]
+    assert str(watcher.get(file_a).group) == "---"
+
+
+def test_change_during_initial_read_is_reported(temp_tree, monkeypatch):
+    file_a = temp_tree / "dir_a" / "file_a"
+    iter_getfacl_many = air.iter_getfacl_many
+
+    def chmod_then_read(paths, **kwargs):
+        # lands after the walk, before any ACL info is read
+        os.chmod(file_a, 0o600)
+        return iter_getfacl_many(paths, **kwargs)
+
+    monkeypatch.setattr(air, "iter_getfacl_many", chmod_then_read)
+    with ACLWatcher(temp_tree, backend="xattr") as acl_watcher:
+        assert str(acl_watcher.get(file_a).group) == "---"
+        # the event is delivered; re-reading finds nothing new
+        assert acl_watcher.poll(timeout=1) == []
+        os.chmod(file_a, 0o640)
+        assert [event.path for event in acl_watcher.poll(timeout=1)] == [
+            file_a
+        ]
+
+
+def test_failed_batch_read_path_by_path(watcher, temp_tree, monkeypatch):
+    def fail(paths, **kwargs):
+        raise ae.SubprocessException(
+            subprocess.CompletedProcess(["getfacl"], 1, b"", b"")
+        )
+
+    monkeypatch.setattr(air, "iter_getfacl_many", fail)
+    new_dir = temp_tree / "new_dir"
+    new_dir.mkdir()
+    (new_dir / "file_b").touch()
+    events = watcher.poll(timeout=1)
+    assert {event.path for event in events} == {
+        new_dir,
+        new_dir / "file_b",
+    }
+    (temp_tree / "dir_a" / "file_a").unlink()
+    os.chmod(temp_tree, 0o700)
+    watcher._rescan()
+    assert len(watcher) == 4
+
+
+def test_directory_recreated_between_polls(watcher, temp_tree):
+    dir_a = temp_tree / "dir_a"
+    shutil.rmtree(dir_a)
+    dir_a.mkdir()
+    watcher.poll(timeout=1)
+    assert watcher.get(dir_a / "file_a") is None
+    assert watcher.get(dir_a) is not None
+    # the new directory is watched
+    (dir_a / "file_b").touch()
+    events = watcher.poll(timeout=1)
+    assert [event.path for event in events] == [dir_a / "file_b"]
+    assert watcher.get(dir_a / "file_b") is not None
+
+
+def test_directory_moved_out_of_tree(watcher, temp_tree):
+    dir_a = temp_tree / "dir_a"
+    moved = temp_tree.parent / "moved"
+    dir_a.rename(moved)
+    events = watcher.poll(timeout=1)
+    assert {event.path for event in events} == {dir_a, dir_a / "file_a"}
+    assert all(event.new is None for event in events)
+    # events from the moved directory aren't reported under its old path
+    (moved / "file_b").touch()
+    assert watcher.poll(timeout=0.2) == []
+    assert watcher.get(dir_a / "file_b") is None
+    assert len(watcher) == 1
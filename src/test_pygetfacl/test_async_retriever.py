@@ -0,0 +1,74 @@
+import asyncio
+import os
+import shutil
+import time
+import pytest
+import pygetfacl
+from pygetfacl.aclpath_exceptions import GetFaclSubprocessException
+from pygetfacl.async_retriever import _run_getfacl
+
+requires_getfacl = pytest.mark.skipif(
+    shutil.which("getfacl") is None, reason="getfacl not installed"
+)
+
+
+@pytest.fixture
+def temp_files(tmp_path):
+    paths = [tmp_path / f"file_{idx}" for idx in range(6)]
+    for idx, path in enumerate(paths):
+        path.touch()
+        os.chmod(path, 0o640 + idx)
+    return paths
+
+
+def test_timeout_kills_process():
+    start = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(_run_getfacl(["sleep", "10"], timeout=0.1))
+    assert time.monotonic() - start < 5
+
+
+def test_cancellation_kills_process():
+    async def cancel_soon():
+        task = asyncio.ensure_future(_run_getfacl(["sleep", "10"]))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    start = time.monotonic()
+    asyncio.run(cancel_soon())
+    assert time.monotonic() - start < 5
+
+
+def test_nonzero_return_code():
+    with pytest.raises(GetFaclSubprocessException):
+        asyncio.run(_run_getfacl(["ls", "blahblah"]))
+
+
+def test_agetfacl_many_xattr_backend(temp_files):
+    results = asyncio.run(
+        pygetfacl.agetfacl_many(temp_files, concurrency=2, backend="xattr")
+    )
+    assert list(results) == temp_files
+    assert results == pygetfacl.getfacl_many(temp_files, backend="xattr")
+
+
+@requires_getfacl
+def test_agetfacl(temp_files):
+    acl_data = asyncio.run(pygetfacl.agetfacl(temp_files[0]))
+    assert acl_data == pygetfacl.getfacl(temp_files[0])
+
+
+@requires_getfacl
+def test_agetfacl_many(temp_files):
+    results = asyncio.run(pygetfacl.agetfacl_many(temp_files, concurrency=2))
+    assert list(results) == temp_files
+    for path, acl_data in results.items():
+        assert str(acl_data.group) == str(pygetfacl.getfacl(path).group)
+
+
+@requires_getfacl
+def test_agetfacl_missing_path(tmp_path):
+    with pytest.raises(GetFaclSubprocessException):
+        asyncio.run(pygetfacl.agetfacl_many([tmp_path / "not_there"]))
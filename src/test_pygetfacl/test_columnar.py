@@ -0,0 +1,88 @@
+from pathlib import Path
+import pytest
+import pygetfacl.file_setting as fs
+from pygetfacl.columnar import ABSENT, R, W, X, to_columnar
+from pygetfacl.data_containers import ACLData
+
+np = pytest.importorskip("numpy")
+
+
+def perm(permission_string):
+    return fs.PermissionSetting.from_string(permission_string)
+
+
+def make_acl_data(other="r--", mask=None, special_users=None):
+    return ACLData(
+        owning_user="user_a",
+        owning_group="group_a",
+        flags=None,
+        user=perm("rwx"),
+        group=perm("rw-"),
+        mask=None if mask is None else perm(mask),
+        other=perm(other),
+        default_user=None,
+        default_group=None,
+        default_mask=None,
+        default_other=None,
+        special_users=special_users or {},
+    )
+
+
+@pytest.fixture
+def table():
+    return to_columnar(
+        [
+            (Path("a"), make_acl_data()),
+            (Path("b"), make_acl_data(other="rw-")),
+            (
+                Path("c"),
+                make_acl_data(
+                    mask="r-x", special_users={"user_b": perm("rwx")}
+                ),
+            ),
+            (
+                Path("d"),
+                make_acl_data(
+                    mask="rwx", special_users={"user_b": perm("r--")}
+                ),
+            ),
+        ]
+    )
+
+
+def test_columns(table):
+    assert len(table) == 4
+    assert table.other.tolist() == [R, R | W, R, R]
+    assert table.mask.tolist() == [ABSENT, ABSENT, R | X, R | W | X]
+    assert table.default_user.tolist() == [ABSENT] * 4
+    assert table.flags.tolist() == [0] * 4
+    assert table.user_names[table.owning_user_codes[0]] == "user_a"
+
+
+def test_other_writable(table):
+    assert table.select(table.has_bits("other", W)) == [Path("b")]
+
+
+def test_mask_hides_group_write(table):
+    assert table.select(table.mask_hides("group", W)) == [Path("c")]
+
+
+def test_named_entries_csr(table):
+    entries = table.named_entries("special_users")
+    assert entries.indptr.tolist() == [0, 0, 0, 1, 2]
+    assert entries.perms.tolist() == [R | W | X, R]
+
+
+def test_named_grants(table):
+    assert table.select(table.named_grants("special_users", "user_b", X)) == [
+        Path("c")
+    ]
+    assert table.select(
+        table.named_grants("special_users", "user_b", W, effective=False)
+    ) == [Path("c")]
+    assert not table.named_grants("special_users", "nobody", R).any()
+
+
+def test_owned_by(table):
+    assert table.owned_by("user_a").all()
+    assert not table.owned_by("user_b").any()
@@ -0,0 +1,110 @@
+import dataclasses
+import os
+import shutil
+import threading
+import pytest
+import pygetfacl
+from pygetfacl.aclpath_exceptions import GetFaclSubprocessException
+from pygetfacl.coprocess import GetFaclCoprocess, GetFaclCoprocessPool
+from pygetfacl.output_spec import escape_getfacl_name
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("getfacl") is None or shutil.which("stdbuf") is None,
+    reason="getfacl or stdbuf not installed",
+)
+
+
+def assert_same_acl(acl_data, path):
+    # co-processes run getfacl -p, so "# file:" headers keep their leading /
+    assert dataclasses.replace(
+        acl_data, raw_system_output=""
+    ) == dataclasses.replace(pygetfacl.getfacl(path), raw_system_output="")
+
+
+@pytest.fixture
+def temp_files(tmp_path):
+    paths = [tmp_path / f"file {idx}" for idx in range(5)]
+    for idx, path in enumerate(paths):
+        path.touch()
+        os.chmod(path, 0o640 + idx)
+    return paths
+
+
+@pytest.fixture
+def coprocess():
+    with GetFaclCoprocess() as getfacl_coprocess:
+        yield getfacl_coprocess
+
+
+def test_escape_getfacl_name():
+    assert escape_getfacl_name("/a dir/b\\c") == "/a\\040dir/b\\134c"
+
+
+def test_getfacl(coprocess, temp_files):
+    for path in temp_files:
+        assert_same_acl(coprocess.getfacl(path), path)
+
+
+def test_getfacl_many(coprocess, temp_files):
+    results = coprocess.getfacl_many(temp_files * 200)
+    assert list(results) == temp_files
+    assert coprocess.is_alive()
+
+
+def test_failed_path_keeps_stream_in_sync(coprocess, temp_files, tmp_path):
+    with pytest.raises(GetFaclSubprocessException):
+        coprocess.getfacl_many([temp_files[0], tmp_path / "not_there"])
+    assert_same_acl(coprocess.getfacl(temp_files[1]), temp_files[1])
+
+
+def test_abandoned_iteration_keeps_stream_in_sync(coprocess, temp_files):
+    results = coprocess.iter_getfacl_raw(temp_files)
+    next(results)
+    results.close()
+    assert coprocess.ping()
+    assert_same_acl(coprocess.getfacl(temp_files[2]), temp_files[2])
+
+
+def test_pool_restarts_dead_coprocess(temp_files):
+    with GetFaclCoprocessPool(size=1) as pool:
+        with pool.acquire() as coprocess:
+            coprocess._process.kill()
+            coprocess._process.wait()
+        assert_same_acl(pool.getfacl(temp_files[0]), temp_files[0])
+        assert pool.check_health() == 0
+
+
+def test_pool_closed_while_lent_out(temp_files):
+    pool = GetFaclCoprocessPool(size=2)
+    with pool.acquire() as lent_coprocess:
+        with pool.acquire() as idle_coprocess:
+            pass
+        pool.close()
+        assert not idle_coprocess.is_alive()
+        assert_same_acl(lent_coprocess.getfacl(temp_files[0]), temp_files[0])
+    assert not lent_coprocess.is_alive()
+    assert pool._idle.empty()
+    with pytest.raises(ValueError):
+        with pool.acquire():
+            pass
+
+
+def test_pool_threads(temp_files):
+    errors = []
+
+    def worker(pool):
+        try:
+            for path in temp_files:
+                assert_same_acl(pool.getfacl(path), path)
+        except Exception as err:
+            errors.append(err)
+
+    with GetFaclCoprocessPool(size=2) as pool:
+        threads = [
+            threading.Thread(target=worker, args=(pool,)) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert errors == []
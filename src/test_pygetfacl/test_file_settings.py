@@ -1,7 +1,12 @@
+import pickle
 import pytest
 
 from pygetfacl.aclpath_exceptions import InvalidFileSettingString
-from pygetfacl.file_setting import PermissionSetting
+from pygetfacl.file_setting import (
+    FlagSetting,
+    PermissionSetting,
+    compute_effective_permissions,
+)
 
 good_permission_settings = [
     ("-", "-", "-"),
@@ -40,3 +45,64 @@ def test_bad_permission_settings(r_string, w_string, x_string):
         permissions = PermissionSetting.from_string(
             "".join([r_string, w_string, x_string])
         )
+
+
+@pytest.mark.parametrize(
+    "r_string, w_string, x_string", good_permission_settings
+)
+def test_permission_settings_are_interned(r_string, w_string, x_string):
+    permission_string = "".join([r_string, w_string, x_string])
+    permissions = PermissionSetting.from_string(permission_string)
+    assert permissions is PermissionSetting.from_string(permission_string)
+    assert permissions is PermissionSetting(
+        r=r_string == "r", w=w_string == "w", x=x_string == "x"
+    )
+    assert permissions is PermissionSetting.from_bits(permissions.bits)
+    assert permissions is pickle.loads(pickle.dumps(permissions))
+    assert str(permissions) == permission_string
+
+
+def test_permission_setting_is_immutable():
+    permissions = PermissionSetting.from_string("rwx")
+    with pytest.raises(AttributeError):
+        permissions._bits = 0
+    assert str(PermissionSetting.from_string("rwx")) == "rwx"
+
+
+def test_permission_setting_hash():
+    assert len(
+        {
+            PermissionSetting.from_string("r-x"),
+            PermissionSetting(r=True, w=False, x=True),
+            PermissionSetting.from_string("rw-"),
+        }
+    ) == 2
+
+
+@pytest.mark.parametrize(
+    "base, mask, expected",
+    [("rwx", "r-x", "r-x"), ("rw-", "--x", "---"), ("r--", None, "r--")],
+)
+def test_compute_effective_permissions(base, mask, expected):
+    effective = compute_effective_permissions(
+        base=PermissionSetting.from_string(base),
+        mask=None if mask is None else PermissionSetting.from_string(mask),
+    )
+    assert effective is PermissionSetting.from_string(expected)
+
+
+@pytest.mark.parametrize("flag_string", ["---", "s--", "-s-", "--t", "sst"])
+def test_flag_settings(flag_string):
+    flags = FlagSetting.from_string(flag_string)
+    assert str(flags) == flag_string
+    assert flags is FlagSetting(
+        uid=flag_string[0] == "s",
+        gid=flag_string[1] == "s",
+        sticky=flag_string[2] == "t",
+    )
+
+
+@pytest.mark.parametrize("flag_string", ["rwx", "ss", "sts"])
+def test_bad_flag_settings(flag_string):
+    with pytest.raises(InvalidFileSettingString):
+        FlagSetting.from_string(flag_string)
@@ -0,0 +1,121 @@
+import os
+import pytest
+import pygetfacl
+import pygetfacl.acl_info_retriever as air
+import pygetfacl.file_setting as fs
+from pygetfacl.incremental import (
+    ADDED,
+    MODIFIED,
+    REMOVED,
+    ACLEntryChange,
+    diff_acl_data,
+    incremental_rescan,
+)
+from pygetfacl.snapshot import Snapshot, write_snapshot
+
+
+@pytest.fixture
+def temp_tree(tmp_path):
+    top = tmp_path / "tree"
+    top.mkdir()
+    for idx in range(10):
+        my_file = top / f"file_{idx}"
+        my_file.touch()
+        os.chmod(my_file, 0o640)
+    return top
+
+
+@pytest.fixture
+def snapshot_file(tmp_path, temp_tree):
+    file_path = tmp_path / "acls.snapshot"
+    write_snapshot(
+        file_path, pygetfacl.getfacl_tree(temp_tree, backend="xattr")
+    )
+    return file_path
+
+
+def test_diff_acl_data(temp_tree):
+    old = pygetfacl.getfacl(temp_tree / "file_0", backend="xattr")
+    os.chmod(temp_tree / "file_0", 0o644)
+    new = pygetfacl.getfacl(temp_tree / "file_0", backend="xattr")
+    new.special_users["user_b"] = fs.PermissionSetting.from_string("r--")
+    assert diff_acl_data(old, new) == [
+        ACLEntryChange("other", None, old.other, new.other),
+        ACLEntryChange(
+            "special_users", "user_b", None, new.special_users["user_b"]
+        ),
+    ]
+    assert diff_acl_data(old, old) == []
+
+
+def test_unchanged_tree_reads_nothing(
+    snapshot_file, temp_tree, monkeypatch
+):
+    def fail(*args, **kwargs):
+        raise AssertionError("retrieved ACL info for an unchanged path")
+
+    monkeypatch.setattr(
+        air._MultiPathACLInfoRetriever, "_getfacl_batch_output", fail
+    )
+    with Snapshot(snapshot_file) as snapshot:
+        diffs = list(
+            incremental_rescan(snapshot, temp_tree, backend="subprocess")
+        )
+    assert diffs == []
+
+
+def test_diff_stream(snapshot_file, temp_tree, tmp_path):
+    os.chmod(temp_tree / "file_1", 0o600)
+    (temp_tree / "file_2").unlink()
+    (temp_tree / "new_file").touch()
+    # ctime changes, ACL doesn't
+    (temp_tree / "file_3").write_text("data")
+
+    new_snapshot = tmp_path / "new.snapshot"
+    with Snapshot(snapshot_file) as snapshot:
+        diffs = list(
+            incremental_rescan(
+                snapshot, temp_tree, backend="xattr", write_to=new_snapshot
+            )
+        )
+    by_path = {diff.path: diff for diff in diffs}
+    assert set(by_path) == {
+        temp_tree / "file_1",
+        temp_tree / "file_2",
+        temp_tree / "new_file",
+    }
+    modified = by_path[temp_tree / "file_1"]
+    assert modified.kind == MODIFIED
+    assert [change.field for change in modified.changes] == ["group"]
+    assert by_path[temp_tree / "file_2"].kind == REMOVED
+    assert by_path[temp_tree / "new_file"].kind == ADDED
+
+    with Snapshot(new_snapshot) as snapshot:
+        assert dict(snapshot.items()) == dict(
+            pygetfacl.getfacl_tree(temp_tree, backend="xattr")
+        )
+        assert list(incremental_rescan(snapshot, temp_tree)) == []
+
+
+def test_other_trees_not_removed(snapshot_file, temp_tree):
+    sub = temp_tree / "sub"
+    sub.mkdir()
+    with Snapshot(snapshot_file) as snapshot:
+        diffs = list(incremental_rescan(snapshot, sub, backend="xattr"))
+    assert [(diff.path, diff.kind) for diff in diffs] == [(sub, ADDED)]
+
+
+@pytest.mark.parametrize("root", [".", "tree"])
+def test_removed_under_relative_root(
+    tmp_path, temp_tree, monkeypatch, root
+):
+    monkeypatch.chdir(temp_tree if root == "." else tmp_path)
+    file_path = tmp_path / "acls.snapshot"
+    write_snapshot(file_path, pygetfacl.getfacl_tree(root, backend="xattr"))
+    (temp_tree / "file_2").unlink()
+    with Snapshot(file_path) as snapshot:
+        diffs = list(incremental_rescan(snapshot, root, backend="xattr"))
+    removed = os.path.normpath(os.path.join(root, "file_2"))
+    assert [(str(diff.path), diff.kind) for diff in diffs] == [
+        (removed, REMOVED)
+    ]
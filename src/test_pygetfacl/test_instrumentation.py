@@ -0,0 +1,149 @@
+import sys
+import threading
+import pytest
+import pygetfacl.aclpath_exceptions as ae
+import pygetfacl.instrumentation as ins
+import pygetfacl.subprocess_caller as sc
+from pygetfacl.data_containers import ACLData
+from pygetfacl.parse_cache import ParseCache
+
+GETFACL_RESULT = (
+    "# file: file_a\n"
+    "# owner: user_a\n"
+    "# group: user_a\n"
+    "user::rwx\n"
+    "user:user_b:rw-\n"
+    "group::r-x\n"
+    "mask::rwx\n"
+    "other::r-x\n"
+    "\n"
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    ins.disable()
+    ins.reset()
+    yield
+    ins.disable()
+    ins.reset()
+
+
+def test_disabled_by_default_records_nothing():
+    assert not ins.enabled
+    assert ins.start() is None
+    ACLData.from_getfacl_cmd_output(GETFACL_RESULT)
+    ins.increment("counter")
+    assert ins.snapshot() == {}
+
+
+def test_timed_parse_matches_untimed():
+    expected = ACLData.from_getfacl_cmd_output(GETFACL_RESULT)
+    with ins.collect():
+        assert ACLData.from_getfacl_cmd_output(GETFACL_RESULT) == expected
+
+
+def test_collect_scopes_parse_metrics():
+    with ins.collect() as registry:
+        for _ in range(3):
+            ACLData.from_getfacl_cmd_output(GETFACL_RESULT)
+    assert not ins.enabled
+    metrics = registry.snapshot()
+    for name in ("parse", "parse.tokenize", "parse.validate"):
+        assert metrics[name].count == 3
+    assert metrics["parse.construct"].count == 3
+    assert metrics["parse"].nbytes == 3 * len(GETFACL_RESULT)
+    assert sum(num for _, num in metrics["parse"].histogram) == 3
+    assert metrics["parse"].min_ns <= metrics["parse"].max_ns
+    # the process-wide registry sees the same events
+    assert ins.snapshot()["parse"].count == 3
+
+
+def test_collect_restores_enabled_state():
+    ins.enable()
+    with ins.collect():
+        with ins.collect():
+            pass
+        assert ins.enabled
+    assert ins.enabled
+
+
+def test_sink_receives_events():
+    events = []
+    ins.add_sink(events.append)
+    try:
+        ins.enable()
+        ins.increment("counter", count=2, nbytes=10)
+        started = ins.start()
+        ins.stop("timer", started)
+    finally:
+        ins.remove_sink(events.append)
+    assert events[0] == ins.Event("counter", None, 10, 2)
+    assert events[1].name == "timer"
+    assert events[1].elapsed_ns >= 0
+    counter = ins.snapshot()["counter"]
+    assert (counter.count, counter.nbytes, counter.histogram) == (2, 10, ())
+    assert counter.mean_ns is None
+
+
+def test_histogram_buckets():
+    registry = ins.Registry()
+    for elapsed_ns in (0, 1, 3, 1000, 1023):
+        registry(ins.Event("timer", elapsed_ns))
+    metric = registry.snapshot()["timer"]
+    assert metric.histogram == ((0, 2), (2, 1), (512, 2))
+    assert metric.total_ns == 2027
+    assert (metric.min_ns, metric.max_ns) == (0, 1023)
+
+
+def test_bytes_parse_phases():
+    with ins.collect() as registry:
+        acl_data = ACLData.from_getfacl_bytes(GETFACL_RESULT.encode())
+        acl_data.raw_system_output
+    metrics = registry.snapshot()
+    for name in ("parse.bytes", "parse.bytes.decode", "parse.raw_decode"):
+        assert metrics[name].nbytes == len(GETFACL_RESULT)
+    assert metrics["parse.bytes.construct"].count == 1
+
+
+def test_parse_cache_hits_and_misses():
+    parse_cache = ParseCache()
+    with ins.collect() as registry:
+        for _ in range(3):
+            parse_cache.parse(GETFACL_RESULT)
+    metrics = registry.snapshot()
+    assert metrics["parse_cache.miss"].count == 1
+    assert metrics["parse_cache.hit"].count == 2
+
+
+def test_subprocess_phases():
+    command = [sys.executable, "-c", "print('x' * 99)"]
+    with ins.collect() as registry:
+        stdout = sc.SubProcessCaller(command).call_with_stdout_capture()
+    assert stdout == "x" * 99 + "\n"
+    metrics = registry.snapshot()
+    assert metrics["subprocess.spawn"].count == 1
+    assert metrics["subprocess.wait"].nbytes == 100
+    assert metrics["subprocess.decode"].nbytes == 100
+
+
+def test_events_from_other_threads_are_collected():
+    def work():
+        for _ in range(100):
+            ins.increment("counter")
+
+    with ins.collect() as registry:
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert registry.snapshot()["counter"].count == 400
+
+
+def test_subprocess_failure_raises_when_enabled():
+    command = [sys.executable, "-c", "import sys; sys.exit(3)"]
+    with ins.collect():
+        with pytest.raises(ae.SubprocessException) as exc_info:
+            sc.SubProcessCaller(command).call_with_stdout_capture()
+    assert exc_info.value.completed_process.returncode == 3
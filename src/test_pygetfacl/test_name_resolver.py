@@ -0,0 +1,41 @@
+import pytest
+import pygetfacl.name_resolver as nr
+
+
+class CountingLookup:
+    def __init__(self, names):
+        self.names = names
+        self.calls = 0
+
+    def __call__(self, numeric_id):
+        self.calls += 1
+        return self.names[numeric_id]
+
+
+@pytest.fixture
+def name_cache():
+    lookup = CountingLookup({1000: "user_a"})
+    return nr._NameCache(lookup), lookup
+
+
+def test_positive_lookups_cached(name_cache):
+    cache, lookup = name_cache
+    assert cache(1000) == "user_a"
+    assert cache(1000) == "user_a"
+    assert lookup.calls == 1
+
+
+def test_negative_lookups_cached(name_cache):
+    cache, lookup = name_cache
+    assert cache(4242) == "4242"
+    assert cache(4242) == "4242"
+    assert lookup.calls == 1
+    cache.clear()
+    assert cache(4242) == "4242"
+    assert lookup.calls == 2
+
+
+def test_resolve_names():
+    assert nr.resolve_user_name("0") == nr.user_name(0)
+    assert nr.resolve_group_name("0") == nr.group_name(0)
+    assert nr.resolve_user_name("user_a") == "user_a"
@@ -0,0 +1,190 @@
+from pygetfacl.output_spec import (
+    GETFACL_OUTPUT_ITEMS,
+    decode_getfacl_output_bytes,
+    decode_trusted_getfacl_output,
+    find_item_values,
+    getfacl_block_spans,
+    split_getfacl_output,
+    tokenize_getfacl_output,
+    unescape_getfacl_name,
+)
+
+
+def test_tokenize_getfacl_output():
+    matches = tokenize_getfacl_output(
+        "# file: dir_a\n"
+        "# owner: user_a\n"
+        "# group: user_a\n"
+        "# flags: -s-\n"
+        "user::rwx\n"
+        "user:user_b:rwx\n"
+        "group::r-x\n"
+        "mask::rwx\n"
+        "other::r-x\n"
+        "default:user::rwx\n"
+        "default:group:group_b:r--\n"
+        "default:mask::r-x\n"
+        "default:other::---\n"
+        "\n"
+    )
+    assert matches["owning_user"] == [" user_a"]
+    assert matches["flags"] == [" -s-"]
+    assert matches["user"] == ["rwx"]
+    assert matches["special_users"] == ["user_b:rwx"]
+    assert matches["special_groups"] == []
+    assert matches["mask"] == ["rwx"]
+    assert matches["default_user"] == ["rwx"]
+    assert matches["default_special_users"] == []
+    assert matches["default_special_groups"] == ["group_b:r--"]
+    assert matches["default_mask"] == ["r-x"]
+    assert matches["default_other"] == ["---"]
+
+
+def test_split_getfacl_output():
+    cmd_output = (
+        "# file: dir_a\n"
+        "# owner: user_a\n"
+        "# group: user_a\n"
+        "user::rwx\n"
+        "group::r-x\n"
+        "other::r-x\n"
+        "\n"
+        "# file: dir_b\n"
+        "# owner: user_b\n"
+        "# group: user_b\n"
+        "user::rw-\n"
+        "group::r--\n"
+        "other::r--\n"
+        "\n"
+    )
+    blocks = split_getfacl_output(cmd_output)
+    assert len(blocks) == 2
+    assert blocks[0].startswith("# file: dir_a\n")
+    assert blocks[1].startswith("# file: dir_b\n")
+    assert blocks[1].endswith("other::r--\n\n")
+
+
+def test_split_empty_output():
+    assert split_getfacl_output("") == []
+
+
+def test_decode_trusted_getfacl_output():
+    kwargs = decode_trusted_getfacl_output(
+        "# file: dir_a:b\n"
+        "# owner: user_a\n"
+        "# group: group_a\n"
+        "user::rwx\n"
+        "user:user_b:rw-\n"
+        "group::r-x\n"
+        "mask::rwx\n"
+        "other::r-x\n"
+        "default:user::rwx\n"
+        "default:group:group_b:r--\n"
+        "default:group::---\n"
+        "default:other::---\n"
+        "\n"
+    )
+    assert kwargs["owning_user"] == "user_a"
+    assert kwargs["owning_group"] == "group_a"
+    assert kwargs["flags"] is None
+    assert repr(kwargs["special_users"]) == "{'user_b': rw-}"
+    assert repr(kwargs["default_special_groups"]) == "{'group_b': r--}"
+    assert repr(kwargs["default_group"]) == "---"
+    assert kwargs["default_mask"] is None
+
+
+def test_decode_trusted_getfacl_output_declines():
+    base = "# owner: user_a\n# group: group_a\nuser::rwx\ngroup::r-x\n"
+    assert decode_trusted_getfacl_output(base + "other::r-x\n") is not None
+    # missing required entry
+    assert decode_trusted_getfacl_output(base) is None
+    # invalid permission string
+    assert decode_trusted_getfacl_output(base + "other::rxw\n") is None
+    # "#effective:" comments (output without -E)
+    assert (
+        decode_trusted_getfacl_output(
+            base + "user:user_b:rwx\t#effective:r-x\nother::r-x\n"
+        )
+        is None
+    )
+
+
+def test_find_item_values_matches_tokenize():
+    cmd_output = (
+        "# file: dir_a\n"
+        "# owner: user_a\n"
+        "# group: user_a\n"
+        "user::rwx\n"
+        "user:user_b:rwx\n"
+        "group::r-x\n"
+        "mask::rwx\n"
+        "other::r-x\n"
+        "default:user::rwx\n"
+        "default:user:user_c:r--\n"
+        "default:other::---\n"
+        "\n"
+    )
+    matches = tokenize_getfacl_output(cmd_output)
+    padded = "x\n" + cmd_output + "# file: next\nuser:user_d:---\n"
+    for item in GETFACL_OUTPUT_ITEMS:
+        assert find_item_values(item, cmd_output) == matches[item.attribute]
+        assert (
+            find_item_values(item, padded, 2, 2 + len(cmd_output))
+            == matches[item.attribute]
+        )
+
+
+def test_getfacl_block_spans():
+    cmd_output = (
+        "\n"
+        "# file: dir_a\n"
+        "user::rwx\n"
+        "\n"
+        "# file: dir_b\n"
+        "user::r-x\n"
+        "\n"
+    )
+    spans = getfacl_block_spans(cmd_output)
+    assert [cmd_output[start:end] for start, end in spans] == (
+        split_getfacl_output(cmd_output)
+    )
+    assert len(spans) == 2
+    assert getfacl_block_spans("") == []
+    assert getfacl_block_spans(cmd_output.encode()) == spans
+
+
+def test_unescape_getfacl_name():
+    assert unescape_getfacl_name("user_a") == "user_a"
+    assert unescape_getfacl_name("user\\040a") == "user a"
+    assert unescape_getfacl_name(b"back\\134slash") == "back\\slash"
+    assert unescape_getfacl_name("caf\\303\\251") == "caf\u00e9"
+    # bytes that aren't valid UTF-8 decode like os.fsdecode
+    assert unescape_getfacl_name("\\377") == "\udcff"
+    # only backslash + 3 octal digits is an escape
+    assert unescape_getfacl_name("a\\08") == "a\\08"
+
+
+def test_decode_getfacl_output_bytes_matches_trusted():
+    cmd_output = (
+        "# file: dir_a\n"
+        "# owner: user_a\n"
+        "# group: group_a\n"
+        "# flags: -s-\n"
+        "user::rwx\n"
+        "user:user_b:rw-\n"
+        "group::r-x\n"
+        "mask::rwx\n"
+        "other::r-x\n"
+        "default:user::rwx\n"
+        "default:group:group_b:r--\n"
+        "default:group::---\n"
+        "default:other::---\n"
+        "\n"
+    )
+    encoded = cmd_output.encode()
+    expected = decode_trusted_getfacl_output(cmd_output)
+    assert decode_getfacl_output_bytes(encoded) == expected
+    padded = memoryview(b"xx\n" + encoded + b"# owner: user_c\n")
+    assert (
+        decode_getfacl_output_bytes(padded, 3, 3 + len(encoded)) == expected
+    )
@@ -0,0 +1,116 @@
+from pathlib import Path
+import pytest
+import pygetfacl
+import pygetfacl.parallel_scanner as ps
+
+
+@pytest.fixture
+def temp_tree(tmp_path) -> Path:
+    root = tmp_path / "root"
+    for dir_idx in range(4):
+        sub_dir = root / f"dir_{dir_idx}" / "nested"
+        sub_dir.mkdir(parents=True)
+        for file_idx in range(3):
+            (sub_dir / f"file_{file_idx}").touch()
+            (sub_dir.parent / f"file_{file_idx}").touch()
+    return root
+
+
+def exclude_dir_0(path: Path) -> bool:
+    return path.name == "dir_0"
+
+
+@pytest.mark.parametrize("entry_budget", [1, 3, 1000])
+def test_matches_sequential_scan(temp_tree, entry_budget):
+    results = list(
+        pygetfacl.getfacl_tree_parallel(
+            temp_tree,
+            max_workers=2,
+            backend="xattr",
+            entry_budget=entry_budget,
+        )
+    )
+    expected = dict(pygetfacl.getfacl_tree(temp_tree, backend="xattr"))
+    assert len(results) == len(expected) == 1 + 4 * 8
+    assert dict(results) == expected
+
+
+def test_walk_options(temp_tree):
+    results = dict(
+        pygetfacl.getfacl_tree_parallel(
+            temp_tree,
+            max_workers=2,
+            backend="xattr",
+            entry_budget=2,
+            max_depth=2,
+            exclude=exclude_dir_0,
+        )
+    )
+    assert results == dict(
+        pygetfacl.getfacl_tree(
+            temp_tree, backend="xattr", max_depth=2, exclude=exclude_dir_0
+        )
+    )
+    assert temp_tree / "dir_0" not in results
+    assert temp_tree / "dir_1" / "nested" / "file_0" not in results
+
+
+def test_follow_not_supported(temp_tree):
+    with pytest.raises(ValueError):
+        list(pygetfacl.getfacl_tree_parallel(temp_tree, symlinks="follow"))
+
+
+def test_large_directory_split_across_tasks(tmp_path):
+    for idx in range(10):
+        (tmp_path / f"file_{idx}").touch()
+    results, leftovers, chunks, errors = ps._scan_subtree(
+        tmp_path,
+        0,
+        root_dev=tmp_path.stat().st_dev,
+        entry_budget=3,
+        batch_size=10,
+        backend="xattr",
+        walk_kwargs={},
+    )
+    assert len(results) == 3
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert leftovers == errors == []
+    retrieved = [path for path, _ in results]
+    retrieved.extend(path for chunk in chunks for path in chunk)
+    assert sorted(retrieved) == sorted(tmp_path.iterdir())
+
+
+def include_nested_file_0(path: Path) -> bool:
+    return path.name == "file_0" and path.parent.name == "nested"
+
+
+def test_selective_include_still_splits_work(temp_tree):
+    results, leftovers, chunks, errors = ps._scan_subtree(
+        temp_tree,
+        0,
+        root_dev=temp_tree.stat().st_dev,
+        entry_budget=4,
+        batch_size=10,
+        backend="xattr",
+        walk_kwargs={"include": include_nested_file_0},
+    )
+    # stops once the root is listed, though nothing was reported
+    assert results == []
+    assert len(leftovers) == 4
+    assert chunks == errors == []
+
+    results = dict(
+        pygetfacl.getfacl_tree_parallel(
+            temp_tree,
+            max_workers=2,
+            backend="xattr",
+            entry_budget=4,
+            include=include_nested_file_0,
+        )
+    )
+    assert results == dict(
+        pygetfacl.getfacl_tree(
+            temp_tree, backend="xattr", include=include_nested_file_0
+        )
+    )
+    assert len(results) == 4
@@ -0,0 +1,72 @@
+import shutil
+import pytest
+import pygetfacl
+from pygetfacl.aclpath_exceptions import ExcessRegexMatches
+from pygetfacl.data_containers import ACLData, CompactACLData
+from pygetfacl.parse_cache import ParseCache
+
+
+def getfacl_result(file_name: str, other: str = "r-x") -> str:
+    return (
+        f"# file: {file_name}\n"
+        "# owner: user_a\n"
+        "# group: user_a\n"
+        "user::rwx\n"
+        "group::r-x\n"
+        f"other::{other}\n"
+        "\n"
+    )
+
+
+def test_identical_acls_share_one_object():
+    parse_cache = ParseCache()
+    acl_a = parse_cache.parse(getfacl_result("file_a"))
+    acl_b = parse_cache.parse(getfacl_result("file_b"))
+    acl_c = parse_cache.parse(getfacl_result("file_c", other="---"))
+    assert acl_a is acl_b
+    assert acl_a is not acl_c
+    assert parse_cache.stats.hits == 1
+    assert parse_cache.stats.misses == 2
+    assert len(parse_cache) == 2
+
+
+def test_matches_uncached_parse():
+    acl_data = ParseCache().parse(getfacl_result("file_a"))
+    assert isinstance(acl_data, CompactACLData)
+    assert acl_data.raw_system_output == ""
+    expected = ACLData.from_getfacl_cmd_output(getfacl_result("file_a"))
+    expected.raw_system_output = ""
+    assert acl_data.to_acl_data() == expected
+
+
+def test_lenient_parse_not_reused_for_strict():
+    parse_cache = ParseCache()
+    # a repeated entry is accepted by the lenient parse only
+    cmd_output = getfacl_result("file_a")[:-1] + "other::---\n\n"
+    parse_cache.parse(cmd_output, strict=False)
+    with pytest.raises(ExcessRegexMatches):
+        parse_cache.parse(cmd_output)
+    assert parse_cache.stats.hits == 0
+
+
+def test_lru_eviction():
+    parse_cache = ParseCache(maxsize=1)
+    parse_cache.parse(getfacl_result("file_a"))
+    parse_cache.parse(getfacl_result("file_b", other="---"))
+    parse_cache.parse(getfacl_result("file_c"))
+    assert parse_cache.stats.hits == 0
+    assert parse_cache.stats.evictions == 2
+    assert len(parse_cache) == 1
+
+
+@pytest.mark.skipif(
+    shutil.which("getfacl") is None, reason="getfacl not installed"
+)
+def test_getfacl_many_with_parse_cache(tmp_path):
+    paths = [tmp_path / f"file_{idx}" for idx in range(4)]
+    for path in paths:
+        path.touch()
+    parse_cache = ParseCache()
+    results = pygetfacl.getfacl_many(paths, parse_cache=parse_cache)
+    assert len({id(acl_data) for acl_data in results.values()}) == 1
+    assert parse_cache.stats.hits == 3
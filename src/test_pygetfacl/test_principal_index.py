@@ -0,0 +1,128 @@
+from pathlib import Path
+import pytest
+import pygetfacl.file_setting as fs
+from pygetfacl.data_containers import ACLData
+from pygetfacl.principal_index import GROUP, PathIdSet, PrincipalIndex
+from pygetfacl.snapshot import Snapshot, write_snapshot
+
+
+def perm(permission_string):
+    return fs.PermissionSetting.from_string(permission_string)
+
+
+def make_acl_data(
+    special_users=None, special_groups=None, mask=None, default=False
+):
+    return ACLData(
+        owning_user="user_a",
+        owning_group="group_a",
+        flags=None,
+        user=perm("rwx"),
+        group=perm("r-x"),
+        mask=None if mask is None else perm(mask),
+        other=perm("r--"),
+        default_user=perm("rwx") if default else None,
+        default_group=perm("rwx") if default else None,
+        default_mask=None,
+        default_other=perm("r--") if default else None,
+        special_users=special_users or {},
+        special_groups=special_groups or {},
+        default_special_groups={"group_d": perm("rwx")} if default else {},
+    )
+
+
+@pytest.fixture
+def results():
+    return [
+        (Path("/proj"), make_acl_data(default=True)),
+        (
+            Path("/proj/b"),
+            make_acl_data(
+                special_users={"user_b": perm("rw-")},
+                special_groups={"group_b": perm("r--")},
+                mask="r--",
+            ),
+        ),
+        (
+            Path("/proj/a"),
+            make_acl_data(special_users={"user_b": perm("rw-")}),
+        ),
+        (Path("/proj/a/x"), make_acl_data()),
+        (
+            Path("/proj-other"),
+            make_acl_data(special_groups={"group_c": perm("rwx")}),
+        ),
+    ]
+
+
+@pytest.fixture
+def index(results):
+    return PrincipalIndex.from_results(results)
+
+
+def test_path_id_set():
+    id_set = PathIdSet()
+    for path_id in [1, 2, 3, 7, 9, 10]:
+        id_set.add(path_id)
+    assert id_set.num_runs == 3
+    assert len(id_set) == 6
+    assert list(id_set) == [1, 2, 3, 7, 9, 10]
+    assert 3 in id_set and 4 not in id_set and 0 not in id_set
+    assert list(id_set.in_range(2, 10)) == [2, 3, 7, 9]
+    assert not id_set.intersects(4, 7)
+
+
+def test_mask_applied(index):
+    assert index.paths("user_b", "w") == [Path("/proj/a")]
+    assert index.paths("user_b", "r") == [Path("/proj/a"), Path("/proj/b")]
+    assert index.paths("user_b") == [Path("/proj/a"), Path("/proj/b")]
+
+
+def test_owner_and_owning_group(index, results):
+    assert len(index.paths("user_a", "w")) == len(results)
+    assert len(index.paths("group_a", "x", kind=GROUP)) == 4
+    assert index.paths("group_a", "x", kind=GROUP, under="/proj/b") == []
+
+
+def test_subtree_queries(index):
+    assert index.principals(GROUP, under="/proj") == {
+        "group_a",
+        "group_b",
+        "group_d",
+    }
+    assert index.principals(GROUP, under="/proj", default=False) == {
+        "group_a",
+        "group_b",
+    }
+    assert index.principals(GROUP) == {
+        "group_a",
+        "group_b",
+        "group_c",
+        "group_d",
+    }
+    assert index.paths("user_a", under="/proj/a") == [
+        Path("/proj/a"),
+        Path("/proj/a/x"),
+    ]
+    assert len(index.paths("user_a", under="/")) == len(index)
+
+
+def test_default_entries(index):
+    assert index.paths("group_d", "w", kind=GROUP, default=True) == [
+        Path("/proj")
+    ]
+    assert index.paths("group_d", kind=GROUP) == []
+
+
+def test_unknown_principal(index):
+    assert index.paths("nobody_here", "r") == []
+    with pytest.raises(ValueError):
+        index.paths("user_a", "q")
+
+
+def test_from_snapshot(tmp_path, results, index):
+    write_snapshot(tmp_path / "acls.snapshot", results)
+    with Snapshot(tmp_path / "acls.snapshot") as snapshot:
+        from_snapshot = PrincipalIndex.from_snapshot(snapshot)
+    assert from_snapshot.paths("user_b", "r") == index.paths("user_b", "r")
+    assert from_snapshot.principals(GROUP) == index.principals(GROUP)
@@ -0,0 +1,105 @@
+import os
+import shutil
+import pytest
+from pygetfacl import getfacl_raw
+from pygetfacl.bounded_cache import BoundedLRUCache
+from pygetfacl.result_cache import ACLResultCache
+
+
+@pytest.fixture
+def temp_file(tmp_path):
+    my_file = tmp_path / "file_a"
+    my_file.touch()
+    os.chmod(my_file, 0o640)
+    return my_file
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBoundedLRUCache:
+    def test_lru_order(self):
+        cache = BoundedLRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+        assert "b" not in cache
+        assert cache.get("a") == 1
+        assert cache.stats.evictions == 1
+
+    def test_ttl(self):
+        clock = FakeClock()
+        cache = BoundedLRUCache(maxsize=2, ttl=10, clock=clock)
+        cache.put("a", 1)
+        clock.now = 9.9
+        assert cache.get("a") == 1
+        clock.now = 10
+        assert cache.get("a") is None
+        assert cache.stats.expirations == 1
+        assert len(cache) == 0
+
+    def test_is_valid(self):
+        cache = BoundedLRUCache(maxsize=2)
+        cache.put("a", 1)
+        assert cache.get("a", is_valid=lambda value: value == 2) is None
+        assert cache.stats.invalidations == 1
+        assert cache.stats.misses == 1
+
+
+class TestACLResultCache:
+    def test_reuses_unchanged_result(self, temp_file):
+        cache = ACLResultCache(backend="xattr")
+        acl_data = cache.getfacl(temp_file)
+        assert cache.getfacl(str(temp_file)) is acl_data
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 1
+
+    def test_ctime_change_invalidates(self, temp_file):
+        cache = ACLResultCache(backend="xattr")
+        assert str(cache.getfacl(temp_file).other) == "---"
+        os.chmod(temp_file, 0o644)
+        assert str(cache.getfacl(temp_file).other) == "r--"
+        assert cache.stats.invalidations == 1
+
+    def test_explicit_invalidation(self, temp_file):
+        cache = ACLResultCache(backend="xattr")
+        acl_data = cache.getfacl(temp_file)
+        cache.invalidate(temp_file)
+        assert cache.getfacl(temp_file) is not acl_data
+        assert cache.stats.hits == 0
+
+    @pytest.mark.skipif(
+        shutil.which("getfacl") is None, reason="getfacl not installed"
+    )
+    def test_getfacl_raw(self, temp_file):
+        cache = ACLResultCache(backend="subprocess")
+        raw_output = cache.getfacl_raw(temp_file)
+        acl_data = cache.getfacl(temp_file)
+        assert acl_data.raw_system_output is raw_output
+        assert cache.stats.hits == 1
+
+    @pytest.mark.skipif(
+        shutil.which("getfacl") is None, reason="getfacl not installed"
+    )
+    def test_paths_sharing_an_inode(self, temp_file):
+        link = temp_file.parent / "link_a"
+        os.link(temp_file, link)
+        cache = ACLResultCache(backend="subprocess")
+        acl_data = cache.getfacl(temp_file)
+        parent = temp_file.parent
+        # a hard link, and another spelling of the same path
+        for path in (link, parent / ".." / parent.name / temp_file.name):
+            raw_output = cache.getfacl_raw(path)
+            assert raw_output == getfacl_raw(path)
+            linked = cache.getfacl(path)
+            assert linked.raw_system_output == raw_output
+            assert linked.other == acl_data.other
+            assert cache.getfacl(path) is linked
+        assert cache.getfacl(temp_file) is acl_data
+        assert cache.stats.misses == 1
@@ -0,0 +1,85 @@
+import os
+import pytest
+import pygetfacl
+from pygetfacl.aclpath_exceptions import InvalidSnapshotFile
+from pygetfacl.snapshot import Snapshot, write_snapshot
+
+
+@pytest.fixture
+def temp_tree(tmp_path):
+    top = tmp_path / "tree"
+    top.mkdir()
+    (top / "sub").mkdir()
+    for idx in range(5):
+        my_file = top / "sub" / f"file_{idx}"
+        my_file.touch()
+        os.chmod(my_file, 0o640 if idx % 2 else 0o4755)
+    (top / "name with spaces \udcff").touch()
+    return top
+
+
+@pytest.fixture
+def scan_results(temp_tree):
+    return list(pygetfacl.getfacl_tree(temp_tree, backend="xattr"))
+
+
+@pytest.fixture
+def snapshot_file(tmp_path, scan_results):
+    file_path = tmp_path / "acls.snapshot"
+    assert write_snapshot(file_path, scan_results) == len(scan_results)
+    return file_path
+
+
+def test_round_trip(snapshot_file, scan_results):
+    with Snapshot(snapshot_file) as snapshot:
+        assert len(snapshot) == len(scan_results)
+        # root, sub, 2 distinct file ACLs
+        assert snapshot.acl_count == 4
+        for path, acl_data in scan_results:
+            assert path in snapshot
+            assert snapshot[path] == acl_data
+        assert dict(snapshot.items()) == dict(scan_results)
+        assert list(snapshot) == sorted(
+            (path for path, _ in scan_results), key=os.fsencode
+        )
+
+
+def test_records(snapshot_file, temp_tree):
+    file_path = temp_tree / "sub" / "file_1"
+    st = os.stat(file_path)
+    with Snapshot(snapshot_file) as snapshot:
+        record = snapshot.record(file_path)
+        assert record.path == file_path
+        assert (record.st_dev, record.st_ino, record.st_ctime_ns) == (
+            st.st_dev,
+            st.st_ino,
+            st.st_ctime_ns,
+        )
+        assert snapshot.record(temp_tree / "missing") is None
+        assert snapshot.get(temp_tree / "missing") is None
+        with pytest.raises(KeyError):
+            snapshot[temp_tree / "missing"]
+
+
+def test_empty_snapshot(tmp_path):
+    file_path = tmp_path / "empty.snapshot"
+    write_snapshot(file_path, [])
+    with Snapshot(file_path) as snapshot:
+        assert len(snapshot) == 0
+        assert list(snapshot.items()) == []
+        assert "anything" not in snapshot
+
+
+@pytest.mark.parametrize("contents", [b"", b"not a snapshot" * 10])
+def test_invalid_file(tmp_path, contents):
+    file_path = tmp_path / "bad.snapshot"
+    file_path.write_bytes(contents)
+    with pytest.raises(InvalidSnapshotFile):
+        Snapshot(file_path)
+
+
+def test_truncated_file(tmp_path, snapshot_file):
+    truncated = tmp_path / "truncated.snapshot"
+    truncated.write_bytes(snapshot_file.read_bytes()[:-10])
+    with pytest.raises(InvalidSnapshotFile):
+        Snapshot(truncated)
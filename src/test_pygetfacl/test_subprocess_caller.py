@@ -27,6 +27,10 @@ class TestSubprocessCaller:
         result = good_command_caller.call_with_stdout_capture()
         assert result.strip() == "hello"
 
+    def test_good_command_bytes(self, good_command_caller):
+        result = good_command_caller.call_with_stdout_capture_bytes()
+        assert result == b"hello\n"
+
     def test_bad_command(self, bad_command_caller):
         with pytest.raises(SubprocessException):
             result = bad_command_caller.call_with_stdout_capture()
@@ -0,0 +1,162 @@
+import dataclasses
+import os
+import shutil
+from pathlib import Path
+import pytest
+import pygetfacl
+import pygetfacl.tree_scanner as ts
+
+
+@pytest.fixture
+def temp_tree(tmp_path) -> Path:
+    root = tmp_path / "root"
+    (root / "dir_a" / "dir_aa").mkdir(parents=True)
+    (root / "dir_b").mkdir()
+    (root / "dir_a" / "file_a").touch()
+    (root / "dir_a" / "dir_aa" / "file_aa").touch()
+    (root / "dir_b" / "file_b").touch()
+    os.symlink(root / "dir_a", root / "dir_b" / "link_to_a")
+    return root
+
+
+def relative_paths(root, results):
+    return sorted(str(path.relative_to(root)) for path, _ in results)
+
+
+def test_getfacl_tree(temp_tree):
+    results = pygetfacl.getfacl_tree(temp_tree, backend="xattr")
+    assert relative_paths(temp_tree, results) == [
+        ".",
+        "dir_a",
+        "dir_a/dir_aa",
+        "dir_a/dir_aa/file_aa",
+        "dir_a/file_a",
+        "dir_b",
+        "dir_b/file_b",
+    ]
+
+
+def test_getfacl_tree_is_lazy(temp_tree):
+    results = pygetfacl.getfacl_tree(temp_tree, backend="xattr")
+    path, acl_data = next(results)
+    assert path == temp_tree
+    assert isinstance(acl_data, pygetfacl.ACLData)
+
+
+def test_max_depth(temp_tree):
+    results = pygetfacl.getfacl_tree(temp_tree, max_depth=1, backend="xattr")
+    assert relative_paths(temp_tree, results) == [".", "dir_a", "dir_b"]
+
+
+def test_exclude_prunes_subtree(temp_tree):
+    excluded = []
+
+    def exclude(path):
+        excluded.append(path)
+        return path.name == "dir_a"
+
+    results = pygetfacl.getfacl_tree(
+        temp_tree, exclude=exclude, backend="xattr"
+    )
+    assert relative_paths(temp_tree, results) == [
+        ".",
+        "dir_b",
+        "dir_b/file_b",
+    ]
+    assert temp_tree / "dir_a" / "file_a" not in excluded
+
+
+def test_include(temp_tree):
+    results = pygetfacl.getfacl_tree(
+        temp_tree, include=lambda path: path.is_file(), backend="xattr"
+    )
+    assert relative_paths(temp_tree, results) == [
+        "dir_a/dir_aa/file_aa",
+        "dir_a/file_a",
+        "dir_b/file_b",
+    ]
+
+
+@pytest.mark.parametrize(
+    "symlinks, expected_extra",
+    [
+        ("skip", []),
+        ("yield", ["dir_b/link_to_a"]),
+        (
+            "follow",
+            [
+                "dir_b/link_to_a",
+                "dir_b/link_to_a/dir_aa",
+                "dir_b/link_to_a/dir_aa/file_aa",
+                "dir_b/link_to_a/file_a",
+            ],
+        ),
+    ],
+)
+def test_symlink_policies(temp_tree, symlinks, expected_extra):
+    results = pygetfacl.getfacl_tree(
+        temp_tree, symlinks=symlinks, backend="xattr"
+    )
+    found = relative_paths(temp_tree, results)
+    for path in expected_extra:
+        assert path in found
+    assert len(found) == 7 + len(expected_extra)
+
+
+def test_bad_symlink_policy(temp_tree):
+    with pytest.raises(ValueError):
+        list(pygetfacl.getfacl_tree(temp_tree, symlinks="sometimes"))
+
+
+@pytest.mark.skipif(
+    shutil.which("getfacl") is None, reason="getfacl not installed"
+)
+def test_subprocess_backend_matches_xattr(temp_tree):
+    from_subprocess = [
+        (path, dataclasses.replace(acl_data, raw_system_output=""))
+        for path, acl_data in pygetfacl.getfacl_tree(
+            temp_tree, batch_size=2, backend="subprocess"
+        )
+    ]
+    assert from_subprocess == list(
+        pygetfacl.getfacl_tree(temp_tree, backend="xattr")
+    )
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        pytest.param(
+            "subprocess",
+            marks=pytest.mark.skipif(
+                shutil.which("getfacl") is None,
+                reason="getfacl not installed",
+            ),
+        ),
+        "xattr",
+        "auto",
+    ],
+)
+def test_path_removed_during_scan(temp_tree, monkeypatch, backend):
+    walk = ts._walk
+    removed = temp_tree / "dir_b" / "file_b"
+
+    def walk_then_remove(*args, **kwargs):
+        paths = list(walk(*args, **kwargs))
+        removed.unlink()
+        return iter(paths)
+
+    monkeypatch.setattr(ts, "_walk", walk_then_remove)
+    errors = []
+    results = list(
+        pygetfacl.getfacl_tree(
+            temp_tree, backend=backend, onerror=errors.append
+        )
+    )
+    assert removed not in dict(results)
+    assert len(results) == 6
+    assert [type(error) for error in errors] == [FileNotFoundError]
+    assert [error.filename for error in errors] == [str(removed)]
+    # skipped silently by default
+    removed.touch()
+    assert len(list(pygetfacl.getfacl_tree(temp_tree, backend=backend))) == 6
@@ -0,0 +1,203 @@
+import os
+import shutil
+import pytest
+import pygetfacl
+import pygetfacl.acl_info_retriever as air
+import pygetfacl.file_setting as fs
+import pygetfacl.name_resolver as nr
+import pygetfacl.subprocess_caller as sc
+import pygetfacl.xattr_reader as xr
+from pygetfacl.aclpath_exceptions import InvalidPosixACLXattr
+
+
+requires_getfacl = pytest.mark.skipif(
+    shutil.which("getfacl") is None, reason="getfacl not installed"
+)
+
+
+def set_acl_xattr(path, attribute_name, entries):
+    try:
+        os.setxattr(
+            path, attribute_name, xr.encode_posix_acl_xattr(entries)
+        )
+    except OSError as err:
+        pytest.skip(f"can't set {attribute_name}: {err}")
+
+
+@pytest.fixture
+def temp_dir_with_some_facl_settings(tmp_path):
+    my_dir = tmp_path / "test_dir"
+    my_dir.mkdir()
+    set_acl_xattr(
+        my_dir,
+        xr.ACCESS_ACL_XATTR,
+        [
+            (xr.ACL_USER_OBJ, 7, xr.ACL_UNDEFINED_ID),
+            (xr.ACL_USER, 7, 0),
+            (xr.ACL_GROUP_OBJ, 5, xr.ACL_UNDEFINED_ID),
+            (xr.ACL_MASK, 7, xr.ACL_UNDEFINED_ID),
+            (xr.ACL_OTHER, 5, xr.ACL_UNDEFINED_ID),
+        ],
+    )
+    set_acl_xattr(
+        my_dir,
+        xr.DEFAULT_ACL_XATTR,
+        [
+            (xr.ACL_USER_OBJ, 7, xr.ACL_UNDEFINED_ID),
+            (xr.ACL_GROUP_OBJ, 7, xr.ACL_UNDEFINED_ID),
+            (xr.ACL_OTHER, 5, xr.ACL_UNDEFINED_ID),
+        ],
+    )
+    os.chmod(my_dir, os.stat(my_dir).st_mode | 0o2000)
+    yield my_dir
+
+
+def test_decode_round_trip():
+    entries = [
+        (xr.ACL_USER_OBJ, 6, xr.ACL_UNDEFINED_ID),
+        (xr.ACL_GROUP, 4, 1234),
+        (xr.ACL_OTHER, 0, xr.ACL_UNDEFINED_ID),
+    ]
+    blob = xr.encode_posix_acl_xattr(entries)
+    assert xr.decode_posix_acl_xattr(blob) == entries
+
+
+@pytest.mark.parametrize("blob", [b"", b"\x02\x00\x00\x00\x01", b"\x01" * 12])
+def test_decode_bad_blob(blob):
+    with pytest.raises(InvalidPosixACLXattr):
+        xr.decode_posix_acl_xattr(blob)
+
+
+def test_getfacl_plain_file(tmp_path):
+    my_file = tmp_path / "plain_file"
+    my_file.touch()
+    os.chmod(my_file, 0o640)
+    acl_data = pygetfacl.getfacl(my_file, backend="xattr")
+    assert acl_data.owning_user == nr.user_name(os.getuid())
+    assert acl_data.flags is None
+    assert str(acl_data.user) == "rw-"
+    assert str(acl_data.group) == "r--"
+    assert str(acl_data.other) == "---"
+    assert acl_data.mask is None
+    assert acl_data.special_users == {}
+    assert acl_data.default_user is None
+
+
+def test_getfacl_extended_acl(temp_dir_with_some_facl_settings):
+    acl_data = pygetfacl.getfacl(
+        temp_dir_with_some_facl_settings, backend="xattr"
+    )
+    assert str(acl_data.flags) == "-s-"
+    assert str(acl_data.user) == "rwx"
+    assert str(acl_data.group) == "r-x"
+    assert str(acl_data.mask) == "rwx"
+    assert acl_data.special_users == {
+        nr.user_name(0): fs.PermissionSetting(r=True, w=True, x=True)
+    }
+    assert str(acl_data.default_group) == "rwx"
+    assert acl_data.default_mask is None
+
+
+def test_getfacl_numeric_ids(temp_dir_with_some_facl_settings):
+    acl_data = pygetfacl.getfacl(
+        temp_dir_with_some_facl_settings, backend="xattr", numeric_ids=True
+    )
+    assert acl_data.owning_user == str(os.getuid())
+    assert acl_data.special_users == {
+        "0": fs.PermissionSetting(r=True, w=True, x=True)
+    }
+    resolved = acl_data.with_resolved_names()
+    assert resolved == pygetfacl.getfacl(
+        temp_dir_with_some_facl_settings, backend="xattr"
+    )
+
+
+def test_set_default_backend():
+    assert pygetfacl.get_default_backend() == "subprocess"
+    with pytest.raises(ValueError):
+        pygetfacl.set_default_backend("not_a_backend")
+
+
+@requires_getfacl
+def test_matches_subprocess_backend(temp_dir_with_some_facl_settings):
+    from_xattr = pygetfacl.getfacl(
+        temp_dir_with_some_facl_settings, backend="xattr"
+    )
+    from_subprocess = pygetfacl.getfacl(
+        temp_dir_with_some_facl_settings, backend="subprocess"
+    )
+    from_subprocess.raw_system_output = ""
+    assert repr(from_xattr) == repr(from_subprocess)
+
+
+@requires_getfacl
+def test_numeric_ids_match_subprocess_backend(
+    temp_dir_with_some_facl_settings,
+):
+    from_xattr = pygetfacl.getfacl(
+        temp_dir_with_some_facl_settings, backend="xattr", numeric_ids=True
+    )
+    from_subprocess = pygetfacl.getfacl(
+        temp_dir_with_some_facl_settings,
+        backend="subprocess",
+        numeric_ids=True,
+    )
+    from_subprocess.raw_system_output = ""
+    assert from_xattr == from_subprocess
+
+
+def test_has_acl_xattrs(tmp_path, temp_dir_with_some_facl_settings):
+    my_file = tmp_path / "plain_file"
+    my_file.touch()
+    assert not xr.has_acl_xattrs(my_file, is_dir=False)
+    assert not xr.has_acl_xattrs(tmp_path, is_dir=True)
+    assert xr.has_acl_xattrs(temp_dir_with_some_facl_settings, is_dir=True)
+
+
+def test_auto_backend_plain_file_skips_getfacl(tmp_path, monkeypatch):
+    my_file = tmp_path / "plain_file"
+    my_file.touch()
+    os.chmod(my_file, 0o4751)
+
+    def no_subprocess(*args, **kwargs):
+        raise AssertionError("getfacl should not run")
+
+    monkeypatch.setattr(sc, "SubProcessCaller", no_subprocess)
+    acl_data = pygetfacl.getfacl(my_file, backend="auto")
+    assert acl_data == pygetfacl.getfacl(my_file, backend="xattr")
+    assert str(acl_data.flags) == "s--"
+    assert str(acl_data.group) == "r-x"
+
+
+@requires_getfacl
+def test_auto_backend_batches_only_paths_with_acls(
+    tmp_path, temp_dir_with_some_facl_settings, monkeypatch
+):
+    plain_files = [tmp_path / f"plain_file_{idx}" for idx in range(3)]
+    for plain_file in plain_files:
+        plain_file.touch()
+    paths = [*plain_files[:2], temp_dir_with_some_facl_settings, tmp_path]
+    paths.append(plain_files[2])
+
+    batches = []
+    getfacl_batch_output = air._MultiPathACLInfoRetriever._getfacl_batch_output
+
+    def recording_getfacl_batch_output(self, batch):
+        batches.append(batch)
+        return getfacl_batch_output(self, batch)
+
+    monkeypatch.setattr(
+        air._MultiPathACLInfoRetriever,
+        "_getfacl_batch_output",
+        recording_getfacl_batch_output,
+    )
+    result = pygetfacl.getfacl_many(paths, backend="auto")
+    assert batches == [[temp_dir_with_some_facl_settings]]
+    assert list(result) == paths
+    assert result[temp_dir_with_some_facl_settings].raw_system_output
+    from_subprocess = pygetfacl.getfacl_many(paths, backend="subprocess")
+    for path in paths:
+        if path != temp_dir_with_some_facl_settings:
+            assert not result[path].raw_system_output
+            from_subprocess[path].raw_system_output = ""
+    assert result == from_subprocess